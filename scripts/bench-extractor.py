@@ -0,0 +1,158 @@
+import os
+import sys
+import glob
+import time
+import argparse
+from scrapy.http import HtmlResponse
+from utils import PROJECT_ROOT
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src", "jobads_scrapy"))
+
+from jobads_scrapy.extractors import extract_job_ad  # noqa: E402
+
+
+def legacy_extract_job_ad(response):
+    """
+    Extract the job ad fields the way JobAdsSpider.parse originally did.
+
+    Every base info field runs its own CSS query and every list entry runs
+    its own XPath query. Kept as the baseline of the benchmark.
+
+    Args:
+        response (scrapy.http.Response): The response object.
+
+    Returns:
+        dict: The extracted job ad data.
+    """
+    base_info_query = "span.jobad-base-info-content::text"
+    tasks_query = '//*[@id="aria-panel-task"]/div/ul/li/span'
+    requirements_query = '//*[@id="aria-panel-your-profile"]/div/ul/li/span'
+
+    return {
+        'title': response.css("h1.margin-bottom-gutter::text").get(),
+        'code': response.css(base_info_query).get(),
+        'entry_type': response.css(base_info_query).getall()[1],
+        'location': response.css(base_info_query).getall()[2],
+        'company': response.css(base_info_query).getall()[3],
+        'tasks': [
+            element.xpath("text()").get()
+            for element in response.xpath(tasks_query)
+        ],
+        'requirements': [
+            element.xpath("text()").get()
+            for element in response.xpath(requirements_query)
+        ]
+    }
+
+
+def load_fixtures(fixture_dir):
+    """
+    Load saved job ad pages as parsed responses.
+
+    Args:
+        fixture_dir (str): Directory containing the saved HTML pages.
+
+    Returns:
+        list[HtmlResponse]: One response per page, with the document already
+            parsed so that only the extraction is measured.
+    """
+    responses = []
+
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.html"))):
+        with open(path, "rb") as file:
+            body = file.read()
+
+        response = HtmlResponse(
+            url=f"file://{os.path.abspath(path)}",
+            body=body,
+            encoding="utf-8"
+        )
+        # Parse the document up front, it is shared by both extractors
+        response.selector
+        responses.append(response)
+
+    return responses
+
+
+def time_extractor(extractor, response, repeat):
+    """
+    Measure the mean time an extractor needs for one page.
+
+    Args:
+        extractor (callable): The extractor to measure.
+        response (HtmlResponse): The page to extract.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        tuple: Microseconds per page and the extracted data, or None and the
+            raised exception if the extractor fails on the page.
+    """
+    try:
+        result = extractor(response)
+    except Exception as e:
+        return None, e
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extractor(response)
+    elapsed = time.perf_counter() - start
+
+    return elapsed / repeat * 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the legacy and the single-pass job ad extractor."
+    )
+    parser.add_argument(
+        "--fixtures",
+        default=os.path.join(PROJECT_ROOT, "scripts", "fixtures"),
+        help="Directory with saved job ad HTML pages."
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=2000,
+        help="Number of timed runs per page and extractor."
+    )
+    args = parser.parse_args()
+
+    responses = load_fixtures(args.fixtures)
+    if not responses:
+        print(f"No HTML fixtures found in {args.fixtures}")
+        return
+
+    print(f"{'page':<32} {'legacy [us]':>12} {'single-pass [us]':>17}")
+    totals = {"legacy": [], "single-pass": []}
+
+    for response in responses:
+        name = os.path.basename(response.url)
+        legacy_us, legacy_result = time_extractor(
+            legacy_extract_job_ad, response, args.repeat
+        )
+        new_us, new_result = time_extractor(
+            extract_job_ad, response, args.repeat
+        )
+
+        if legacy_us is None:
+            legacy_column = type(legacy_result).__name__
+        else:
+            legacy_column = f"{legacy_us:.1f}"
+            totals["legacy"].append(legacy_us)
+            if legacy_result != new_result:
+                print(f"Warning: extractors disagree on {name}")
+
+        if new_us is None:
+            print(f"{name:<32} {legacy_column:>12} {new_result!r:>17}")
+            continue
+
+        totals["single-pass"].append(new_us)
+        print(f"{name:<32} {legacy_column:>12} {new_us:>17.1f}")
+
+    for label, values in totals.items():
+        if values:
+            print(f"mean {label}: {sum(values) / len(values):.1f} us/page")
+
+
+if __name__ == "__main__":
+    main()
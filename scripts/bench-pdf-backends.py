@@ -0,0 +1,164 @@
+import io
+import os
+import json
+import time
+import resource
+import argparse
+import itertools
+import contextlib
+import tempfile
+import multiprocessing
+from src.generate_pdfs import JobPdfGenerator
+from src.pdf_backends import BACKENDS
+from src.run_metrics import RunMetrics
+from src.snapshot_io import iter_jobs
+from utils import PROJECT_ROOT
+
+TEMPLATE_PATH = os.path.join(PROJECT_ROOT, "src", "pdf_gen")
+
+
+def bench_backend(backend, snapshot_file, limit, workers, batch_size):
+    """
+    Render the jobs of a snapshot with one backend and measure the run.
+
+    Runs in a fresh process, so that the peak memory of one backend is not
+    inherited by the next one.
+
+    Args:
+        backend (str): Name of the PDF backend.
+        snapshot_file (str): Path to the snapshot file.
+        limit (int): Maximum number of jobs to render.
+        workers (int): Number of PDFs or batches rendered in parallel.
+        batch_size (int, optional): Number of jobs rendered per backend
+            call.
+
+    Returns:
+        dict: The measurements, or the error if the backend is not
+            available.
+    """
+    jobs = list(itertools.islice(iter_jobs(snapshot_file), limit))
+    metrics = RunMetrics(backend)
+
+    with tempfile.TemporaryDirectory() as output_path:
+        pdf_generator = JobPdfGenerator(
+            TEMPLATE_PATH,
+            None,
+            PROJECT_ROOT,
+            output_path,
+            metrics=metrics,
+            backend=backend
+        )
+
+        start = time.perf_counter()
+        try:
+            # Keep the progress output of every job out of the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                failures = pdf_generator.generate_pdfs(
+                    jobs=jobs,
+                    workers=workers,
+                    batch_size=batch_size,
+                    force=True
+                )
+        except (ImportError, FileNotFoundError) as e:
+            return {"backend": backend, "error": str(e)}
+        elapsed = time.perf_counter() - start
+
+        sizes = [
+            os.path.getsize(os.path.join(output_path, name))
+            for name in os.listdir(output_path)
+            if name.endswith(".pdf")
+        ]
+
+    documents = len(jobs) - len(failures)
+    # ru_maxrss is in KiB on Linux
+    process_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    return {
+        "backend": backend,
+        "documents": documents,
+        "failures": len(failures),
+        "seconds": elapsed,
+        "documents_per_second": documents / elapsed if elapsed else None,
+        "peak_memory_mib": process_peak / 1024,
+        "peak_child_memory_mib": child_peak / 1024,
+        "total_bytes": sum(sizes),
+        "mean_bytes": sum(sizes) / len(sizes) if sizes else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the PDF backends on the jobs of a snapshot."
+    )
+    parser.add_argument("snapshot", help="Path to the snapshot file.")
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=list(BACKENDS),
+        default=list(BACKENDS),
+        help="Backends to compare. Defaults to all."
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=200,
+        help="Maximum number of jobs to render per backend."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of PDFs or batches rendered in parallel."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Number of jobs rendered per backend call."
+    )
+    parser.add_argument(
+        "--json",
+        help="Path to save the measurements as JSON."
+    )
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    for backend in args.backends:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(
+                bench_backend,
+                (
+                    backend,
+                    args.snapshot,
+                    args.limit,
+                    args.workers,
+                    args.batch_size
+                )
+            ))
+
+    print(
+        f"{'backend':<12} {'docs':>6} {'docs/s':>8} {'peak MiB':>9} "
+        f"{'child MiB':>10} {'KiB/doc':>8}"
+    )
+    for result in results:
+        if "error" in result:
+            print(f"{result['backend']:<12} skipped: {result['error']}")
+            continue
+        mean_kib = (result["mean_bytes"] or 0) / 1024
+        print(
+            f"{result['backend']:<12} {result['documents']:>6} "
+            f"{result['documents_per_second']:>8.1f} "
+            f"{result['peak_memory_mib']:>9.1f} "
+            f"{result['peak_child_memory_mib']:>10.1f} "
+            f"{mean_kib:>8.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import itertools
+import contextlib
+import subprocess
+import tempfile
+import multiprocessing
+from src.job_url_scraper import JobUrlScraper
+from src.generate_pdfs import JobPdfGenerator
+from src.pdf_backends import BACKENDS
+from src.pipeline_runner import SCRAPY_PROJECT_PATH, crawl_jobs
+from src.portal_stub import JOB_CATEGORIES, PortalStub
+from src.run_metrics import RunMetrics
+from src.snapshot_io import iter_jobs
+from utils import PROJECT_ROOT, build_api_url
+
+RESULTS_PATH = os.path.join(PROJECT_ROOT, "results")
+TEMPLATE_PATH = os.path.join(PROJECT_ROOT, "src", "pdf_gen")
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds else None
+
+
+def _mean(histogram):
+    return histogram.sum / histogram.count if histogram.count else None
+
+
+def bench_api(stub, work_path, page_size, workers):
+    """
+    Fetch and filter the job IDs from the search API of the stub.
+
+    Args:
+        stub (PortalStub): The running portal stub.
+        work_path (str): Directory for the files of the run.
+        page_size (int): Number of results per API page.
+        workers (int): Number of pages fetched concurrently.
+
+    Returns:
+        dict: The measurements of the stage.
+    """
+    config_file = os.path.join(work_path, "filter_config.json")
+    with open(config_file, "w") as file:
+        json.dump(
+            {"filter": {"field": "JobCategory.Name", "in": JOB_CATEGORIES}},
+            file
+        )
+
+    metrics = RunMetrics("bench")
+    scraper = JobUrlScraper(
+        build_api_url(endpoint=stub.search_endpoint),
+        os.path.join(work_path, "job_ids.npy"),
+        config_file,
+        page_size=page_size,
+        max_workers=workers,
+        metrics=metrics
+    )
+    requests = stub.requests
+    job_ids = scraper.scrape_job_urls()
+    stage = metrics.stages["fetch_ids"]
+
+    return {
+        "seconds": stage["seconds"],
+        "jobs": len(job_ids or ()),
+        "requests": stub.requests - requests,
+        "jobs_per_second": _rate(len(job_ids or ()), stage["seconds"]),
+        "mean_request_seconds": _mean(
+            metrics.histograms["api_request_latency"]
+        ),
+    }
+
+
+def _crawl(job_url_prefix, input_file, output_file):
+    """
+    Crawl the job ads of the stub, in a process of its own.
+
+    Args:
+        job_url_prefix (str): URL of the job ad pages without the ID.
+        input_file (str): Path to the job IDs.
+        output_file (str): Path to save the scraped jobs.
+
+    Returns:
+        dict: The measurements of the stage.
+    """
+    metrics = RunMetrics("bench")
+    finished = crawl_jobs(
+        input_file,
+        output_file,
+        metrics=metrics,
+        extra_settings={
+            "JOBADS_BASE_URL": job_url_prefix,
+            "JOBADS_HTTPCACHE_ENABLED": False,
+            # The pipelines are measured on their own
+            "JOBADS_STORE_PATH": "",
+        }
+    )
+    stage = metrics.stages["crawl"]
+    parse = metrics.histograms.get("parse_latency")
+    download = metrics.histograms.get("download_latency")
+
+    return {
+        "finished": finished,
+        "seconds": stage["seconds"],
+        "pages": stage["items"],
+        "failures": stage["failures"],
+        "pages_per_second": _rate(stage["items"], stage["seconds"]),
+        "mean_parse_seconds": _mean(parse) if parse else None,
+        "mean_download_seconds": _mean(download) if download else None,
+    }
+
+
+def bench_crawl(stub, work_path):
+    """
+    Crawl the job ads of the stub with the spider.
+
+    The Twisted reactor cannot be restarted, so the crawl runs in a fresh
+    process.
+
+    Args:
+        stub (PortalStub): The running portal stub.
+        work_path (str): Directory for the files of the run.
+
+    Returns:
+        dict: The measurements of the stage.
+    """
+    context = multiprocessing.get_context("spawn")
+
+    with context.Pool(1) as pool:
+        return pool.apply(
+            _crawl,
+            (
+                stub.job_url_prefix,
+                os.path.join(work_path, "job_ids.npy"),
+                os.path.join(work_path, "jobs.jsonl")
+            )
+        )
+
+
+def bench_pipelines(work_path):
+    """
+    Pass the scraped jobs through the item pipelines of the project.
+
+    Every job goes through the validation pipeline and into a job store in
+    the work directory, as during a crawl.
+
+    Args:
+        work_path (str): Directory for the files of the run.
+
+    Returns:
+        dict: The measurements of the stage.
+    """
+    if SCRAPY_PROJECT_PATH not in sys.path:
+        sys.path.insert(0, SCRAPY_PROJECT_PATH)
+    from jobads_scrapy.items import JobAd
+    from jobads_scrapy.pipelines import (
+        JobAdValidationPipeline,
+        JobStorePipeline
+    )
+
+    jobs = list(iter_jobs(os.path.join(work_path, "jobs.jsonl")))
+    pipelines = [
+        JobAdValidationPipeline(["code", "title"]),
+        JobStorePipeline(
+            os.path.join(work_path, "jobs.sqlite3"), "bench", batch_size=500
+        ),
+    ]
+
+    start = time.perf_counter()
+    for pipeline in pipelines:
+        if hasattr(pipeline, "open_spider"):
+            pipeline.open_spider(None)
+    for job in jobs:
+        item = JobAd(**job)
+        for pipeline in pipelines:
+            item = pipeline.process_item(item, None)
+    for pipeline in pipelines:
+        if hasattr(pipeline, "close_spider"):
+            pipeline.close_spider(None)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": elapsed,
+        "items": len(jobs),
+        "items_per_second": _rate(len(jobs), elapsed),
+    }
+
+
+def bench_pdfs(work_path, limit, backend, batch_size, workers):
+    """
+    Render the PDFs of the first scraped jobs.
+
+    Args:
+        work_path (str): Directory for the files of the run.
+        limit (int): Maximum number of jobs to render.
+        backend (str): Name of the PDF backend.
+        batch_size (int, optional): Number of jobs rendered per backend
+            call.
+        workers (int): Number of PDFs or batches rendered in parallel.
+
+    Returns:
+        dict: The measurements of the stage, or the error if the backend is
+            not available.
+    """
+    jobs = list(itertools.islice(
+        iter_jobs(os.path.join(work_path, "jobs.jsonl")), limit
+    ))
+    metrics = RunMetrics("bench")
+    pdf_generator = JobPdfGenerator(
+        TEMPLATE_PATH,
+        None,
+        PROJECT_ROOT,
+        os.path.join(work_path, "pdfs"),
+        metrics=metrics,
+        backend=backend
+    )
+
+    try:
+        # Keep the progress output of every job out of the results
+        with contextlib.redirect_stdout(io.StringIO()):
+            pdf_generator.generate_pdfs(
+                jobs=jobs, workers=workers, batch_size=batch_size, force=True
+            )
+    except (ImportError, FileNotFoundError) as e:
+        return {"backend": backend, "error": str(e)}
+    stage = metrics.stages["render"]
+
+    return {
+        "backend": backend,
+        "seconds": stage["seconds"],
+        "pdfs": stage["items"],
+        "failures": stage["failures"],
+        "pdfs_per_second": _rate(stage["items"], stage["seconds"]),
+    }
+
+
+def git_revision():
+    """
+    Get the revision of the working tree.
+
+    Returns:
+        str: The abbreviated commit hash, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(stages):
+    api = stages["api"]
+    print(
+        f"API fetch: {api['jobs']} jobs in {api['requests']} requests, "
+        f"{api['seconds']:.2f}s"
+    )
+    crawl = stages.get("crawl")
+    if crawl:
+        parse_ms = (crawl["mean_parse_seconds"] or 0) * 1000
+        print(
+            f"Crawl:     {crawl['pages_per_second'] or 0:.1f} pages/s, "
+            f"{parse_ms:.2f} ms parse time per page"
+        )
+    pipelines = stages.get("pipelines")
+    if pipelines:
+        print(f"Pipelines: {pipelines['items_per_second'] or 0:.0f} items/s")
+    pdfs = stages.get("pdfs")
+    if pdfs and "error" in pdfs:
+        print(f"PDFs:      skipped: {pdfs['error']}")
+    elif pdfs:
+        print(
+            f"PDFs:      {pdfs['pdfs_per_second'] or 0:.1f} PDFs/s with "
+            f"{pdfs['backend']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline stages offline against a local "
+                    "stand-in of the job portal."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=500,
+        help="Number of synthetic jobs on the portal."
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Delay of every portal response in seconds."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the synthetic jobs."
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=100,
+        help="Number of results per API page."
+    )
+    parser.add_argument(
+        "--api-workers",
+        type=int,
+        default=4,
+        help="Number of API pages fetched concurrently."
+    )
+    parser.add_argument(
+        "--pdf-jobs",
+        type=int,
+        default=50,
+        help="Number of jobs rendered to PDF, 0 to skip the PDF stage."
+    )
+    parser.add_argument(
+        "--pdf-backend",
+        choices=list(BACKENDS),
+        default="wkhtmltopdf",
+        help="PDF backend to render with."
+    )
+    parser.add_argument(
+        "--pdf-batch-size",
+        type=int,
+        help="Number of jobs rendered per PDF backend call."
+    )
+    parser.add_argument(
+        "--pdf-workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of PDFs or batches rendered in parallel."
+    )
+    parser.add_argument(
+        "--label",
+        help="Label of the results, e.g. a version. Defaults to the git "
+             "revision."
+    )
+    parser.add_argument(
+        "--output",
+        default=RESULTS_PATH,
+        help="Directory to save the results in."
+    )
+    args = parser.parse_args()
+
+    label = args.label or git_revision() or "unversioned"
+    created = datetime.datetime.now()
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as work_path:
+        with PortalStub(args.jobs, args.latency, args.seed) as stub:
+            print(f"Serving {args.jobs} synthetic jobs at {stub.url}")
+            stages["api"] = bench_api(
+                stub, work_path, args.page_size, args.api_workers
+            )
+            if stages["api"]["jobs"]:
+                stages["crawl"] = bench_crawl(stub, work_path)
+
+        if stages.get("crawl", {}).get("pages"):
+            stages["pipelines"] = bench_pipelines(work_path)
+            if args.pdf_jobs:
+                stages["pdfs"] = bench_pdfs(
+                    work_path,
+                    args.pdf_jobs,
+                    args.pdf_backend,
+                    args.pdf_batch_size,
+                    args.pdf_workers
+                )
+
+    results = {
+        "label": label,
+        "created": created.isoformat(timespec="seconds"),
+        "parameters": {
+            name: value
+            for name, value in vars(args).items()
+            if name not in ("label", "output")
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "stages": stages,
+    }
+
+    print_results(stages)
+
+    os.makedirs(args.output, exist_ok=True)
+    results_file = os.path.join(
+        args.output,
+        f"bench-{label}-{created.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    with open(results_file, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {results_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import socket
+import argparse
+from src.pipeline_runner import crawl_jobs, scrapy_setting, shard_file
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Crawl job ads claimed from a shared work queue, e.g. "
+                    "to add a machine to a sharded crawl."
+    )
+    parser.add_argument("queue", help="Path to the work queue database.")
+    parser.add_argument(
+        "output",
+        help="Path of the merged output file of the sharded crawl, on the "
+             "shared directory. The worker writes its jobs to a shard file "
+             "next to it, which the crawl merges."
+    )
+    parser.add_argument(
+        "--worker",
+        help="Name of the worker, unique across all machines. Defaults to "
+             "the host name and process ID."
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Name of the snapshot the crawl belongs to."
+    )
+    parser.add_argument(
+        "-s",
+        "--set",
+        dest="settings",
+        metavar="NAME=VALUE",
+        type=scrapy_setting,
+        action="append",
+        default=[],
+        help="Override a Scrapy setting of the crawl. May be given several "
+             "times."
+    )
+    parser.add_argument(
+        "--log",
+        action="store_true",
+        help="Show the Scrapy log."
+    )
+    args = parser.parse_args()
+
+    worker = args.worker or f"{socket.gethostname()}-{os.getpid()}"
+    output_file = shard_file(args.output, worker)
+    print(f"Writing the scraped jobs to {output_file}")
+
+    success = crawl_jobs(
+        None,
+        output_file,
+        snapshot=args.snapshot,
+        log_enabled=args.log,
+        queue_file=args.queue,
+        worker=worker,
+        extra_settings=dict(args.settings)
+    )
+    print("Worker finished" if success else "Worker stopped with an error")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import json
+import argparse
+from src.snapshot_diff import diff_snapshots
+from src.snapshot_io import find_snapshot_file
+from utils import PROJECT_ROOT
+
+DATA_PATH = os.path.join(PROJECT_ROOT, "data")
+
+
+def resolve_snapshot(name):
+    """
+    Find the snapshot file of a snapshot name or path.
+
+    Args:
+        name (str): A snapshot file, a data directory or the name of a data
+            directory in the project's data directory.
+
+    Returns:
+        str: Path to the snapshot file.
+
+    Raises:
+        FileNotFoundError: If there is no such snapshot.
+    """
+    if os.path.isfile(name):
+        return name
+
+    for directory in (name, os.path.join(DATA_PATH, name)):
+        if os.path.isdir(directory):
+            path = find_snapshot_file(directory)
+            if path is not None:
+                return path
+
+    raise FileNotFoundError(f"No snapshot found for {name}")
+
+
+def print_diff(old, new, diff, details):
+    summary = diff.summary()
+    fields = ", ".join(
+        f"{field} {count}" for field, count in summary["fields"].items()
+    )
+    print(
+        f"{old} -> {new}: {summary['added']} added, "
+        f"{summary['removed']} removed, {summary['modified']} modified"
+        f"{f' ({fields})' if fields else ''}, "
+        f"{summary['unchanged']} unchanged"
+    )
+
+    if not details:
+        return
+
+    for code in diff.added:
+        print(f"  + {code}")
+    for code in diff.removed:
+        print(f"  - {code}")
+    for code, fields in diff.modified.items():
+        print(f"  ~ {code}: {', '.join(fields)}")
+        for field, (old_value, new_value) in diff.changes.get(
+                code, {}
+        ).items():
+            print(f"      {field}: {old_value!r}")
+            print(f"      {' ' * len(field)}  -> {new_value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show the jobs that were added, removed or modified "
+                    "between snapshots."
+    )
+    parser.add_argument(
+        "snapshots",
+        nargs="*",
+        help="Snapshot names, data directories or snapshot files, oldest "
+             "first. Consecutive snapshots are compared. Defaults to all "
+             "snapshots in the data directory."
+    )
+    parser.add_argument(
+        "--details",
+        action="store_true",
+        help="List the changed jobs with the old and new field values."
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the differences as JSON."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the digest cache next to the snapshots."
+    )
+    args = parser.parse_args()
+
+    names = args.snapshots or sorted(
+        name for name in os.listdir(DATA_PATH)
+        if find_snapshot_file(os.path.join(DATA_PATH, name)) is not None
+    )
+    if len(names) < 2:
+        parser.error("at least two snapshots are needed")
+
+    paths = [resolve_snapshot(name) for name in names]
+    reports = []
+
+    for (old, old_path), (new, new_path) in zip(
+            zip(names, paths), zip(names[1:], paths[1:])
+    ):
+        diff = diff_snapshots(
+            old_path,
+            new_path,
+            details=args.details,
+            cache=not args.no_cache
+        )
+        if args.json:
+            reports.append({"old": old, "new": new, **diff.to_dict()})
+        else:
+            print_diff(old, new, diff, args.details)
+
+    if args.json:
+        print(json.dumps(reports, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import argparse
+from src.geo_index import GeoIndex
+from src.snapshot_io import find_snapshot_file
+from utils import PROJECT_ROOT
+
+DATA_PATH = os.path.join(PROJECT_ROOT, "data")
+GEO_INDEX_FILE_NAME = "job_locations.npz"
+
+
+def latest_snapshot(data_path):
+    """
+    Find the latest snapshot with saved job locations.
+
+    Args:
+        data_path (str): The data directory containing the snapshots.
+
+    Returns:
+        str: Name of the snapshot, or None if there is none.
+    """
+    names = sorted(
+        name for name in os.listdir(data_path)
+        if find_snapshot_file(os.path.join(data_path, name)) is not None
+        and os.path.exists(
+            os.path.join(data_path, name, GEO_INDEX_FILE_NAME)
+        )
+    )
+    return names[-1] if names else None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find jobs near a point using the saved job locations."
+    )
+    parser.add_argument("lat", type=float, help="Latitude in degrees.")
+    parser.add_argument("lon", type=float, help="Longitude in degrees.")
+    parser.add_argument(
+        "--snapshot",
+        "--version",
+        help="Name of the snapshot. Defaults to the latest snapshot with "
+             "saved job locations."
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=DATA_PATH,
+        help="The data directory containing the snapshots."
+    )
+    parser.add_argument(
+        "--radius",
+        type=float,
+        help="Return all jobs within this many kilometres."
+    )
+    parser.add_argument(
+        "--nearest",
+        type=int,
+        default=10,
+        help="Number of nearest job sites to return without --radius."
+    )
+    args = parser.parse_args()
+
+    snapshot = args.snapshot or latest_snapshot(args.data_dir)
+    if snapshot is None:
+        parser.error(f"no snapshot with job locations in {args.data_dir}")
+
+    index_file = os.path.join(args.data_dir, snapshot, GEO_INDEX_FILE_NAME)
+    geo_index = GeoIndex.load(index_file)
+
+    if args.radius is not None:
+        results = geo_index.within(args.lat, args.lon, args.radius)
+    else:
+        results = geo_index.nearest(args.lat, args.lon, args.nearest)
+
+    for job_id, lat, lon, distance in results:
+        print(f"{job_id:>8} {lat:>10.4f} {lon:>10.4f} {distance:>9.1f} km")
+    print(f"{len(results)} of {len(geo_index)} job sites")
+
+
+if __name__ == "__main__":
+    main()
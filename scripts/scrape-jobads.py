@@ -1,11 +1,143 @@
 import os
-import subprocess
-from src.job_url_scraper import JobUrlScraper
-from src.generate_pdfs import JobPdfGenerator
+import sys
+import shutil
+import argparse
+from datetime import date
+from src.job_registry import JobRegistry, merge_snapshot
+from src.pipeline_runner import (
+    StreamingPdfRenderer,
+    crawl_jobs,
+    crawl_sharded,
+    mark_listed_jobs,
+    scrapy_setting
+)
+from src.snapshot_io import find_snapshot_file, iter_jobs
+from src.pdf_backends import BACKENDS
+from src.run_metrics import RunMetrics
 from utils import PROJECT_ROOT, API_URL
 
+# Heavy dependencies such as requests, numpy, jinja2 and the PDF backends are
+# imported by the stages that use them, so that small commands start quickly
 
-def fetch_job_ids(api_url, output_file, config_file):
+DATA_PATH = os.path.join(PROJECT_ROOT, "data")
+TEMPLATE_PATH = os.path.join(PROJECT_ROOT, "src", "pdf_gen")
+CONFIG_FILE_NAME = "filter_config.json"
+REGISTRY_FILE_NAME = "job_registry.json"
+
+
+def snapshot_paths(data_path, snapshot):
+    """
+    Get the paths of the files of a snapshot.
+
+    Args:
+        data_path (str): The data directory containing the snapshots.
+        snapshot (str): Name of the snapshot.
+
+    Returns:
+        dict: The snapshot directory and the paths of its files. The jobs
+            are in the existing snapshot file, which may be JSON, JSON Lines
+            or gzip compressed JSON Lines, and new snapshots are written as
+            JSON Lines.
+    """
+    snapshot_path = os.path.join(data_path, snapshot)
+
+    return {
+        "snapshot": snapshot_path,
+        "job_ids": os.path.join(snapshot_path, "job_ids.npy"),
+        "registry": os.path.join(snapshot_path, REGISTRY_FILE_NAME),
+        "geo_index": os.path.join(snapshot_path, "job_locations.npz"),
+        "jobs": (
+            find_snapshot_file(snapshot_path)
+            or os.path.join(snapshot_path, "scraped_jobs.jsonl")
+        ),
+        "delta": os.path.join(snapshot_path, "scraped_jobs_delta.jsonl"),
+        "pdfs": os.path.join(snapshot_path, "pdfs"),
+        "index": os.path.join(data_path, "jobs_fulltext.sqlite3"),
+    }
+
+
+def find_config_file(data_path, snapshot):
+    """
+    Find the filter configuration of a snapshot.
+
+    Args:
+        data_path (str): The data directory containing the snapshots.
+        snapshot (str): Name of the snapshot.
+
+    Returns:
+        str: The filter_config.json of the snapshot if it has one, otherwise
+            the one in the data directory, or None if there is neither.
+    """
+    for path in (os.path.join(data_path, snapshot), data_path):
+        config_file = os.path.join(path, CONFIG_FILE_NAME)
+        if os.path.exists(config_file):
+            return config_file
+
+    return None
+
+
+def seed_snapshot(data_path, snapshot, paths):
+    """
+    Start a new snapshot from the latest previous one.
+
+    The jobs file, the job registry and the PDFs of the snapshot whose
+    registry was saved last are copied into the new snapshot, so that only
+    the jobs that are new or changed since then are crawled and rendered.
+
+    Args:
+        data_path (str): The data directory containing the snapshots.
+        snapshot (str): Name of the new snapshot.
+        paths (dict): The paths of the files of the new snapshot. The path
+            of the jobs file is updated to the copied file.
+
+    Returns:
+        str: Name of the snapshot the new one starts from, or None if there
+            is no previous snapshot with a registry.
+    """
+    previous = []
+    for name in os.listdir(data_path):
+        snapshot_path = os.path.join(data_path, name)
+        registry_file = os.path.join(snapshot_path, REGISTRY_FILE_NAME)
+        if name == snapshot or not os.path.exists(registry_file):
+            continue
+        jobs_file = find_snapshot_file(snapshot_path)
+        if jobs_file is not None:
+            previous.append(
+                (os.path.getmtime(registry_file), name, jobs_file)
+            )
+
+    if not previous:
+        return None
+
+    _, name, jobs_file = max(previous)
+    os.makedirs(paths["snapshot"], exist_ok=True)
+    # PDFs are overwritten in place, so they are copied, not linked
+    pdf_path = os.path.join(data_path, name, "pdfs")
+    if os.path.isdir(pdf_path):
+        shutil.copytree(pdf_path, paths["pdfs"], dirs_exist_ok=True)
+    # The registry goes last, a snapshot with a registry is complete
+    paths["jobs"] = os.path.join(
+        paths["snapshot"], os.path.basename(jobs_file)
+    )
+    shutil.copyfile(jobs_file, paths["jobs"])
+    shutil.copyfile(
+        os.path.join(data_path, name, REGISTRY_FILE_NAME), paths["registry"]
+    )
+
+    return name
+
+
+def fetch_job_ids(
+        api_url,
+        output_file,
+        config_file,
+        page_size=None,
+        max_workers=4,
+        registry=None,
+        geo_index_file=None,
+        use_async=False,
+        metrics=None
+):
     """
     Fetch job IDs using the JobUrlScraper.
 
@@ -13,98 +145,555 @@ def fetch_job_ids(api_url, output_file, config_file):
         api_url (str): The API endpoint to fetch job IDs.
         output_file (str): Path to save the fetched job IDs.
         config_file (str): Path to the configuration file for filtering.
+        page_size (int, optional): Number of results per API page. If None,
+            all results are fetched with a single request.
+        max_workers (int): Number of API pages fetched concurrently.
+        registry (JobRegistry, optional): Registry of known jobs. If given,
+            only the IDs of new or changed jobs are saved.
+        geo_index_file (str, optional): Path to save the GeoIndex of the
+            locations of all filtered jobs.
+        use_async (bool): Whether the API pages are fetched with the asyncio
+            client, which requires aiohttp.
+        metrics (RunMetrics, optional): Metrics of the run to record into.
+
+    Returns:
+        list: The saved job IDs, or None if the job data could not be fetched.
     """
-    id_scraper = JobUrlScraper(api_url, output_file, config_file)
+    from src.job_url_scraper import JobUrlScraper
+
+    id_scraper = JobUrlScraper(
+        api_url,
+        output_file,
+        config_file,
+        page_size=page_size,
+        max_workers=max_workers,
+        registry=registry,
+        geo_index_file=geo_index_file,
+        use_async=use_async,
+        metrics=metrics
+    )
 
     print("Fetching job data from API...")
-    id_scraper.scrape_job_urls()
-    print("Job IDs saved to ", output_file)
+    job_ids = id_scraper.scrape_job_urls()
+    if job_ids is not None:
+        print("Job IDs saved to ", output_file)
 
+    return job_ids
 
-def run_spider(input_file, output_file):
+
+def run_spider(
+        input_file,
+        output_file,
+        snapshot=None,
+        pdf_renderer=None,
+        metrics=None,
+        workers=1,
+        extra_settings=None
+):
     """
-    Run the Scrapy spider using a subprocess.
+    Run the Scrapy spider in the current process, or sharded over several
+    worker processes.
+
+    The job IDs are crawled through a work queue next to the output file,
+    which is removed when the crawl succeeds. If the crawl is interrupted,
+    the next call with the same output file resumes it.
 
     Args:
         input_file (str): Path to the input file containing job ad IDs.
         output_file (str): Path to save the scraped data.
+        snapshot (str, optional): Name of the snapshot the crawl belongs to.
+        pdf_renderer (StreamingPdfRenderer, optional): Renderer that every
+            scraped job is passed to while the crawl is still running.
+        metrics (RunMetrics, optional): Metrics of the run to record into.
+        workers (int): Number of crawler processes. With more than one, the
+            PDFs are rendered after the crawl.
+        extra_settings (dict, optional): Scrapy settings overriding the
+            project settings, e.g. JOBADS_BASE_URL.
 
     Returns:
         bool: True if the spider ran successfully, False otherwise.
     """
     print("Running Scrapy spider...")
 
-    command = (
-        f"scrapy crawl job_ads "
-        f"-a inputfile={input_file} "
-        f"-O {output_file} "
-        "--nolog"
+    # Checkpoint of the crawl, an interrupted crawl is resumed from it
+    queue_file = f"{output_file}.queue.sqlite3"
+
+    if workers > 1:
+        success = crawl_sharded(
+            input_file,
+            output_file,
+            queue_file,
+            workers=workers,
+            snapshot=snapshot,
+            metrics=metrics,
+            extra_settings=extra_settings
+        )
+        if pdf_renderer is not None:
+            pdf_renderer.start()
+            try:
+                for job in iter_jobs(output_file):
+                    pdf_renderer.submit(job, block=True)
+            finally:
+                failures = pdf_renderer.close()
+            print(f"PDF generation finished with {len(failures)} failures")
+    elif pdf_renderer is None:
+        success = crawl_jobs(
+            input_file,
+            output_file,
+            snapshot=snapshot,
+            metrics=metrics,
+            queue_file=queue_file,
+            extra_settings=extra_settings
+        )
+    else:
+        pdf_renderer.start()
+        try:
+            success = crawl_jobs(
+                input_file,
+                output_file,
+                on_item=pdf_renderer.submit,
+                backlogged=pdf_renderer.backlogged,
+                snapshot=snapshot,
+                metrics=metrics,
+                queue_file=queue_file,
+                extra_settings=extra_settings
+            )
+        finally:
+            failures = pdf_renderer.close()
+        print(f"PDF generation finished with {len(failures)} failures")
+
+    if success:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(queue_file + suffix):
+                os.remove(queue_file + suffix)
+
+    if success:
+        print("Scrapy spider ran successfully")
+    else:
+        print("An error occurred while running the Scrapy spider")
+
+    return success
+
+
+def create_pdf_generator(args, paths, metrics):
+    """
+    Create the PDF generator of a snapshot.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+        paths (dict): The paths of the snapshot files.
+        metrics (RunMetrics): Metrics of the run to record into.
+
+    Returns:
+        JobPdfGenerator: The generator, writing to the PDF directory of the
+            snapshot.
+    """
+    from src.generate_pdfs import JobPdfGenerator
+
+    return JobPdfGenerator(
+        TEMPLATE_PATH,
+        paths["jobs"],
+        PROJECT_ROOT,
+        paths["pdfs"],
+        metrics=metrics,
+        backend=args.pdf_backend
     )
 
-    original_directory = os.getcwd()
 
-    try:
-        os.chdir(os.path.join(PROJECT_ROOT, "src", "jobads_scrapy"))
+def duplicates_mode(args):
+    """
+    Get the near-duplicate handling of the PDF generator.
 
-        subprocess.run(command, shell=True, check=True)
+    Args:
+        args (argparse.Namespace): The command line arguments.
 
-        print("Scrapy spider ran successfully")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"An error occurred while running the Scrapy command: {e}")
+    Returns:
+        str: 'skip' or 'group', or None to render every job.
+    """
+    return None if args.duplicates == "none" else args.duplicates
+
+
+def fetch_stage(args, paths, metrics):
+    """
+    Fetch the IDs of the new or changed jobs from the API.
+
+    A new snapshot starts from the latest previous one, so only the jobs
+    that changed since are crawled. With ``--full``, the job registry is
+    reset and all listed jobs are crawled again.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+        paths (dict): The paths of the snapshot files.
+        metrics (RunMetrics): Metrics of the run to record into.
+
+    Returns:
+        bool: True if the IDs were fetched.
+    """
+    config_file = args.config or find_config_file(
+        args.data_dir, args.snapshot
+    )
+    if config_file is None:
+        print(
+            f"No {CONFIG_FILE_NAME} found for snapshot {args.snapshot}, "
+            f"pass one with --config"
+        )
         return False
-    finally:
-        os.chdir(original_directory)
+
+    new_snapshot = not (
+        os.path.exists(paths["registry"]) or os.path.exists(paths["jobs"])
+    )
+    if new_snapshot and not args.full:
+        previous = seed_snapshot(args.data_dir, args.snapshot, paths)
+        if previous is not None:
+            print(f"Snapshot {args.snapshot} starts from snapshot {previous}")
+
+    os.makedirs(paths["snapshot"], exist_ok=True)
+    registry = JobRegistry(paths["registry"])
+    if args.full:
+        registry.reset()
+    elif not os.path.exists(paths["jobs"]) and any(
+        entry["last_scraped"] for entry in registry.jobs.values()
+    ):
+        print(
+            f"The job registry lists scraped jobs, but {paths['jobs']} is "
+            f"missing, pass --full to crawl all jobs again"
+        )
+        return False
+
+    job_ids = fetch_job_ids(
+        args.api_url,
+        paths["job_ids"],
+        config_file,
+        page_size=args.page_size or None,
+        max_workers=args.api_workers,
+        registry=registry,
+        geo_index_file=paths["geo_index"],
+        use_async=args.use_async,
+        metrics=metrics
+    )
+
+    if job_ids is None:
+        print("Job IDs could not be fetched, the snapshot is left unchanged")
+        return False
+
+    return True
 
 
-def generate_pdfs(input_file, template_path, output_path):
+def crawl_stage(args, paths, metrics, pdf_generator=None):
     """
-    Generate PDFs using the JobPdfGenerator.
+    Crawl the fetched job IDs, merge them into the snapshot and update the
+    full-text index.
 
     Args:
-        input_file (str): Path to the input JSON file containing scraped job
-            data.
-        template_path (str): Path to the directory containing the HTML template
-            file.
+        args (argparse.Namespace): The command line arguments.
+        paths (dict): The paths of the snapshot files.
+        metrics (RunMetrics): Metrics of the run to record into.
+        pdf_generator (JobPdfGenerator, optional): Generator rendering the
+            PDFs of the jobs while they are scraped.
+
+    Returns:
+        bool: True if the crawl succeeded.
     """
-    pdf_generator = JobPdfGenerator(
-        template_path,
-        input_file,
-        PROJECT_ROOT,
-        output_path
+    import numpy as np
+
+    if not os.path.exists(paths["job_ids"]):
+        print(f"{paths['job_ids']} not found, run fetch-ids first")
+        return False
+
+    job_count = len(np.load(paths["job_ids"]))
+
+    pdf_renderer = None
+    if pdf_generator is not None:
+        pdf_renderer = StreamingPdfRenderer(
+            pdf_generator,
+            workers=args.pdf_workers,
+            batch_size=args.pdf_batch_size or None,
+            duplicates=duplicates_mode(args)
+        )
+
+    crawled = not job_count or run_spider(
+        paths["job_ids"],
+        paths["delta"],
+        args.snapshot,
+        pdf_renderer,
+        metrics,
+        workers=args.crawl_workers,
+        extra_settings=dict(args.settings)
+    )
+    if not crawled:
+        return False
+
+    registry = JobRegistry(paths["registry"])
+    with metrics.stage("merge"):
+        merged_count = merge_snapshot(
+            paths["jobs"], paths["delta"] if job_count else None, registry
+        )
+        registry.save()
+    print(f"Merged {job_count} new or changed jobs into {paths['jobs']}")
+    print(f"The snapshot now contains {merged_count} jobs")
+
+    delisted = mark_listed_jobs(
+        paths["jobs"], args.snapshot, dict(args.settings)
     )
-    pdf_generator.load_job_data()
-    pdf_generator.generate_pdfs()
+    if delisted is not None:
+        print(f"Marked {delisted} jobs in the job store as delisted")
+
+    from src.fulltext_index import FullTextIndex
+
+    with metrics.stage("index"):
+        with FullTextIndex(paths["index"]) as index:
+            counts = index.index_snapshot(args.snapshot, paths["jobs"])
+    print(
+        f"Full-text index updated: {counts['added']} added, "
+        f"{counts['updated']} updated, {counts['removed']} removed"
+    )
+
+    return True
+
+
+def render_stage(args, paths, metrics, pdf_generator=None):
+    """
+    Render the PDFs of the snapshot and merge them into the catalogue.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+        paths (dict): The paths of the snapshot files.
+        metrics (RunMetrics): Metrics of the run to record into.
+        pdf_generator (JobPdfGenerator, optional): Generator that already
+            rendered the PDFs of the scraped jobs while they were scraped.
+            The PDFs of all jobs of the snapshot are still brought up to
+            date, the manifest skips those that are.
+
+    Returns:
+        bool: True if all PDFs were rendered.
+    """
+    if not os.path.exists(paths["jobs"]):
+        print(f"{paths['jobs']} not found, run crawl first")
+        return False
+
+    if pdf_generator is None:
+        pdf_generator = create_pdf_generator(args, paths, metrics)
+    # Also renders the jobs of the snapshot that were not scraped in this
+    # run, e.g. of a snapshot started from a previous one, and removes the
+    # PDFs of jobs no longer listed
+    failures = pdf_generator.generate_pdfs(
+        workers=args.pdf_workers,
+        batch_size=args.pdf_batch_size or None,
+        force=getattr(args, "force", False),
+        duplicates=duplicates_mode(args)
+    )
+
+    if not args.no_catalogue:
+        pdf_generator.generate_catalogue(iter_jobs(paths["jobs"]))
+
+    return not failures
+
+
+def all_stages(args, paths, metrics):
+    """
+    Run all stages, rendering the PDFs while the jobs are scraped.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+        paths (dict): The paths of the snapshot files.
+        metrics (RunMetrics): Metrics of the run to record into.
+
+    Returns:
+        bool: True if all stages succeeded.
+    """
+    if not fetch_stage(args, paths, metrics):
+        return False
+
+    # Created after the fetch, which may have started a new snapshot from a
+    # previous one
+    pdf_generator = None
+    if not args.no_pdfs:
+        pdf_generator = create_pdf_generator(args, paths, metrics)
+    if not crawl_stage(args, paths, metrics, pdf_generator):
+        return False
+    if pdf_generator is not None:
+        return render_stage(args, paths, metrics, pdf_generator)
+
+    return True
+
+
+COMMANDS = {
+    "fetch-ids": fetch_stage,
+    "crawl": crawl_stage,
+    "render": render_stage,
+    "all": all_stages,
+}
+
+
+def build_parser():
+    """
+    Build the command line parser.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--snapshot",
+        default=date.today().strftime("%Y%m%d"),
+        help="Name of the snapshot, its files are kept in a directory of "
+             "that name in the data directory. Defaults to the current "
+             "date as YYYYMMDD. A new snapshot starts from the latest "
+             "previous one."
+    )
+    common.add_argument(
+        "--data-dir",
+        default=DATA_PATH,
+        help="The data directory containing the snapshots."
+    )
+
+    fetch = argparse.ArgumentParser(add_help=False)
+    fetch.add_argument(
+        "--config",
+        help=f"Path to the filter configuration. Defaults to the "
+             f"{CONFIG_FILE_NAME} of the snapshot or of the data directory."
+    )
+    fetch.add_argument(
+        "--api-url",
+        default=API_URL,
+        help="URL of the job search API."
+    )
+    fetch.add_argument(
+        "--page-size",
+        type=int,
+        default=250,
+        help="Number of results per API page, 0 to fetch all results with "
+             "one request."
+    )
+    fetch.add_argument(
+        "--api-workers",
+        type=int,
+        default=4,
+        help="Number of API pages fetched concurrently."
+    )
+    fetch.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Fetch the API pages with an asyncio client instead of a "
+             "thread pool. Requires aiohttp."
+    )
+    fetch.add_argument(
+        "--full",
+        action="store_true",
+        help="Crawl all listed jobs again instead of only the new or "
+             "changed ones. A new snapshot then does not start from the "
+             "previous one."
+    )
+
+    crawl = argparse.ArgumentParser(add_help=False)
+    crawl.add_argument(
+        "--crawl-workers",
+        type=int,
+        default=1,
+        help="Number of crawler processes. More than one shards the crawl "
+             "over processes sharing a work queue."
+    )
+    crawl.add_argument(
+        "-s",
+        "--set",
+        dest="settings",
+        metavar="NAME=VALUE",
+        type=scrapy_setting,
+        action="append",
+        default=[],
+        help="Override a Scrapy setting of the crawl, e.g. "
+             "JOBADS_BASE_URL to crawl a local portal stub. May be given "
+             "several times."
+    )
+
+    render = argparse.ArgumentParser(add_help=False)
+    render.add_argument(
+        "--pdf-backend",
+        choices=list(BACKENDS),
+        default="wkhtmltopdf",
+        help="PDF backend to render with."
+    )
+    render.add_argument(
+        "--pdf-workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of PDFs or batches rendered in parallel."
+    )
+    render.add_argument(
+        "--pdf-batch-size",
+        type=int,
+        default=25,
+        help="Number of jobs rendered per PDF backend call, 0 to render "
+             "every job on its own."
+    )
+    render.add_argument(
+        "--duplicates",
+        choices=["none", "skip", "group"],
+        default="none",
+        help="How near-duplicate jobs are rendered: 'none' renders every "
+             "job, 'skip' leaves out the near-duplicates of earlier jobs, "
+             "'group' renders one job per group that lists the others."
+    )
+    render.add_argument(
+        "--no-catalogue",
+        action="store_true",
+        help="Do not merge the PDFs into a catalogue."
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Fetch, crawl and render the job ads of a snapshot."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "fetch-ids",
+        parents=[common, fetch],
+        help="Fetch the IDs of new or changed jobs from the API."
+    )
+    commands.add_parser(
+        "crawl",
+        parents=[common, crawl],
+        help="Crawl the fetched job IDs and merge them into the snapshot."
+    )
+    render_command = commands.add_parser(
+        "render",
+        parents=[common, render],
+        help="Render the PDFs of the snapshot and the catalogue."
+    )
+    render_command.add_argument(
+        "--force",
+        action="store_true",
+        help="Render all PDFs, even if they are up to date."
+    )
+    all_command = commands.add_parser(
+        "all",
+        parents=[common, fetch, crawl, render],
+        help="Run all stages, rendering the PDFs during the crawl."
+    )
+    all_command.add_argument(
+        "--no-pdfs",
+        action="store_true",
+        help="Do not render PDFs."
+    )
+
+    return parser
 
 
 def main():
-    VERSION = "20231019-dev-jobs"
-    DATA_PATH = os.path.join(PROJECT_ROOT, "data", VERSION)
-    CONFIG_FILE = os.path.join(DATA_PATH, "filter_config.json")
-    OUTPUT_FILE = os.path.join(DATA_PATH, "job_ids.npy")
-
-    fetch_job_ids(API_URL, OUTPUT_FILE, CONFIG_FILE)
-
-    input_file = OUTPUT_FILE
-    output_file = os.path.join(DATA_PATH, "scraped_jobs.json")
-    run_spider(input_file, output_file)
-
-    while True:
-        user_input = input("Do you want to generate PDFs? (yes/no): ")
-        formatted_input = user_input.strip().lower()
-        if formatted_input in ["yes", "no"]:
-            break
-        else:
-            print("Invalid input. Please enter 'yes' or 'no'.")
-
-    should_generate_pdfs = formatted_input == "yes"
-
-    if should_generate_pdfs:
-        output_path = os.path.join(DATA_PATH, "pdfs")
-        template_path = os.path.join(
-            PROJECT_ROOT, "src", "pdf_gen"
-        )
-        generate_pdfs(output_file, template_path, output_path)
+    args = build_parser().parse_args()
+    paths = snapshot_paths(args.data_dir, args.snapshot)
+
+    # Written next to the snapshot even if the run fails
+    metrics = RunMetrics(args.snapshot)
+
+    try:
+        success = COMMANDS[args.command](args, paths, metrics)
+    finally:
+        if os.path.isdir(paths["snapshot"]):
+            metrics.write_report(paths["snapshot"])
+
+    if not success:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,74 @@
+import os
+import time
+import argparse
+from src.fulltext_index import FullTextIndex, INDEXED_FIELDS
+from utils import PROJECT_ROOT
+
+INDEX_FILE = os.path.join(PROJECT_ROOT, "data", "jobs_fulltext.sqlite3")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search the tasks and requirements of all scraped jobs."
+    )
+    parser.add_argument(
+        "query",
+        nargs="*",
+        help="Terms that must all occur, e.g. 'MATLAB AUTOSAR'. A trailing "
+             "'*' matches every term with that prefix."
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Only search this snapshot, e.g. '20231019-dev-jobs'."
+    )
+    parser.add_argument(
+        "--field",
+        choices=INDEXED_FIELDS,
+        action="append",
+        help="Only search this field. Can be given several times."
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Index new and changed snapshots in the data directory first."
+    )
+    parser.add_argument(
+        "--index",
+        default=INDEX_FILE,
+        help="Path to the index database."
+    )
+    args = parser.parse_args()
+
+    with FullTextIndex(args.index) as index:
+        if args.update:
+            results = index.index_data_directory(
+                os.path.join(PROJECT_ROOT, "data")
+            )
+            for name, counts in results.items():
+                print(
+                    f"Indexed {name}: {counts['added']} added, "
+                    f"{counts['updated']} updated, {counts['removed']} "
+                    f"removed, {counts['unchanged']} unchanged"
+                )
+
+        if not args.query:
+            return
+
+        start = time.perf_counter()
+        jobs = index.search(
+            " ".join(args.query),
+            snapshot=args.snapshot,
+            fields=args.field or INDEXED_FIELDS
+        )
+        elapsed = time.perf_counter() - start
+
+    for job in jobs:
+        print(
+            f"{job['snapshot']}  {job['code']}  {job['title']} "
+            f"({job['location']})"
+        )
+    print(f"{len(jobs)} jobs found in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
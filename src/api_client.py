@@ -0,0 +1,380 @@
+import time
+import random
+import asyncio
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def _accept_encoding():
+    """
+    Build the Accept-Encoding header for the available decoders.
+
+    Brotli is only offered if a brotli module is installed, since neither
+    requests nor aiohttp can decode it otherwise.
+
+    Returns:
+        str: The header value.
+    """
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        return 'gzip, deflate, br'
+
+    return 'gzip, deflate'
+
+
+def retry_delay(attempt, backoff, max_backoff, retry_after=None):
+    """
+    Compute the delay before a retry using exponential backoff with full
+    jitter.
+
+    Args:
+        attempt (int): Number of the failed attempt, starting at 0.
+        backoff (float): Base delay in seconds.
+        max_backoff (float): Upper bound of the delay in seconds.
+        retry_after (str, optional): Value of the Retry-After header.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    delay = random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+    if retry_after is not None:
+        try:
+            delay = max(delay, min(float(retry_after), max_backoff))
+        except ValueError:
+            # HTTP dates are not worth parsing for this API
+            pass
+
+    return delay
+
+
+class RetryableStatusError(requests.exceptions.HTTPError):
+    """Raised for responses with a status that is worth retrying."""
+
+
+class ApiClient:
+    """
+    A pooled, retrying HTTP client for the job search API.
+
+    Requests go through one session, so connections are kept alive and
+    reused across pages, up to ``pool_size`` connections per host. Every
+    request has a connect and read timeout. Connection errors, timeouts and
+    429 and 5xx responses are retried with exponential backoff and full
+    jitter; a Retry-After header is honoured if it asks for a longer wait.
+
+    Attributes:
+        timeout (tuple): Connect and read timeout in seconds.
+        max_retries (int): Number of retries after the first attempt.
+        backoff (float): Base delay of the exponential backoff in seconds.
+        max_backoff (float): Upper bound of a single delay in seconds.
+        session (requests.Session): The session holding the pool.
+    """
+
+    def __init__(
+            self,
+            timeout=(5, 60),
+            max_retries=4,
+            backoff=0.25,
+            max_backoff=8,
+            pool_size=10
+    ):
+        """
+        Initialize the ApiClient instance.
+
+        Args:
+            timeout (tuple): Connect and read timeout in seconds.
+            max_retries (int): Number of retries after the first attempt.
+            backoff (float): Base delay of the exponential backoff in
+                seconds.
+            max_backoff (float): Upper bound of a single delay in seconds.
+            pool_size (int): Number of kept-alive connections per host.
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': _accept_encoding(),
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+    def get_json(self, url):
+        """
+        Request a URL and decode the JSON response, retrying on failures.
+
+        Args:
+            url (str): The URL to request.
+
+        Returns:
+            dict: The decoded response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request still fails
+                after all retries, or fails with a status that is not worth
+                retrying.
+        """
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code in RETRY_STATUS_CODES:
+                    retry_after = response.headers.get('Retry-After')
+                    raise RetryableStatusError(
+                        f"{response.status_code} {response.reason}",
+                        response=response
+                    )
+                response.raise_for_status()
+                return response.json()
+            except (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    RetryableStatusError
+            ) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = retry_delay(
+                    attempt, self.backoff, self.max_backoff, retry_after
+                )
+                reason = e if isinstance(e, RetryableStatusError) else (
+                    type(e).__name__
+                )
+                print(f"Request failed ({reason}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+
+class AsyncApiClient:
+    """
+    An asyncio variant of ApiClient for fetching many pages concurrently.
+
+    Requires the optional aiohttp package. The retry policy is the same as
+    the one of ApiClient, and all requests share one connection pool.
+
+    Attributes:
+        timeout (tuple): Connect and read timeout in seconds.
+        max_retries (int): Number of retries after the first attempt.
+        backoff (float): Base delay of the exponential backoff in seconds.
+        max_backoff (float): Upper bound of a single delay in seconds.
+        pool_size (int): Maximum number of concurrent connections.
+        metrics (RunMetrics): Metrics of the run recording the request
+            latencies, or None.
+    """
+
+    def __init__(
+            self,
+            timeout=(5, 60),
+            max_retries=4,
+            backoff=0.25,
+            max_backoff=8,
+            pool_size=10,
+            metrics=None
+    ):
+        """
+        Initialize the AsyncApiClient instance.
+
+        Args:
+            timeout (tuple): Connect and read timeout in seconds.
+            max_retries (int): Number of retries after the first attempt.
+            backoff (float): Base delay of the exponential backoff in
+                seconds.
+            max_backoff (float): Upper bound of a single delay in seconds.
+            pool_size (int): Maximum number of concurrent connections.
+            metrics (RunMetrics, optional): Metrics of the run. If given,
+                the duration of every request, including its retries, is
+                recorded as ``api_request_latency``, like JobUrlScraper does
+                for synchronous requests.
+
+        Raises:
+            ImportError: If aiohttp is not installed.
+        """
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise ImportError(
+                "AsyncApiClient requires aiohttp, install it with "
+                "'pip install aiohttp'"
+            ) from e
+
+        self._aiohttp = aiohttp
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.metrics = metrics
+
+    async def _get_json(self, session, url):
+        aiohttp = self._aiohttp
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+
+            try:
+                async with session.get(url) as response:
+                    if response.status in RETRY_STATUS_CODES:
+                        retry_after = response.headers.get('Retry-After')
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = (
+                    not isinstance(e, aiohttp.ClientResponseError)
+                    or e.status in RETRY_STATUS_CODES
+                )
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = retry_delay(
+                    attempt, self.backoff, self.max_backoff, retry_after
+                )
+                reason = getattr(e, "status", None) or type(e).__name__
+                print(f"Request failed ({reason}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def _session(self):
+        aiohttp = self._aiohttp
+        connect_timeout, read_timeout = self.timeout
+
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=connect_timeout, sock_read=read_timeout
+            ),
+            headers={
+                'Accept': 'application/json',
+                'Accept-Encoding': _accept_encoding(),
+            }
+        )
+
+    async def iter_json(
+            self,
+            keys,
+            url_for,
+            max_concurrency=4,
+            max_pending=None
+    ):
+        """
+        Fetch the JSON documents of many URLs concurrently, as they arrive.
+
+        The keys are consumed lazily: at most ``max_pending`` documents are
+        requested but not yet yielded at any time, so neither the keys nor
+        the documents pile up in memory.
+
+        Args:
+            keys (iterable): Keys identifying the documents, e.g. the first
+                item of every page.
+            url_for (callable): Builds the URL of the document of a key.
+            max_concurrency (int): Maximum number of requests in flight.
+            max_pending (int, optional): Maximum number of requested
+                documents that have not been yielded yet. Defaults to twice
+                ``max_concurrency``.
+
+        Yields:
+            tuple: ``(key, data, error)`` for every key in completion order,
+                where either ``data`` or ``error`` is None.
+        """
+        max_concurrency = max(1, max_concurrency)
+        max_pending = max(max_concurrency, max_pending or 2 * max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        keys = iter(keys)
+        pending = {}
+
+        async def fetch(session, url):
+            async with semaphore:
+                if self.metrics is None:
+                    return await self._get_json(session, url)
+                with self.metrics.timer('api_request_latency'):
+                    return await self._get_json(session, url)
+
+        async with self._session() as session:
+            try:
+                while True:
+                    for key in keys:
+                        task = asyncio.ensure_future(
+                            fetch(session, url_for(key))
+                        )
+                        pending[task] = key
+                        if len(pending) >= max_pending:
+                            break
+
+                    if not pending:
+                        return
+
+                    done, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+
+                    for task in done:
+                        key = pending.pop(task)
+                        error = task.exception()
+                        data = None if error else task.result()
+                        yield key, data, error
+            finally:
+                # The consumer stopped early, drop the remaining requests
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def imap_unordered(
+            self,
+            keys,
+            url_for,
+            max_concurrency=4,
+            max_pending=None
+    ):
+        """
+        Fetch the JSON documents of many URLs concurrently, as they arrive.
+
+        The synchronous counterpart of ``iter_json``, running its own event
+        loop, so it must not be called from a coroutine. The documents are
+        yielded while the next ones are fetched, with the same bound on the
+        pending documents.
+
+        Args:
+            keys (iterable): Keys identifying the documents, e.g. the first
+                item of every page.
+            url_for (callable): Builds the URL of the document of a key.
+            max_concurrency (int): Maximum number of requests in flight.
+            max_pending (int, optional): Maximum number of requested
+                documents that have not been yielded yet. Defaults to twice
+                ``max_concurrency``.
+
+        Yields:
+            tuple: ``(key, data, error)`` for every key in completion order,
+                where either ``data`` or ``error`` is None.
+        """
+        loop = asyncio.new_event_loop()
+        results = self.iter_json(keys, url_for, max_concurrency, max_pending)
+
+        try:
+            while True:
+                try:
+                    result = loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield result
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
@@ -0,0 +1,277 @@
+import zlib
+import numpy as np
+from src.fulltext_index import INDEXED_FIELDS, field_text, tokenize
+
+
+def job_text(job, fields=INDEXED_FIELDS):
+    """
+    Join the fields of a job that are compared for duplicates.
+
+    Args:
+        job (dict): The job data.
+        fields (iterable[str]): The fields to join.
+
+    Returns:
+        str: The text of the fields.
+    """
+    return '\n'.join(field_text(job.get(field)) for field in fields)
+
+
+def shingles(text, size=3):
+    """
+    Hash the word n-grams of a text.
+
+    The text is tokenized like the full-text index, so case, umlaut spelling
+    and punctuation do not make two ads differ.
+
+    Args:
+        text (str): The text.
+        size (int): Number of words per shingle. Texts with fewer words are
+            a single shingle.
+
+    Returns:
+        np.ndarray: The distinct 32-bit shingle hashes.
+    """
+    terms = tokenize(text)
+    if not terms:
+        return np.array([], dtype=np.uint64)
+
+    grams = {
+        ' '.join(terms[index:index + size])
+        for index in range(max(len(terms) - size + 1, 1))
+    }
+
+    return np.fromiter(
+        (zlib.crc32(gram.encode('utf-8')) for gram in grams),
+        dtype=np.uint64,
+        count=len(grams)
+    )
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of shingle sets.
+
+    The share of positions in which the signatures of two sets agree is an
+    unbiased estimate of the Jaccard similarity of the sets.
+
+    Attributes:
+        num_perm (int): Number of hash functions, the signature length.
+    """
+
+    def __init__(self, num_perm=128, seed=1):
+        """
+        Initialize the MinHasher instance.
+
+        Args:
+            num_perm (int): Number of hash functions.
+            seed (int): Seed of the hash functions. Signatures are only
+                comparable if they were computed with the same seed.
+        """
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # Multiply-shift hashing needs odd multipliers
+        self._a = rng.integers(
+            0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64
+        ) | np.uint64(1)
+        self._b = rng.integers(
+            0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64
+        )
+
+    def signature(self, hashes):
+        """
+        Compute the signature of a shingle set.
+
+        Args:
+            hashes (np.ndarray): The 32-bit shingle hashes.
+
+        Returns:
+            np.ndarray: The signature, or None for an empty set.
+        """
+        if not len(hashes):
+            return None
+
+        # The products wrap around modulo 2 ** 64, the high 32 bits of the
+        # result are the hash values
+        values = (
+            self._a[:, None] * hashes[None, :] + self._b[:, None]
+        ) >> np.uint64(32)
+
+        return values.min(axis=1)
+
+
+class DuplicateFinder:
+    """
+    Finds near-duplicate texts with MinHash and locality-sensitive hashing.
+
+    The signature of every text is split into bands, and texts sharing all
+    values of a band land in the same bucket. Only texts sharing a bucket
+    are compared, so finding duplicates takes roughly linear time instead of
+    comparing all pairs. Candidates whose estimated similarity is below the
+    threshold are discarded, and the remaining pairs are merged into
+    clusters.
+
+    Texts are added one at a time and matched against all earlier texts, so
+    duplicates can also be detected in a stream of jobs.
+
+    Attributes:
+        threshold (float): Minimum estimated Jaccard similarity of the
+            shingle sets of two duplicates.
+        bands (int): Number of LSH bands.
+        rows (int): Signature values per band.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, bands=16, seed=1):
+        """
+        Initialize the DuplicateFinder instance.
+
+        With the default of 16 bands of 8 values, a pair with a similarity
+        of 0.9 becomes a candidate with a probability of over 99.9 %, with
+        0.8 of about 95 % and with 0.4 of about 1 %.
+
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of two
+                duplicates.
+            num_perm (int): Signature length, must be divisible by bands.
+            bands (int): Number of LSH bands.
+            seed (int): Seed of the MinHash functions.
+
+        Raises:
+            ValueError: If the signature length is not divisible by the
+                number of bands.
+        """
+        if num_perm % bands:
+            raise ValueError(
+                f"num_perm ({num_perm}) must be divisible by bands ({bands})"
+            )
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._hasher = MinHasher(num_perm, seed)
+        self._buckets = {}
+        self._signatures = {}
+        self._parents = {}
+        self._order = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def _find(self, key):
+        root = key
+        while self._parents[root] != root:
+            root = self._parents[root]
+
+        # Path compression
+        while self._parents[key] != root:
+            self._parents[key], key = root, self._parents[key]
+
+        return root
+
+    def _union(self, key, other):
+        root, other_root = self._find(key), self._find(other)
+        if root == other_root:
+            return
+
+        # The earlier text stays the representative of the cluster
+        if self._order[other_root] < self._order[root]:
+            root, other_root = other_root, root
+        self._parents[other_root] = root
+
+    def add(self, key, text):
+        """
+        Add a text and match it against all texts added before.
+
+        Args:
+            key (hashable): Unique key of the text, e.g. the job code.
+            text (str): The text.
+
+        Returns:
+            hashable: Key of the first added text of the cluster the text
+                joined, or None if it is not a near-duplicate.
+        """
+        signature = self._hasher.signature(shingles(text))
+        if signature is None:
+            # Empty texts are never considered duplicates
+            return None
+
+        band_keys = [
+            (band, signature[band * self.rows:(band + 1) * self.rows]
+             .tobytes())
+            for band in range(self.bands)
+        ]
+        candidates = {
+            candidate
+            for band_key in band_keys
+            for candidate in self._buckets.get(band_key, ())
+        }
+
+        self._signatures[key] = signature
+        self._parents[key] = key
+        self._order[key] = len(self._order)
+
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, []).append(key)
+
+        for candidate in candidates:
+            if self.similarity(key, candidate) >= self.threshold:
+                self._union(key, candidate)
+
+        root = self._find(key)
+
+        return None if root == key else root
+
+    def similarity(self, key, other):
+        """
+        Estimate the Jaccard similarity of two added texts.
+
+        Args:
+            key (hashable): Key of the first text.
+            other (hashable): Key of the second text.
+
+        Returns:
+            float: The estimated similarity, between 0 and 1.
+        """
+        return float(np.mean(
+            self._signatures[key] == self._signatures[other]
+        ))
+
+    def clusters(self):
+        """
+        Group the added texts into clusters of near-duplicates.
+
+        Returns:
+            list[list]: Keys of every cluster with more than one text, in
+                order of addition, so the first key is the representative.
+        """
+        clusters = {}
+        for key in self._signatures:
+            clusters.setdefault(self._find(key), []).append(key)
+
+        return [keys for keys in clusters.values() if len(keys) > 1]
+
+
+def find_duplicate_jobs(jobs, threshold=0.8, fields=INDEXED_FIELDS):
+    """
+    Find clusters of near-duplicate jobs.
+
+    Args:
+        jobs (iterable[dict]): The job data.
+        threshold (float): Minimum estimated Jaccard similarity of the word
+            3-grams of two duplicates.
+        fields (iterable[str]): The fields that are compared.
+
+    Returns:
+        list[list[str]]: Job codes of every cluster, the first job of every
+            cluster in the order of the jobs is its representative.
+    """
+    finder = DuplicateFinder(threshold)
+
+    for job in jobs:
+        if job.get('code') and job['code'] not in finder:
+            finder.add(job['code'], job_text(job, fields))
+
+    return finder.clusters()
@@ -0,0 +1,366 @@
+import os
+import re
+import sqlite3
+import hashlib
+import unicodedata
+from datetime import datetime, timezone
+from src.snapshot_io import find_snapshot_file, iter_jobs
+
+INDEXED_FIELDS = ('tasks', 'requirements')
+
+# Umlauts are folded the way they are written without them, so 'Weißach'
+# and 'Weissach' or 'Qualität' and 'Qualitaet' give the same term
+GERMAN_FOLDING = str.maketrans({
+    'ä': 'ae',
+    'ö': 'oe',
+    'ü': 'ue',
+    'ß': 'ss',
+})
+
+# Letters and digits, keeping trailing '+' and '#' for C++ or C#
+TOKEN_PATTERN = re.compile(r'[^\W_]+[+#]*')
+
+STOPWORDS = frozenset('''
+    ab als am an auch auf aus bei bis bzw da damit dass dem den der des die
+    dies diese diesem diesen dieser doch du durch ein eine einem einen einer
+    eines einschliesslich er es etc fuer gegen hat ihr ihre im in ins ist
+    ja je jedoch kann mit nach nicht noch nur ob oder ohne sich sie sind so
+    sowie ueber um und uns unter unsere unserer unseres vom von vor waehrend
+    wie wir wird wo zu zum zur zwischen
+    a an and as at be by for from in of on or the to with
+    d m w
+'''.split())
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    modified REAL NOT NULL,
+    indexed_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS documents (
+    snapshot TEXT NOT NULL,
+    code TEXT NOT NULL,
+    title TEXT,
+    location TEXT,
+    company TEXT,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (snapshot, code)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    code TEXT NOT NULL,
+    field TEXT NOT NULL,
+    PRIMARY KEY (term, snapshot, code, field)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_document
+    ON postings (snapshot, code);
+'''
+
+
+def normalize(text):
+    """
+    Normalize text for indexing and searching.
+
+    The text is Unicode normalized, case folded and German umlauts and ß are
+    replaced by their two letter spellings.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The normalized text.
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+
+    return text.translate(GERMAN_FOLDING)
+
+
+def tokenize(text):
+    """
+    Split text into normalized index terms.
+
+    Compound words joined by hyphens or slashes, e.g. 'AUTOSAR-Kenntnisse',
+    are split into their parts, so each part can be searched on its own.
+    Stopwords are dropped.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list[str]: The terms in order of appearance, with duplicates.
+    """
+    return [
+        term
+        for term in TOKEN_PATTERN.findall(normalize(text))
+        if term not in STOPWORDS
+    ]
+
+
+def field_text(value):
+    """
+    Get the text of a job field for indexing.
+
+    Args:
+        value (list or str): The field value, a list of entries or, in
+            legacy snapshots, the string representation of the list.
+
+    Returns:
+        str: The entries separated by newlines.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return '\n'.join(str(entry) for entry in value)
+
+    # The quotes and brackets of legacy values are dropped by the tokenizer
+    return str(value)
+
+
+def _prefix_end(prefix):
+    # Smallest string greater than every string starting with the prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class FullTextIndex:
+    """
+    A persistent inverted index over the tasks and requirements of job ads.
+
+    The index maps every term to the jobs and fields it occurs in, for every
+    snapshot. It is stored in SQLite with the postings clustered by term, so
+    a query reads only the postings of its terms instead of scanning the
+    snapshots.
+
+    Snapshots are indexed incrementally: a snapshot file that did not change
+    since it was indexed is skipped, and of a changed snapshot only the jobs
+    whose tasks or requirements changed are re-indexed.
+
+    Attributes:
+        path (str): Path to the SQLite database file.
+        connection (sqlite3.Connection): Connection to the database.
+    """
+
+    def __init__(self, path):
+        """
+        Open the index, creating the database and its tables if needed.
+
+        Args:
+            path (str): Path to the SQLite database file.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def index_snapshot(self, name, path, force=False):
+        """
+        Add a snapshot to the index or bring it up to date.
+
+        Args:
+            name (str): Name of the snapshot, e.g. '20231019-dev-jobs'.
+            path (str): Path to the snapshot file.
+            force (bool): Re-index the snapshot even if the file did not
+                change since it was last indexed.
+
+        Returns:
+            dict: Number of 'added', 'updated', 'removed' and 'unchanged'
+                jobs, all zero if the snapshot was skipped.
+        """
+        counts = dict.fromkeys(('added', 'updated', 'removed', 'unchanged'), 0)
+        stat = os.stat(path)
+        indexed = self.connection.execute(
+            'SELECT size, modified FROM snapshots WHERE name = ?', (name,)
+        ).fetchone()
+
+        if (
+                not force
+                and indexed is not None
+                and indexed['size'] == stat.st_size
+                and indexed['modified'] == stat.st_mtime
+        ):
+            return counts
+
+        digests = dict(self.connection.execute(
+            'SELECT code, digest FROM documents WHERE snapshot = ?', (name,)
+        ).fetchall())
+        seen = set()
+
+        with self.connection:
+            for job in iter_jobs(path):
+                code = job.get('code')
+                if not code or code in seen:
+                    continue
+                seen.add(code)
+
+                texts = {
+                    field: field_text(job.get(field))
+                    for field in INDEXED_FIELDS
+                }
+                digest = hashlib.sha1(
+                    '\0'.join(texts.values()).encode('utf-8')
+                ).hexdigest()
+
+                if digests.get(code) == digest:
+                    counts['unchanged'] += 1
+                    continue
+
+                counts['updated' if code in digests else 'added'] += 1
+                self._remove_postings(name, code)
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO documents '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        name,
+                        code,
+                        job.get('title'),
+                        job.get('location'),
+                        job.get('company'),
+                        digest
+                    )
+                )
+                self.connection.executemany(
+                    'INSERT INTO postings VALUES (?, ?, ?, ?)',
+                    (
+                        (term, name, code, field)
+                        for field, text in texts.items()
+                        for term in set(tokenize(text))
+                    )
+                )
+
+            for code in digests.keys() - seen:
+                counts['removed'] += 1
+                self._remove_postings(name, code)
+                self.connection.execute(
+                    'DELETE FROM documents WHERE snapshot = ? AND code = ?',
+                    (name, code)
+                )
+
+            self.connection.execute(
+                'INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)',
+                (
+                    name,
+                    os.path.abspath(path),
+                    stat.st_size,
+                    stat.st_mtime,
+                    datetime.now(timezone.utc).isoformat(timespec='seconds')
+                )
+            )
+
+        return counts
+
+    def index_data_directory(self, data_path, force=False):
+        """
+        Index the snapshots of all data directories.
+
+        Args:
+            data_path (str): Directory containing one data directory per
+                snapshot.
+            force (bool): Re-index snapshots that did not change.
+
+        Returns:
+            dict: The counts returned by ``index_snapshot`` by snapshot name.
+        """
+        results = {}
+
+        for name in sorted(os.listdir(data_path)):
+            path = find_snapshot_file(os.path.join(data_path, name))
+            if path is not None:
+                results[name] = self.index_snapshot(name, path, force=force)
+
+        return results
+
+    def _remove_postings(self, snapshot, code):
+        self.connection.execute(
+            'DELETE FROM postings WHERE snapshot = ? AND code = ?',
+            (snapshot, code)
+        )
+
+    def search(self, query, snapshot=None, fields=INDEXED_FIELDS):
+        """
+        Find the jobs containing all terms of a query.
+
+        The query is tokenized like the indexed text, so case, umlaut
+        spelling and stopwords do not matter. A term ending with '*' matches
+        every term starting with it, e.g. 'entwickl*' matches 'entwicklung'
+        and 'entwickler'.
+
+        Args:
+            query (str): The search terms, e.g. 'MATLAB AUTOSAR'.
+            snapshot (str, optional): Only search this snapshot. Defaults to
+                all snapshots.
+            fields (iterable[str]): The fields to search, any of them has to
+                contain a term.
+
+        Returns:
+            list[dict]: Snapshot, code, title, location and company of every
+                matching job, latest snapshot first.
+        """
+        terms = []
+        for word in query.split():
+            prefix = word.endswith('*')
+            tokens = tokenize(word)
+            if prefix and tokens:
+                tokens[-1] += '*'
+            terms.extend(tokens)
+
+        if not terms:
+            return []
+
+        fields = tuple(fields)
+        field_marks = ', '.join('?' * len(fields))
+        selects = []
+        parameters = []
+
+        for term in dict.fromkeys(terms):
+            select = 'SELECT snapshot, code FROM postings WHERE '
+            if term.endswith('*'):
+                select += 'term >= ? AND term < ?'
+                parameters.extend((term[:-1], _prefix_end(term[:-1])))
+            else:
+                select += 'term = ?'
+                parameters.append(term)
+            select += f' AND field IN ({field_marks})'
+            parameters.extend(fields)
+            if snapshot is not None:
+                select += ' AND snapshot = ?'
+                parameters.append(snapshot)
+            selects.append(select)
+
+        rows = self.connection.execute(
+            'SELECT documents.snapshot, documents.code, title, location, '
+            'company FROM documents JOIN ('
+            + ' INTERSECT '.join(selects)
+            + ') AS matches USING (snapshot, code) '
+            'ORDER BY documents.snapshot DESC, documents.code',
+            parameters
+        )
+
+        return [dict(row) for row in rows]
+
+    def snapshots(self):
+        """
+        List the names of all indexed snapshots.
+
+        Returns:
+            list[str]: The snapshot names in ascending order.
+        """
+        rows = self.connection.execute(
+            'SELECT name FROM snapshots ORDER BY name'
+        )
+
+        return [row['name'] for row in rows]
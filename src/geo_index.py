@@ -0,0 +1,290 @@
+import os
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+
+def parse_coordinates(values):
+    """
+    Convert coordinate strings to floats.
+
+    Args:
+        values (np.ndarray): Coordinates as strings, missing values as empty
+            strings.
+
+    Returns:
+        np.ndarray: The coordinates, NaN where missing or malformed.
+    """
+    values = np.asarray(values, dtype=str)
+
+    try:
+        return np.where(values == "", "nan", values).astype(float)
+    except ValueError:
+        pass
+
+    result = np.full(len(values), np.nan)
+
+    for index, value in enumerate(values):
+        try:
+            result[index] = float(value)
+        except ValueError:
+            pass
+
+    return result
+
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Compute the great-circle distance from one point to many points.
+
+    Args:
+        lat (float): Latitude of the reference point in degrees.
+        lon (float): Longitude of the reference point in degrees.
+        lats (np.ndarray): Latitudes of the other points in degrees.
+        lons (np.ndarray): Longitudes of the other points in degrees.
+
+    Returns:
+        np.ndarray: The distances in kilometres, NaN for missing points.
+    """
+    lat = np.radians(lat)
+    lats = np.radians(lats)
+    half_dlat = (lats - lat) / 2
+    half_dlon = np.radians(np.asarray(lons) - lon) / 2
+
+    a = (
+        np.sin(half_dlat) ** 2
+        + np.cos(lat) * np.cos(lats) * np.sin(half_dlon) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+class GeoIndex:
+    """
+    A grid index over the locations of jobs.
+
+    Locations are bucketed into cells of a fixed size in degrees and stored
+    sorted by cell, so a radius query only computes distances for the
+    locations in the cells overlapping the bounding box of the circle. Jobs
+    at several sites have one entry per site. The index is saved as a NumPy
+    archive next to the snapshot it was built from.
+
+    Attributes:
+        job_ids (np.ndarray): Job ID of every location.
+        lats (np.ndarray): Latitude of every location in degrees.
+        lons (np.ndarray): Longitude of every location in degrees.
+        cell_size (float): Edge length of the grid cells in degrees.
+    """
+
+    def __init__(self, job_ids, lats, lons, cell_size=0.5):
+        """
+        Build the index.
+
+        Args:
+            job_ids (array-like): Job ID of every location.
+            lats (array-like): Latitude of every location in degrees.
+            lons (array-like): Longitude of every location in degrees.
+                Locations with a missing coordinate are dropped.
+            cell_size (float): Edge length of the grid cells in degrees.
+        """
+        job_ids = np.asarray(job_ids, dtype=str)
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        valid = ~(np.isnan(lats) | np.isnan(lons))
+
+        self.cell_size = float(cell_size)
+        self._columns = int(np.ceil(360 / self.cell_size))
+
+        cells = self._cells(lats[valid], lons[valid])
+        order = np.argsort(cells, kind="stable")
+
+        self.job_ids = job_ids[valid][order]
+        self.lats = lats[valid][order]
+        self.lons = lons[valid][order]
+        self._cell_keys = cells[order]
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    @classmethod
+    def from_locations(cls, locations, cell_size=0.5):
+        """
+        Build the index from the locations of jobs.
+
+        Args:
+            locations (dict): Lists of ``(latitude, longitude)`` pairs keyed
+                by job ID.
+            cell_size (float): Edge length of the grid cells in degrees.
+
+        Returns:
+            GeoIndex: The index.
+        """
+        entries = [
+            (job_id, lat, lon)
+            for job_id, sites in locations.items()
+            for lat, lon in sites
+        ]
+        job_ids, lats, lons = zip(*entries) if entries else ([], [], [])
+
+        return cls(job_ids, lats, lons, cell_size)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index saved with ``save``.
+
+        Args:
+            path (str): Path to the index file.
+
+        Returns:
+            GeoIndex: The index.
+        """
+        with np.load(path) as archive:
+            index = cls.__new__(cls)
+            index.job_ids = archive["job_ids"]
+            index.lats = archive["lats"]
+            index.lons = archive["lons"]
+            index.cell_size = float(archive["cell_size"])
+            index._cell_keys = archive["cell_keys"]
+
+        index._columns = int(np.ceil(360 / index.cell_size))
+
+        return index
+
+    def save(self, path):
+        """
+        Save the index.
+
+        Args:
+            path (str): Path to the index file, should end with '.npz'.
+        """
+        temp_path = f"{path}.tmp.npz"
+        np.savez(
+            temp_path,
+            job_ids=self.job_ids,
+            lats=self.lats,
+            lons=self.lons,
+            cell_size=self.cell_size,
+            cell_keys=self._cell_keys
+        )
+        os.replace(temp_path, path)
+
+    def _cells(self, lats, lons):
+        rows = np.floor((np.asarray(lats) + 90) / self.cell_size)
+        columns = np.floor((np.asarray(lons) + 180) / self.cell_size)
+
+        return (
+            rows.astype(np.int64) * self._columns
+            + columns.astype(np.int64) % self._columns
+        )
+
+    def _candidates(self, lat, lon, radius_km):
+        """
+        Get the positions of all locations in cells the circle overlaps.
+
+        Args:
+            lat (float): Latitude of the centre in degrees.
+            lon (float): Longitude of the centre in degrees.
+            radius_km (float): Radius of the circle in kilometres.
+
+        Returns:
+            np.ndarray: Positions into the location arrays.
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        min_lat = max(lat - dlat, -90)
+        max_lat = min(lat + dlat, 90)
+
+        # Longitude degrees shrink towards the poles, use the widest extent
+        widest = max(abs(min_lat), abs(max_lat))
+        cos_lat = np.cos(np.radians(widest))
+        if cos_lat <= 0 or dlat / cos_lat >= 180:
+            column_range = range(self._columns)
+        else:
+            dlon = dlat / cos_lat
+            first = int(np.floor((lon - dlon + 180) / self.cell_size))
+            last = int(np.floor((lon + dlon + 180) / self.cell_size))
+            column_range = sorted({
+                column % self._columns for column in range(first, last + 1)
+            })
+
+        first_row = int(np.floor((min_lat + 90) / self.cell_size))
+        last_row = int(np.floor((max_lat + 90) / self.cell_size))
+
+        keys = np.array(
+            [
+                row * self._columns + column
+                for row in range(first_row, last_row + 1)
+                for column in column_range
+            ],
+            dtype=np.int64
+        )
+        starts = np.searchsorted(self._cell_keys, keys, side="left")
+        ends = np.searchsorted(self._cell_keys, keys, side="right")
+
+        return np.concatenate(
+            [np.arange(start, end) for start, end in zip(starts, ends)]
+            or [np.array([], dtype=np.intp)]
+        ).astype(np.intp)
+
+    def within(self, lat, lon, radius_km):
+        """
+        Find the job locations within a radius of a point.
+
+        Args:
+            lat (float): Latitude of the point in degrees.
+            lon (float): Longitude of the point in degrees.
+            radius_km (float): Search radius in kilometres.
+
+        Returns:
+            list[tuple]: ``(job_id, latitude, longitude, distance_km)`` of
+                every location in the radius, nearest first.
+        """
+        candidates = self._candidates(lat, lon, radius_km)
+        distances = haversine_km(
+            lat, lon, self.lats[candidates], self.lons[candidates]
+        )
+        inside = distances <= radius_km
+        candidates = candidates[inside]
+        distances = distances[inside]
+        order = np.argsort(distances, kind="stable")
+
+        return [
+            (
+                str(self.job_ids[position]),
+                float(self.lats[position]),
+                float(self.lons[position]),
+                float(distance),
+            )
+            for position, distance in zip(
+                candidates[order], distances[order]
+            )
+        ]
+
+    def nearest(self, lat, lon, count=1):
+        """
+        Find the job locations nearest to a point.
+
+        The search radius starts at one cell and doubles until enough
+        locations are found, so only the cells around the point are scanned.
+
+        Args:
+            lat (float): Latitude of the point in degrees.
+            lon (float): Longitude of the point in degrees.
+            count (int): Number of locations to return.
+
+        Returns:
+            list[tuple]: Up to ``count`` tuples of ``(job_id, latitude,
+                longitude, distance_km)``, nearest first.
+        """
+        if not len(self):
+            return []
+
+        radius_km = self.cell_size * KM_PER_DEGREE
+        max_radius_km = np.pi * EARTH_RADIUS_KM
+
+        while True:
+            found = self.within(lat, lon, radius_km)
+            if len(found) >= count or radius_km >= max_radius_km:
+                return found[:count]
+            radius_km *= 2
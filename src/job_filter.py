@@ -0,0 +1,296 @@
+"""
+Vectorised filtering of job search results.
+
+The items of a search result page are loaded into columns, one NumPy array
+per requested field, and filters are evaluated as boolean masks over whole
+columns instead of item by item.
+
+A filter is a JSON expression, given under the "filter" key of
+filter_config.json:
+
+    {"field": "CareerLevel.Name", "in": ["Professionals", "Studenten"]}
+    {"field": "ParentOrganizationName", "eq": "Dr. Ing. h.c. F. Porsche AG"}
+    {"field": "PublicationStartDate", "from": "2023-10", "to": "2023-12"}
+    {"field": "PositionLocation", "within_km": 30, "lat": 48.8, "lon": 8.9}
+    {"all": [<filter>, ...]}
+    {"any": [<filter>, ...]}
+    {"not": <filter>}
+
+Fields are dotted paths into the MatchedObjectDescriptor of an item. Fields
+with several values per item, such as "JobCategory.Name", match if any of
+the values matches. Range bounds are inclusive and compared with the prefix
+of the value of the same length, so "2023-12" includes all of December.
+Radius filters take an object path with Latitude and Longitude fields and
+match items with at least one site within the given distance of the point.
+
+The legacy keys "job_functions" and "organization_name" are still supported
+and are combined with the filter expression using AND.
+"""
+import numpy as np
+from src.geo_index import haversine_km, parse_coordinates
+
+
+class SearchResultTable:
+    """
+    A columnar view of the items of a job search result.
+
+    Columns are built on first use and cached. Every column consists of a
+    string array with the values and an array with the index of the item
+    each value belongs to, so that fields with several values per item are
+    represented without padding.
+
+    Attributes:
+        descriptors (list[dict]): The MatchedObjectDescriptor of every item.
+        size (int): Number of items.
+    """
+
+    def __init__(self, items):
+        """
+        Initialize the SearchResultTable instance.
+
+        Args:
+            items (list[dict]): The SearchResultItems of a search result.
+        """
+        self.descriptors = [item["MatchedObjectDescriptor"] for item in items]
+        self.size = len(self.descriptors)
+        self._columns = {}
+
+    def column(self, field):
+        """
+        Get the values of a field for all items.
+
+        Args:
+            field (str): Dotted path into the MatchedObjectDescriptor, e.g.
+                'PositionLocation.CityName'.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The values as strings, missing
+                values as empty strings, and the item index of every value.
+        """
+        if field not in self._columns:
+            self._columns[field] = self._build_column(field)
+
+        return self._columns[field]
+
+    def scalar_column(self, field):
+        """
+        Get the first value of a field for every item.
+
+        Args:
+            field (str): Dotted path into the MatchedObjectDescriptor.
+
+        Returns:
+            np.ndarray: One string per item, empty if the item has no value.
+        """
+        values, owners = self.column(field)
+        result = np.full(self.size, "", dtype=values.dtype)
+        # Assign in reverse so that the first value of every item wins
+        result[owners[::-1]] = values[::-1]
+
+        return result
+
+    def _build_column(self, field):
+        owners = range(self.size)
+        values = self.descriptors
+
+        # Descend one path segment at a time over all items, expanding
+        # lists of objects into one entry per element
+        for key in field.split("."):
+            if all(type(value) is dict for value in values):
+                values = [value.get(key) for value in values]
+                continue
+
+            next_owners = []
+            next_values = []
+
+            for owner, value in zip(owners, values):
+                if isinstance(value, dict):
+                    next_owners.append(owner)
+                    next_values.append(value.get(key))
+                elif isinstance(value, list):
+                    for element in value:
+                        if isinstance(element, dict):
+                            next_owners.append(owner)
+                            next_values.append(element.get(key))
+
+            owners = next_owners
+            values = next_values
+
+        if any(type(value) is list for value in values):
+            list_owners = []
+            list_values = []
+
+            for owner, value in zip(owners, values):
+                if isinstance(value, list):
+                    list_owners.extend([owner] * len(value))
+                    list_values.extend(value)
+                else:
+                    list_owners.append(owner)
+                    list_values.append(value)
+
+            owners = list_owners
+            values = list_values
+
+        return (
+            np.array(
+                [
+                    value if type(value) is str
+                    else "" if value is None
+                    else str(value)
+                    for value in values
+                ],
+                dtype=str
+            ),
+            np.array(owners, dtype=np.intp),
+        )
+
+
+def _any_per_item(table, owners, value_mask):
+    """
+    Reduce a mask over the values of a column to a mask over the items.
+
+    Args:
+        table (SearchResultTable): The table the column belongs to.
+        owners (np.ndarray): The item index of every value.
+        value_mask (np.ndarray): Boolean mask over the values.
+
+    Returns:
+        np.ndarray: True for every item with at least one matching value.
+    """
+    mask = np.zeros(table.size, dtype=bool)
+    mask[owners[value_mask]] = True
+
+    return mask
+
+
+def _compile_radius_filter(expression):
+    field = expression["field"]
+    radius_km = float(expression["within_km"])
+
+    try:
+        lat = float(expression["lat"])
+        lon = float(expression["lon"])
+    except KeyError as e:
+        raise ValueError(f"Radius filter without {e}: {expression!r}")
+
+    def evaluate(table):
+        lats, owners = table.column(f"{field}.Latitude")
+        lons, _ = table.column(f"{field}.Longitude")
+        # Both columns hold one value per site, so their owners line up
+        distances = haversine_km(
+            lat, lon, parse_coordinates(lats), parse_coordinates(lons)
+        )
+        return _any_per_item(table, owners, distances <= radius_km)
+
+    return evaluate
+
+
+def _compile_field_filter(expression):
+    field = expression["field"]
+
+    if "within_km" in expression:
+        return _compile_radius_filter(expression)
+    elif "in" in expression:
+        accepted = np.array([str(value) for value in expression["in"]])
+
+        def value_mask(values):
+            return np.isin(values, accepted)
+    elif "eq" in expression:
+        expected = str(expression["eq"])
+
+        def value_mask(values):
+            return values == expected
+    elif "from" in expression or "to" in expression:
+        lower = expression.get("from")
+        upper = expression.get("to")
+
+        def value_mask(values):
+            mask = values != ""
+            if lower is not None:
+                mask &= values.astype(f"<U{len(lower)}") >= lower
+            if upper is not None:
+                mask &= values.astype(f"<U{len(upper)}") <= upper
+            return mask
+    else:
+        raise ValueError(f"Field filter without condition: {expression!r}")
+
+    def evaluate(table):
+        values, owners = table.column(field)
+        return _any_per_item(table, owners, value_mask(values))
+
+    return evaluate
+
+
+def compile_filter(expression):
+    """
+    Compile a filter expression into a function computing an item mask.
+
+    Args:
+        expression (dict): The filter expression, see the module docstring.
+
+    Returns:
+        callable: Function taking a SearchResultTable and returning a boolean
+            mask with one entry per item.
+
+    Raises:
+        ValueError: If the expression is malformed.
+    """
+    if not isinstance(expression, dict):
+        raise ValueError(f"Filter must be an object: {expression!r}")
+
+    if "all" in expression or "any" in expression:
+        combine = np.logical_and if "all" in expression else np.logical_or
+        initial = "all" in expression
+        parts = [
+            compile_filter(part)
+            for part in expression["all" if initial else "any"]
+        ]
+
+        def evaluate(table):
+            mask = np.full(table.size, initial, dtype=bool)
+            for part in parts:
+                mask = combine(mask, part(table))
+            return mask
+
+        return evaluate
+
+    if "not" in expression:
+        part = compile_filter(expression["not"])
+
+        def evaluate(table):
+            return ~part(table)
+
+        return evaluate
+
+    if "field" in expression:
+        return _compile_field_filter(expression)
+
+    raise ValueError(f"Unknown filter expression: {expression!r}")
+
+
+def filter_expression_from_config(config):
+    """
+    Build the filter expression described by a filter configuration.
+
+    Args:
+        config (dict): The loaded filter_config.json.
+
+    Returns:
+        dict: A filter expression combining the legacy keys and the "filter"
+            key with AND.
+    """
+    parts = []
+
+    if "job_functions" in config:
+        parts.append(
+            {"field": "JobCategory.Name", "in": config["job_functions"]}
+        )
+    if "organization_name" in config:
+        parts.append({
+            "field": "ParentOrganizationName",
+            "eq": config["organization_name"],
+        })
+    if "filter" in config:
+        parts.append(config["filter"])
+
+    return {"all": parts}
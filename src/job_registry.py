@@ -0,0 +1,177 @@
+import os
+import re
+import json
+from datetime import datetime, timezone
+from src.snapshot_io import iter_jobs, write_jobs
+
+
+def job_id_from_code(code):
+    """
+    Convert a job code as shown on the job ad page into the API job ID.
+
+    Args:
+        code (str): The job code, e.g. 'J000008392'.
+
+    Returns:
+        str: The job ID without leading zeros, e.g. '8392'.
+    """
+    return re.search(r'\d+', code).group().lstrip('0')
+
+
+class JobRegistry:
+    """
+    A persistent registry of the job ads known from previous runs.
+
+    For every job ID the registry records the ``PublicationStartDate``
+    reported by the search API and the time the job ad was last scraped. This
+    allows a run to crawl only the job ads that are new or were republished
+    since they were last scraped, and to merge the result into the existing
+    snapshot.
+
+    Attributes:
+        registry_file (str): Path to the JSON file backing the registry.
+        jobs (dict): Registry entries keyed by job ID, each a dictionary with
+            the keys 'publication_start_date' and 'last_scraped'.
+    """
+
+    def __init__(self, registry_file):
+        """
+        Initialize the JobRegistry instance.
+
+        Args:
+            registry_file (str): Path to the JSON file backing the registry.
+                The file is created on the first save.
+        """
+        self.registry_file = registry_file
+        self.jobs = self._load()
+
+    def _load(self):
+        """
+        Load the registry entries from the registry file.
+
+        Returns:
+            dict: Registry entries keyed by job ID, empty if the file does not
+                exist yet.
+        """
+        if not os.path.exists(self.registry_file):
+            return {}
+
+        with open(self.registry_file, 'r') as file:
+            return json.load(file)
+
+    def save(self):
+        """Write the registry entries to the registry file."""
+        temp_file = f"{self.registry_file}.tmp"
+
+        with open(temp_file, 'w') as file:
+            json.dump(self.jobs, file, indent=1, sort_keys=True)
+
+        os.replace(temp_file, self.registry_file)
+
+    def update(self, jobs):
+        """
+        Update the registry with the jobs currently listed by the API.
+
+        Jobs that are not listed anymore are removed from the registry. Jobs
+        that are new or have a different publication date than recorded are
+        marked as not scraped.
+
+        Args:
+            jobs (iterable[tuple]): ``(job_id, publication_start_date)`` pairs
+                of all currently listed jobs.
+
+        Returns:
+            list[str]: IDs of the jobs that have to be scraped, in the order
+                they were given.
+        """
+        listed_jobs = {str(job_id): date for job_id, date in jobs}
+
+        for job_id in set(self.jobs) - set(listed_jobs):
+            del self.jobs[job_id]
+
+        for job_id, publication_start_date in listed_jobs.items():
+            entry = self.jobs.get(job_id)
+
+            if (
+                entry is None
+                or entry['publication_start_date'] != publication_start_date
+            ):
+                self.jobs[job_id] = {
+                    'publication_start_date': publication_start_date,
+                    'last_scraped': None
+                }
+
+        return [
+            job_id for job_id in listed_jobs
+            if self.jobs[job_id]['last_scraped'] is None
+        ]
+
+    def reset(self):
+        """Forget all known jobs, so that every listed job is scraped again."""
+        self.jobs = {}
+
+    def mark_scraped(self, job_ids, timestamp=None):
+        """
+        Record that the given jobs have been scraped.
+
+        Args:
+            job_ids (iterable[str]): IDs of the scraped jobs. IDs that are not
+                in the registry are ignored.
+            timestamp (str, optional): ISO 8601 time of the scrape. Defaults
+                to the current UTC time.
+        """
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc).isoformat(
+                timespec='seconds'
+            )
+
+        for job_id in job_ids:
+            entry = self.jobs.get(str(job_id))
+            if entry is not None:
+                entry['last_scraped'] = timestamp
+
+    def __contains__(self, job_id):
+        return str(job_id) in self.jobs
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+def merge_snapshot(snapshot_file, delta_file, registry):
+    """
+    Merge freshly scraped jobs into an existing snapshot.
+
+    Jobs from the delta replace their previous version in the snapshot, and
+    jobs that are no longer in the registry are dropped. The scraped jobs are
+    marked as scraped in the registry. The snapshot is streamed, only the
+    delta is held in memory.
+
+    Args:
+        snapshot_file (str): Path to the snapshot of all scraped jobs. It is
+            created if it does not exist.
+        delta_file (str): Path to the snapshot with the freshly scraped jobs,
+            or None if no jobs were scraped.
+        registry (JobRegistry): The registry of currently listed jobs.
+
+    Returns:
+        int: Number of jobs in the merged snapshot.
+    """
+    delta = []
+    if delta_file is not None:
+        delta = [job for job in iter_jobs(delta_file) if job.get('code')]
+
+    scraped_ids = {job_id_from_code(job['code']) for job in delta}
+
+    def merged_jobs():
+        if os.path.exists(snapshot_file):
+            for job in iter_jobs(snapshot_file):
+                job_id = job_id_from_code(job['code'])
+                if job_id not in scraped_ids and job_id in registry:
+                    yield job
+
+        yield from delta
+
+    job_count = write_jobs(snapshot_file, merged_jobs())
+    registry.mark_scraped(scraped_ids)
+
+    return job_count
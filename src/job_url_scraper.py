@@ -1,6 +1,17 @@
+import time
 import requests
 import numpy as np
 import json
+from src.api_client import ApiClient, AsyncApiClient
+from src.geo_index import GeoIndex, parse_coordinates
+from src.job_filter import (
+    SearchResultTable,
+    compile_filter,
+    filter_expression_from_config
+)
+from src.parallel import bounded_imap_unordered
+from src.run_metrics import RunMetrics
+from utils import build_api_url, parse_api_url
 
 
 class JobUrlScraper:
@@ -11,13 +22,54 @@ class JobUrlScraper:
     based on criteria specified in a configuration file, and saves the filtered
     job IDs to an output file.
 
+    By default the whole result set is requested with a single call to the
+    URL as given. If a page size is set, the search query is decoded from the
+    URL and the results are requested page by page instead: the first page
+    reports the total number of results, the remaining pages are fetched
+    concurrently, and every page is filtered as soon as it arrives.
+
+    All requests go through a pooled ApiClient with timeouts and retries.
+    With ``use_async``, the remaining pages are fetched by an asyncio client
+    instead of a thread pool.
+
+    If a job registry is given, only the IDs of jobs that are new or were
+    republished since they were last scraped are saved.
+
+    If a geo index file is given, the coordinates of the sites of all
+    filtered jobs are kept and saved as a GeoIndex for radius and nearest
+    site queries.
+
     Attributes:
         url (str): The URL of the job search API.
         output_file (str): Path to the output file where job IDs will be saved.
         config (dict): Configuration containing filter criteria.
+        job_filter (callable): The compiled filter of the configuration.
+        page_size (int): Number of results per page, or None to fetch all
+            results with a single request.
+        max_workers (int): Number of pages fetched concurrently.
+        use_async (bool): Whether pages are fetched with AsyncApiClient.
+        client (ApiClient): The client used for synchronous requests.
+        metrics (RunMetrics): Metrics of the run, recording API request
+            latencies and the fetch and filter stages.
+        registry (JobRegistry): Registry of known jobs, or None to save the
+            IDs of all matching jobs.
+        geo_index_file (str): Path to save the GeoIndex of the filtered jobs,
+            or None to discard their coordinates.
     """
 
-    def __init__(self, url, output_file, config_file):
+    def __init__(
+            self,
+            url,
+            output_file,
+            config_file,
+            page_size=None,
+            max_workers=4,
+            registry=None,
+            geo_index_file=None,
+            use_async=False,
+            client=None,
+            metrics=None
+    ):
         """
         Initialize the JobUrlScraper instance.
 
@@ -27,10 +79,36 @@ class JobUrlScraper:
                 saved.
             config_file (str): Path to the configuration file containing
                 filter criteria.
+            page_size (int, optional): Number of results per page. If None,
+                all results are fetched with a single request.
+            max_workers (int): Number of pages fetched concurrently in paging
+                mode.
+            registry (JobRegistry, optional): Registry of known jobs. If
+                given, only new or changed job IDs are saved.
+            geo_index_file (str, optional): Path to save the GeoIndex of the
+                filtered jobs.
+            use_async (bool): Whether the remaining pages are fetched with
+                AsyncApiClient, which requires aiohttp.
+            client (ApiClient, optional): Client for synchronous requests.
+                Defaults to an ApiClient with one pooled connection per
+                worker.
+            metrics (RunMetrics, optional): Metrics of the run to record
+                into.
         """
         self.url = url
         self.output_file = output_file
         self.config = self._load_config(config_file)
+        self.job_filter = compile_filter(
+            filter_expression_from_config(self.config)
+        )
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.use_async = use_async
+        self.client = client or ApiClient(pool_size=max_workers)
+        self.metrics = metrics or RunMetrics()
+        self.registry = registry
+        self.geo_index_file = geo_index_file
+        self._locations = {}
 
     def _load_config(self, config_file):
         """
@@ -45,6 +123,24 @@ class JobUrlScraper:
         with open(config_file, 'r') as file:
             return json.load(file)
 
+    def _request_json(self, url):
+        """
+        Request a URL and decode the JSON response, retrying transient
+        errors.
+
+        Args:
+            url (str): The URL to request.
+
+        Returns:
+            dict: The decoded response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails
+                after all retries.
+        """
+        with self.metrics.timer('api_request_latency'):
+            return self.client.get_json(url)
+
     def _fetch_data_from_api(self):
         """
         Retrieve job data from the API.
@@ -53,76 +149,159 @@ class JobUrlScraper:
             dict: Job data in JSON format, or None if there's an error.
         """
         try:
-            response = requests.get(self.url)
-            response.raise_for_status()
-            return response.json()
+            return self._request_json(self.url)
         except requests.exceptions.RequestException as e:
             print("Error occurred:", e)
             return None
 
-    def _filter_job_ids(self, data):
+    def _page_url(self, first_item):
         """
-        Extract and filter job IDs based on the specified criteria.
+        Build the API URL for the page starting at the given result.
 
         Args:
-            data (dict): Job data in JSON format.
+            first_item (int): 1-based index of the first result of the page.
 
         Returns:
-            list[int]: List of filtered job IDs.
+            str: The API URL of the page.
         """
-        job_ids = []
-        desired_job_functions = self.config["job_functions"]
-        desired_organization_name = self.config["organization_name"]
+        endpoint, query = parse_api_url(self.url)
+        return build_api_url(
+            query,
+            first_item=first_item,
+            count_item=self.page_size,
+            endpoint=endpoint
+        )
 
-        for item in data["SearchResult"]["SearchResultItems"]:
-            is_desired_function = self._is_desired_job_function(
-                item, desired_job_functions
-            )
-            is_desired_org = self._is_desired_organization(
-                item, desired_organization_name
-            )
+    def _fetch_page(self, first_item):
+        """
+        Retrieve a single page of job data from the API.
 
-            if is_desired_function and is_desired_org:
-                job_ids.append(item["MatchedObjectDescriptor"]["ID"])
+        Args:
+            first_item (int): 1-based index of the first result of the page.
 
-        return job_ids
+        Returns:
+            dict: The page in JSON format.
+        """
+        return self._request_json(self._page_url(first_item))
 
-    @staticmethod
-    def _is_desired_job_function(item, desired_job_functions):
+    def _fetch_jobs_paged(self):
         """
-        Determine if a job item matches the desired job functions.
+        Fetch and filter jobs page by page.
 
-        Args:
-            item (dict): Individual job item.
-            desired_job_functions (list[str]): List of desired job functions.
+        The first page is fetched on its own to learn the total number of
+        results. The remaining pages are fetched by a bounded thread pool, or
+        the asyncio client, and each page is filtered as soon as it arrives,
+        so only a few pages per worker are held in memory at a time.
 
         Returns:
-            bool: True if the job item matches, False otherwise.
+            list[tuple]: ``(job_id, publication_start_date)`` pairs of the
+                filtered jobs in API order, or None if a page could not be
+                fetched.
         """
-        categories = item["MatchedObjectDescriptor"]["JobCategory"]
+        try:
+            first_page = self._fetch_page(1)
+        except requests.exceptions.RequestException as e:
+            print("Error occurred:", e)
+            return None
 
-        return any(
-            category["Name"] in desired_job_functions
-            for category in categories
-        )
+        total = first_page["SearchResult"]["SearchResultCountAll"]
+        page_jobs = {1: self._filter_jobs(first_page)}
+        del first_page
+
+        first_items = range(1 + self.page_size, total + 1, self.page_size)
+        print(f"Fetching {total} jobs in {len(first_items) + 1} pages...")
+
+        if self.use_async:
+            results = AsyncApiClient(
+                pool_size=self.max_workers, metrics=self.metrics
+            ).imap_unordered(first_items, self._page_url, self.max_workers)
+        else:
+            results = bounded_imap_unordered(
+                self._fetch_page, first_items, self.max_workers
+            )
+        failed_pages = 0
+
+        for first_item, page, error in results:
+            if error:
+                print(f"Error occurred on page at item {first_item}:", error)
+                failed_pages += 1
+                continue
+            page_jobs[first_item] = self._filter_jobs(page)
+
+        if failed_pages:
+            self.metrics.increment('api_page_failures', failed_pages)
+            print(f"{failed_pages} pages could not be fetched")
+            return None
 
-    @staticmethod
-    def _is_desired_organization(item, desired_organization_name):
+        # Jobs published while paging shift later pages by a few results, so
+        # the same ID may show up on two neighbouring pages.
+        jobs = {}
+        for first_item in sorted(page_jobs):
+            jobs.update(page_jobs[first_item])
+
+        return list(jobs.items())
+
+    def _filter_jobs(self, data):
         """
-        Determine if a job item belongs to the desired organization.
+        Extract and filter jobs based on the specified criteria.
+
+        The items are loaded into a columnar table and the compiled filter is
+        evaluated as a boolean mask over all items at once.
 
         Args:
-            item (dict): Individual job item.
-            desired_organization_name (str): Name of the desired organization.
+            data (dict): Job data in JSON format.
 
         Returns:
-            bool: True if the job item belongs to the desired organization,
-                False otherwise.
+            list[tuple]: ``(job_id, publication_start_date)`` pairs of the
+                filtered jobs.
+        """
+        start = time.perf_counter()
+        table = SearchResultTable(data["SearchResult"]["SearchResultItems"])
+        mask = self.job_filter(table)
+        self.metrics.record_stage(
+            'filter', time.perf_counter() - start, items=table.size
+        )
+
+        if self.geo_index_file:
+            self._collect_locations(table, mask)
+
+        return [
+            (
+                table.descriptors[index]["ID"],
+                table.descriptors[index].get("PublicationStartDate")
+            )
+            for index in np.flatnonzero(mask)
+        ]
+
+    def _collect_locations(self, table, mask):
+        """
+        Keep the site coordinates of the filtered jobs of a result table.
+
+        Args:
+            table (SearchResultTable): The search result items.
+            mask (np.ndarray): The filter mask over the items.
         """
-        descriptor = item["MatchedObjectDescriptor"]
-        org_name = descriptor["ParentOrganizationName"]
+        lats, owners = table.column("PositionLocation.Latitude")
+        lons, _ = table.column("PositionLocation.Longitude")
+        lats = parse_coordinates(lats)
+        lons = parse_coordinates(lons)
+
+        for index in np.flatnonzero(mask):
+            self._locations[table.descriptors[index]["ID"]] = []
+
+        for owner, lat, lon in zip(owners, lats, lons):
+            if mask[owner]:
+                job_id = table.descriptors[owner]["ID"]
+                self._locations[job_id].append((lat, lon))
 
-        return org_name == desired_organization_name
+    def _save_geo_index(self):
+        """Build and save the GeoIndex of all filtered jobs."""
+        geo_index = GeoIndex.from_locations(self._locations)
+        geo_index.save(self.geo_index_file)
+        print(
+            f"Saved {len(geo_index)} job locations to "
+            f"'{self.geo_index_file}'"
+        )
 
     def scrape_job_urls(self):
         """
@@ -130,11 +309,39 @@ class JobUrlScraper:
 
         Retrieves job data from the API, filters the jobs based on the criteria
         from the configuration, and saves the filtered job IDs to the specified
-        output file.
+        output file. If a registry is set, it is updated with the filtered jobs
+        and only the IDs of new or changed jobs are saved.
+
+        Returns:
+            list: The saved job IDs, or None if the job data could not be
+                fetched.
         """
-        data = self._fetch_data_from_api()
+        self._locations = {}
+
+        with self.metrics.stage('fetch_ids'):
+            if self.page_size:
+                jobs = self._fetch_jobs_paged()
+            else:
+                data = self._fetch_data_from_api()
+                jobs = self._filter_jobs(data) if data else None
 
-        if data:
-            job_ids = self._filter_job_ids(data)
-            np.save(self.output_file, np.array(job_ids))
-            print(f"Saved {len(job_ids)} job IDs to '{self.output_file}'")
+        if jobs is None:
+            self.metrics.record_stage('fetch_ids', 0, failures=1)
+            return None
+
+        self.metrics.record_stage('fetch_ids', 0, items=len(jobs))
+
+        if self.geo_index_file:
+            self._save_geo_index()
+
+        if self.registry is not None:
+            job_ids = self.registry.update(jobs)
+            self.registry.save()
+            print(f"{len(job_ids)} of {len(jobs)} jobs are new or changed")
+        else:
+            job_ids = [job_id for job_id, _ in jobs]
+
+        np.save(self.output_file, np.array(job_ids))
+        print(f"Saved {len(job_ids)} job IDs to '{self.output_file}'")
+
+        return job_ids
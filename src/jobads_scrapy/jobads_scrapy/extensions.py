@@ -0,0 +1,248 @@
+# Define here your extensions
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import logging
+import statistics
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+
+class _SlotWindow:
+    """Observations of one downloader slot since the last decision."""
+
+    def __init__(self):
+        self.latencies = []
+        self.failures = 0
+        self.throttled = 0
+        self.baseline = None
+
+    @property
+    def size(self):
+        return len(self.latencies) + self.failures
+
+    def clear(self):
+        self.latencies.clear()
+        self.failures = 0
+        self.throttled = 0
+
+
+class AdaptiveConcurrency:
+    """
+    An extension that tunes the concurrency of every download slot at
+    runtime.
+
+    Responses are observed in windows of ``JOBADS_ADAPTIVE_WINDOW`` requests
+    per slot. After each window the slot concurrency is adjusted with an
+    additive-increase, multiplicative-decrease policy:
+
+    - 429 or 503 responses, or an error rate above
+      ``JOBADS_ADAPTIVE_MAX_ERROR_RATE``, halve the concurrency.
+    - A median latency above ``JOBADS_ADAPTIVE_LATENCY_TOLERANCE`` times the
+      best recent median means the server is saturating, so the concurrency
+      is reduced by one.
+    - Otherwise the concurrency is increased by one.
+
+    The concurrency therefore climbs until latency starts to degrade and
+    then oscillates just below that point. The download delay of the slot is
+    set to the median latency divided by the concurrency, never below
+    ``DOWNLOAD_DELAY``, so that requests are paced to keep about that many
+    requests in flight. Every change is logged, and the
+    concurrency the slots settled on is logged and recorded in the stats
+    when the spider closes. Slots start at ``CONCURRENT_REQUESTS_PER_DOMAIN``
+    and never exceed ``CONCURRENT_REQUESTS``.
+
+    Settings:
+        JOBADS_ADAPTIVE_ENABLED (bool): Enable the extension.
+        JOBADS_ADAPTIVE_MIN_CONCURRENCY (int): Lower bound per slot.
+        JOBADS_ADAPTIVE_MAX_CONCURRENCY (int): Upper bound per slot.
+        JOBADS_ADAPTIVE_WINDOW (int): Requests observed per decision.
+        JOBADS_ADAPTIVE_LATENCY_TOLERANCE (float): Factor over the best
+            median latency from which latency counts as degraded.
+        JOBADS_ADAPTIVE_MAX_ERROR_RATE (float): Share of failed requests in
+            a window from which the concurrency is halved.
+    """
+
+    THROTTLE_STATUS_CODES = (429, 503)
+    BASELINE_DRIFT = 0.05
+
+    def __init__(
+            self,
+            crawler,
+            min_concurrency,
+            max_concurrency,
+            window,
+            latency_tolerance,
+            max_error_rate,
+            min_delay
+    ):
+        self.crawler = crawler
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.window = window
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.min_delay = min_delay
+        self.stats = crawler.stats
+        self._windows = {}
+        self._responded = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("JOBADS_ADAPTIVE_ENABLED"):
+            raise NotConfigured
+
+        max_concurrency = min(
+            settings.getint("JOBADS_ADAPTIVE_MAX_CONCURRENCY", 32),
+            settings.getint("CONCURRENT_REQUESTS")
+        )
+        s = cls(
+            crawler,
+            min_concurrency=settings.getint(
+                "JOBADS_ADAPTIVE_MIN_CONCURRENCY", 1
+            ),
+            max_concurrency=max_concurrency,
+            window=settings.getint("JOBADS_ADAPTIVE_WINDOW", 20),
+            latency_tolerance=settings.getfloat(
+                "JOBADS_ADAPTIVE_LATENCY_TOLERANCE", 1.5
+            ),
+            max_error_rate=settings.getfloat(
+                "JOBADS_ADAPTIVE_MAX_ERROR_RATE", 0.1
+            ),
+            min_delay=settings.getfloat("DOWNLOAD_DELAY")
+        )
+        crawler.signals.connect(
+            s.response_downloaded, signal=signals.response_downloaded
+        )
+        crawler.signals.connect(
+            s.request_left_downloader, signal=signals.request_left_downloader
+        )
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def response_downloaded(self, response, request, spider):
+        key = request.meta.get("download_slot")
+        latency = request.meta.get("download_latency")
+        if key is None:
+            return
+
+        self._responded.add(request)
+        window = self._windows.setdefault(key, _SlotWindow())
+
+        if response.status in self.THROTTLE_STATUS_CODES:
+            window.throttled += 1
+            window.failures += 1
+        elif response.status >= 500 or latency is None:
+            window.failures += 1
+        else:
+            window.latencies.append(latency)
+
+    def request_left_downloader(self, request, spider):
+        key = request.meta.get("download_slot")
+        if key is None:
+            return
+
+        if request in self._responded:
+            self._responded.discard(request)
+        else:
+            # The download failed without a response, e.g. on a timeout
+            self._windows.setdefault(key, _SlotWindow()).failures += 1
+
+        window = self._windows[key]
+        if window.size >= self.window:
+            self._adjust(key, window, spider)
+            window.clear()
+
+    def _adjust(self, key, window, spider):
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is None:
+            return
+
+        old = slot.concurrency
+        error_rate = window.failures / window.size
+        median = (
+            statistics.median(window.latencies) if window.latencies else None
+        )
+
+        if median is not None:
+            # The best median slowly rises again, so that a server that got
+            # slower for good does not keep the concurrency at the minimum
+            window.baseline = (
+                median if window.baseline is None
+                else min(median, window.baseline * (1 + self.BASELINE_DRIFT))
+            )
+
+        if window.throttled:
+            new = old // 2
+            reason = f"{window.throttled} throttled responses"
+        elif error_rate > self.max_error_rate:
+            new = old // 2
+            reason = f"error rate {error_rate:.0%}"
+        elif median is None:
+            return
+        elif median > window.baseline * self.latency_tolerance:
+            new = old - 1
+            reason = "latency degraded"
+        else:
+            new = old + 1
+            reason = "latency stable"
+
+        new = min(max(new, self.min_concurrency), self.max_concurrency)
+        if median is not None:
+            slot.delay = max(self.min_delay, median / new)
+        if new == old:
+            return
+
+        slot.concurrency = new
+        self.stats.inc_value(
+            "jobads_adaptive/increases" if new > old
+            else "jobads_adaptive/decreases"
+        )
+        logger.info(
+            "Slot %(slot)s: concurrency %(old)d -> %(new)d, delay %(delay)s "
+            "(%(reason)s, median latency %(median)s, best %(best)s, errors "
+            "%(failures)d/%(size)d)",
+            {
+                "slot": key,
+                "old": old,
+                "new": new,
+                "delay": self._format_latency(slot.delay),
+                "reason": reason,
+                "median": self._format_latency(median),
+                "best": self._format_latency(window.baseline),
+                "failures": window.failures,
+                "size": window.size,
+            },
+            extra={"spider": spider},
+        )
+
+    @staticmethod
+    def _format_latency(latency):
+        return "n/a" if latency is None else f"{latency * 1000:.0f} ms"
+
+    def spider_closed(self, spider):
+        slots = self.crawler.engine.downloader.slots
+
+        for key in self._windows:
+            slot = slots.get(key)
+            if slot is None:
+                continue
+            self.stats.set_value(
+                f"jobads_adaptive/concurrency/{key}",
+                slot.concurrency
+            )
+            logger.info(
+                "Slot %(slot)s settled at concurrency %(concurrency)d, delay "
+                "%(delay)s",
+                {
+                    "slot": key,
+                    "concurrency": slot.concurrency,
+                    "delay": self._format_latency(slot.delay),
+                },
+                extra={"spider": spider},
+            )
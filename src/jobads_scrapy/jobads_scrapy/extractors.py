@@ -0,0 +1,76 @@
+# Single-pass extraction of job ad fields from a job ad page.
+#
+# The selectors are compiled once at import time and evaluated directly on
+# the lxml document that Scrapy already parsed for the response.
+
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
+
+_translator = HTMLTranslator()
+
+
+def _compile_css(query):
+    return etree.XPath(_translator.css_to_xpath(query), smart_strings=False)
+
+
+def _compile_xpath(query):
+    return etree.XPath(query, smart_strings=False)
+
+
+TITLE_XPATH = _compile_css("h1.margin-bottom-gutter::text")
+BASE_INFO_XPATH = _compile_css("span.jobad-base-info-content::text")
+TASKS_XPATH = _compile_xpath('//*[@id="aria-panel-task"]/div/ul/li/span')
+REQUIREMENTS_XPATH = _compile_xpath(
+    '//*[@id="aria-panel-your-profile"]/div/ul/li/span'
+)
+TEXT_XPATH = _compile_xpath("text()")
+
+# Order of the values in the base info block of a job ad page
+BASE_INFO_FIELDS = ("code", "entry_type", "location", "company")
+
+
+def extract_job_ad(response):
+    """
+    Extract all job ad fields from a job ad page in a single pass.
+
+    Fields that are missing from the page are returned as None, or as an
+    empty list for tasks and requirements.
+
+    Args:
+        response (scrapy.http.Response): The response object.
+
+    Returns:
+        dict: The extracted job ad data.
+    """
+    root = response.selector.root
+
+    title = TITLE_XPATH(root)
+    base_info = BASE_INFO_XPATH(root)
+    base_info.extend([None] * (len(BASE_INFO_FIELDS) - len(base_info)))
+
+    job_ad = {"title": title[0] if title else None}
+    job_ad.update(zip(BASE_INFO_FIELDS, base_info))
+    job_ad["tasks"] = _extract_list(root, TASKS_XPATH)
+    job_ad["requirements"] = _extract_list(root, REQUIREMENTS_XPATH)
+
+    return job_ad
+
+
+def _extract_list(root, xpath):
+    """
+    Extract the first text node of every list entry matched by an XPath.
+
+    Args:
+        root (lxml.etree._Element): The document root.
+        xpath (lxml.etree.XPath): Compiled XPath matching the list entries.
+
+    Returns:
+        list: The texts of the list entries, None for entries without text.
+    """
+    texts = []
+
+    for element in xpath(root):
+        text = TEXT_XPATH(element)
+        texts.append(text[0] if text else None)
+
+    return texts
@@ -3,10 +3,45 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 
-import scrapy
+import sys
+from dataclasses import dataclass, field
 
+# Fields with few distinct values, shared by many job ads
+INTERNED_FIELDS = ("entry_type", "location", "company")
 
-class JobadsScrapyItem(scrapy.Item):
-    # define the fields for your item here like:
-    # name = scrapy.Field()
-    pass
+
+@dataclass(slots=True)
+class JobAd:
+    """
+    A job ad as scraped from its job ad page, in a compact layout.
+
+    The attributes are stored in slots instead of a per-item dictionary,
+    the lists are stored as tuples and the values of ``INTERNED_FIELDS`` are
+    interned, so all job ads of e.g. the same company share one string. The
+    item works with the Scrapy feed exports and pipelines like any other
+    item type.
+
+    Attributes:
+        title (str): Title of the job ad.
+        code (str): Job code, e.g. 'J000008392'.
+        entry_type (str): Entry level, e.g. 'Berufserfahrene'.
+        location (str): Location of the job.
+        company (str): Company offering the job.
+        tasks (tuple[str]): The tasks of the job.
+        requirements (tuple[str]): The requirements of the job.
+    """
+    title: str = None
+    code: str = None
+    entry_type: str = None
+    location: str = None
+    company: str = None
+    tasks: tuple = field(default=())
+    requirements: tuple = field(default=())
+
+    def __post_init__(self):
+        for name in INTERNED_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, str):
+                setattr(self, name, sys.intern(value))
+        self.tasks = tuple(self.tasks or ())
+        self.requirements = tuple(self.requirements or ())
@@ -3,7 +3,17 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+import re
+import json
+import time
+import shutil
+
 from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
@@ -101,3 +111,396 @@ class JobadsScrapyDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+def observe_latency(stats, name, value, buckets):
+    """
+    Record a latency in a histogram kept in the crawler stats.
+
+    The number of values per bucket is stored under
+    ``jobads_metrics/<name>/le/<bound>``, not cumulative, together with
+    ``jobads_metrics/<name>/sum`` and ``jobads_metrics/<name>/count``.
+
+    Args:
+        stats (scrapy.statscollectors.StatsCollector): The crawler stats.
+        name (str): Name of the histogram.
+        value (float): The latency in seconds.
+        buckets (list[float]): Upper bounds of the buckets, ascending. Values
+            above the last bound are counted in the ``inf`` bucket.
+    """
+    bound = next((bound for bound in buckets if value <= bound), "inf")
+    stats.inc_value(f"jobads_metrics/{name}/le/{bound}")
+    stats.inc_value(f"jobads_metrics/{name}/sum", value, start=0.0)
+    stats.inc_value(f"jobads_metrics/{name}/count")
+
+
+def latency_buckets(settings):
+    """
+    Read the bucket bounds of the latency histograms from the settings.
+
+    Args:
+        settings (scrapy.settings.Settings): The crawler settings.
+
+    Returns:
+        list[float]: The bounds in seconds, ascending.
+    """
+    return sorted(
+        float(bound)
+        for bound in settings.getlist("JOBADS_METRICS_LATENCY_BUCKETS")
+    )
+
+
+class JobAdsDownloadMetricsMiddleware:
+    """
+    A downloader middleware that records download metrics in the stats.
+
+    For every downloaded response the download latency is added to the
+    ``download_latency`` histogram and the body size to
+    ``jobads_metrics/download_bytes``. Responses served from the HTTP cache
+    are counted as ``jobads_metrics/cached_responses`` instead, and failed
+    downloads as ``jobads_metrics/download_failures``.
+
+    Settings:
+        JOBADS_METRICS_ENABLED (bool): Enable the metrics middlewares.
+        JOBADS_METRICS_LATENCY_BUCKETS (list[float]): Upper bounds in
+            seconds of the latency histogram buckets.
+    """
+
+    def __init__(self, stats, buckets):
+        self.stats = stats
+        self.buckets = buckets
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("JOBADS_METRICS_ENABLED"):
+            raise NotConfigured
+        return cls(crawler.stats, latency_buckets(crawler.settings))
+
+    def process_response(self, request, response, spider):
+        latency = request.meta.get("download_latency")
+
+        if latency is None or "cached" in response.flags:
+            self.stats.inc_value("jobads_metrics/cached_responses")
+        else:
+            observe_latency(
+                self.stats, "download_latency", latency, self.buckets
+            )
+            self.stats.inc_value(
+                "jobads_metrics/download_bytes", len(response.body)
+            )
+
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self.stats.inc_value("jobads_metrics/download_failures")
+
+
+class JobAdsParseMetricsMiddleware:
+    """
+    A spider middleware that records the time spent in spider callbacks.
+
+    The callback output is consumed lazily by Scrapy, so only the time
+    spent producing each result is measured, not the time Scrapy spends
+    handling it. The total per response is added to the ``parse_latency``
+    histogram, and callbacks that raise are counted as
+    ``jobads_metrics/parse_failures``.
+
+    Settings:
+        JOBADS_METRICS_ENABLED (bool): Enable the metrics middlewares.
+        JOBADS_METRICS_LATENCY_BUCKETS (list[float]): Upper bounds in
+            seconds of the latency histogram buckets.
+    """
+
+    def __init__(self, stats, buckets):
+        self.stats = stats
+        self.buckets = buckets
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("JOBADS_METRICS_ENABLED"):
+            raise NotConfigured
+        return cls(crawler.stats, latency_buckets(crawler.settings))
+
+    def process_spider_output(self, response, result, spider):
+        elapsed = 0.0
+        results = iter(result)
+
+        while True:
+            start = time.perf_counter()
+            try:
+                output = next(results)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            yield output
+
+        observe_latency(
+            self.stats, "parse_latency", elapsed, self.buckets
+        )
+
+    async def process_spider_output_async(self, response, result, spider):
+        elapsed = 0.0
+        results = result.__aiter__()
+
+        while True:
+            start = time.perf_counter()
+            try:
+                output = await results.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            yield output
+
+        observe_latency(
+            self.stats, "parse_latency", elapsed, self.buckets
+        )
+
+    def process_spider_exception(self, response, exception, spider):
+        self.stats.inc_value("jobads_metrics/parse_failures")
+
+
+class JobAdsHttpCacheMiddleware:
+    """
+    A downloader middleware that keeps job ad responses in an on-disk cache.
+
+    Cached responses younger than the configured TTL are served without
+    contacting the server. Older responses are revalidated with a conditional
+    request using their ETag and Last-Modified headers; a 304 answer is served
+    from the cache and refreshes the entry. When the spider closes, entries
+    that have not been validated within the maximum age are evicted, followed
+    by the least recently validated entries until the cache fits into the
+    maximum size.
+
+    Only GET requests whose URL matches ``JOBADS_HTTPCACHE_URL_PATTERN`` are
+    cached. Requests with ``dont_cache`` set in their meta bypass the cache,
+    and requests with ``jobads_revalidate`` set are always revalidated, so
+    that a job ad the job registry reports as changed is not served from a
+    response cached before the change.
+
+    Settings:
+        JOBADS_HTTPCACHE_ENABLED (bool): Enable the middleware.
+        JOBADS_HTTPCACHE_DIR (str): Cache directory, relative to the project
+            data directory (``.scrapy``) unless absolute.
+        JOBADS_HTTPCACHE_TTL (int): Seconds a cached response is served
+            without revalidation.
+        JOBADS_HTTPCACHE_MAX_AGE (int): Seconds after the last validation
+            until an entry is evicted. 0 disables age-based eviction.
+        JOBADS_HTTPCACHE_MAX_SIZE (int): Maximum cache size in bytes. 0
+            disables size-based eviction.
+        JOBADS_HTTPCACHE_URL_PATTERN (str): Regular expression matched
+            against request URLs to select the cached requests.
+    """
+
+    META_FILE = "meta.json"
+    BODY_FILE = "body"
+
+    def __init__(
+            self,
+            cache_dir,
+            ttl,
+            max_age,
+            max_size,
+            url_pattern,
+            fingerprinter,
+            stats
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_size = max_size
+        self.url_pattern = re.compile(url_pattern)
+        self.fingerprinter = fingerprinter
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("JOBADS_HTTPCACHE_ENABLED"):
+            raise NotConfigured
+
+        s = cls(
+            cache_dir=data_path(
+                settings.get("JOBADS_HTTPCACHE_DIR", "jobads-httpcache"),
+                createdir=True
+            ),
+            ttl=settings.getint("JOBADS_HTTPCACHE_TTL", 0),
+            max_age=settings.getint("JOBADS_HTTPCACHE_MAX_AGE", 0),
+            max_size=settings.getint("JOBADS_HTTPCACHE_MAX_SIZE", 0),
+            url_pattern=settings.get(
+                "JOBADS_HTTPCACHE_URL_PATTERN", r"index\.php\?ac=jobad&id="
+            ),
+            fingerprinter=crawler.request_fingerprinter,
+            stats=crawler.stats
+        )
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_request(self, request, spider):
+        if not self._is_cacheable(request):
+            return None
+
+        entry_dir = self._entry_dir(request)
+        meta = self._load_meta(entry_dir)
+        if meta is None:
+            self.stats.inc_value("jobads_httpcache/miss")
+            return None
+
+        if request.meta.get("jobads_revalidate", False):
+            self.stats.inc_value("jobads_httpcache/forced_revalidation")
+        elif time.time() - meta["validated_at"] < self.ttl:
+            self.stats.inc_value("jobads_httpcache/hit")
+            return self._load_response(entry_dir, meta, ["cached"])
+        else:
+            self.stats.inc_value("jobads_httpcache/stale")
+
+        headers = Headers(meta["headers"])
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+
+        if etag:
+            request.headers["If-None-Match"] = etag
+        if last_modified:
+            request.headers["If-Modified-Since"] = last_modified
+
+        return None
+
+    def process_response(self, request, response, spider):
+        if "cached" in response.flags or not self._is_cacheable(request):
+            return response
+
+        entry_dir = self._entry_dir(request)
+
+        if response.status == 304:
+            meta = self._load_meta(entry_dir)
+            if meta is None:
+                return response
+
+            meta["validated_at"] = time.time()
+            self._write_file(entry_dir, self.META_FILE, json.dumps(meta))
+            self.stats.inc_value("jobads_httpcache/revalidated")
+            return self._load_response(entry_dir, meta, ["cached"])
+
+        if response.status == 200:
+            self._store_response(entry_dir, response)
+            self.stats.inc_value("jobads_httpcache/store")
+
+        return response
+
+    def spider_closed(self, spider):
+        removed, size = self._evict()
+        self.stats.set_value("jobads_httpcache/evicted", removed)
+        self.stats.set_value("jobads_httpcache/size", size)
+        spider.logger.info(
+            "HTTP cache holds %d bytes after evicting %d entries",
+            size,
+            removed
+        )
+
+    def _is_cacheable(self, request):
+        return (
+            request.method == "GET"
+            and not request.meta.get("dont_cache", False)
+            and self.url_pattern.search(request.url) is not None
+        )
+
+    def _entry_dir(self, request):
+        key = self.fingerprinter.fingerprint(request).hex()
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _load_meta(self, entry_dir):
+        try:
+            with open(os.path.join(entry_dir, self.META_FILE), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _load_response(self, entry_dir, meta, flags):
+        with open(os.path.join(entry_dir, self.BODY_FILE), "rb") as file:
+            body = file.read()
+
+        headers = Headers(meta["headers"])
+        respcls = responsetypes.from_args(
+            headers=headers, url=meta["url"], body=body
+        )
+        return respcls(
+            url=meta["url"],
+            status=meta["status"],
+            headers=headers,
+            body=body,
+            flags=flags
+        )
+
+    def _store_response(self, entry_dir, response):
+        meta = {
+            "url": response.url,
+            "status": response.status,
+            "headers": {
+                key.decode("latin1"): [
+                    value.decode("latin1") for value in values
+                ]
+                for key, values in response.headers.items()
+            },
+            "validated_at": time.time(),
+        }
+
+        os.makedirs(entry_dir, exist_ok=True)
+        self._write_file(entry_dir, self.BODY_FILE, response.body)
+        self._write_file(entry_dir, self.META_FILE, json.dumps(meta))
+
+    @staticmethod
+    def _write_file(entry_dir, name, content):
+        path = os.path.join(entry_dir, name)
+        mode = "wb" if isinstance(content, bytes) else "w"
+
+        with open(f"{path}.tmp", mode) as file:
+            file.write(content)
+        os.replace(f"{path}.tmp", path)
+
+    def _evict(self):
+        """
+        Remove expired entries and shrink the cache to its maximum size.
+
+        Returns:
+            tuple[int, int]: Number of removed entries and the remaining cache
+                size in bytes.
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                meta = self._load_meta(entry_dir)
+                expired = meta is None or (
+                    self.max_age and now - meta["validated_at"] > self.max_age
+                )
+
+                if expired:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    removed += 1
+                    continue
+
+                size = sum(
+                    entry.stat().st_size for entry in os.scandir(entry_dir)
+                )
+                entries.append((meta["validated_at"], size, entry_dir))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+
+        if self.max_size:
+            entries.sort()
+            for _, entry_size, entry_dir in entries:
+                if size <= self.max_size:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                size -= entry_size
+                removed += 1
+
+        return removed, size
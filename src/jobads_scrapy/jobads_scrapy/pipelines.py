@@ -4,10 +4,205 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 
+import abc
+import sys
+from datetime import date
+
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from scrapy.exceptions import DropItem, NotConfigured
+from twisted.internet import task
+
+from jobads_scrapy.items import INTERNED_FIELDS
+from jobads_scrapy.store import JobStore
+
+
+def normalize_text(text):
+    """
+    Collapse all runs of whitespace in a text to single spaces.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        str: The normalized text, None if it is empty.
+    """
+    return " ".join(text.split()) or None
 
 
 class JobadsScrapyPipeline:
     def process_item(self, item, spider):
         return item
+
+
+class JobAdValidationPipeline:
+    """
+    An item pipeline that normalizes job ads and drops incomplete ones.
+
+    Whitespace in all text fields is collapsed, entries of list fields
+    without text are removed, and the values of fields with few distinct
+    values are interned. Items missing a required field are dropped and
+    counted in the ``jobads/invalid_items`` stat.
+
+    Settings:
+        JOBADS_REQUIRED_FIELDS (list[str]): Fields every job ad must have.
+    """
+
+    def __init__(self, required_fields, stats=None):
+        self.required_fields = tuple(required_fields)
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            required_fields=crawler.settings.getlist(
+                "JOBADS_REQUIRED_FIELDS", ["code", "title"]
+            ),
+            stats=crawler.stats
+        )
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+
+        for name, value in adapter.items():
+            if isinstance(value, str):
+                value = normalize_text(value)
+                if value is not None and name in INTERNED_FIELDS:
+                    value = sys.intern(value)
+                adapter[name] = value
+            elif isinstance(value, (list, tuple)):
+                adapter[name] = type(value)(
+                    text
+                    for text in (
+                        normalize_text(entry)
+                        for entry in value
+                        if isinstance(entry, str)
+                    )
+                    if text is not None
+                )
+
+        missing = [
+            name for name in self.required_fields if not adapter.get(name)
+        ]
+        if missing:
+            if self.stats is not None:
+                self.stats.inc_value("jobads/invalid_items")
+            raise DropItem(
+                f"Job ad {adapter.get('code')} is missing {', '.join(missing)}"
+            )
+
+        return item
+
+
+class BatchingPipeline(abc.ABC):
+    """
+    Base class for item pipelines that write items in batches.
+
+    Items are buffered and handed to ``write_batch`` once ``batch_size``
+    items are buffered, every ``max_delay`` seconds while items are
+    buffered, and when the spider closes. Large crawls thus write few large
+    batches, while slow crawls still write their items without much delay.
+
+    Subclasses implement ``write_batch`` and call the ``open_spider`` and
+    ``close_spider`` methods of this class if they override them.
+
+    Attributes:
+        batch_size (int): Maximum number of buffered items.
+        max_delay (float): Maximum number of seconds an item stays buffered,
+            None to only write batches by size.
+        buffer (list): The buffered items.
+    """
+
+    def __init__(self, batch_size=500, max_delay=None):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.buffer = []
+        self._timer = None
+
+    def open_spider(self, spider):
+        if self.max_delay:
+            self._timer = task.LoopingCall(self._flush)
+            self._timer.start(self.max_delay, now=False)
+
+    def close_spider(self, spider):
+        if self._timer is not None and self._timer.running:
+            self._timer.stop()
+        self._flush()
+
+    def process_item(self, item, spider):
+        self.buffer.append(item)
+
+        if len(self.buffer) >= self.batch_size:
+            self._flush()
+
+        return item
+
+    @abc.abstractmethod
+    def write_batch(self, items):
+        """
+        Write a batch of items.
+
+        Args:
+            items (list): The items, in the order they were scraped.
+        """
+
+    def _flush(self):
+        if self.buffer:
+            items, self.buffer = self.buffer, []
+            self.write_batch(items)
+
+
+class JobStorePipeline(BatchingPipeline):
+    """
+    An item pipeline that writes scraped job ads into a SQLite job store.
+
+    Items are buffered and written in batches, each batch in a single
+    transaction. Every job is upserted on its code and recorded in the
+    history of the current snapshot.
+
+    Settings:
+        JOBADS_STORE_PATH (str): Path to the SQLite database. The pipeline
+            is disabled if empty.
+        JOBADS_SNAPSHOT (str): Name of the snapshot the crawl belongs to.
+            Defaults to the current date as YYYYMMDD.
+        JOBADS_STORE_BATCH_SIZE (int): Maximum number of items per
+            transaction.
+        JOBADS_STORE_MAX_DELAY (float): Maximum number of seconds before a
+            scraped item is written. 0 to only write full batches.
+    """
+
+    def __init__(self, store_path, snapshot, batch_size, max_delay=None):
+        super().__init__(batch_size, max_delay)
+        self.store_path = store_path
+        self.snapshot = snapshot
+        self.store = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        store_path = settings.get("JOBADS_STORE_PATH")
+        if not store_path:
+            raise NotConfigured
+
+        return cls(
+            store_path=store_path,
+            snapshot=(
+                settings.get("JOBADS_SNAPSHOT")
+                or date.today().strftime("%Y%m%d")
+            ),
+            batch_size=settings.getint("JOBADS_STORE_BATCH_SIZE", 500),
+            max_delay=settings.getfloat("JOBADS_STORE_MAX_DELAY", 10)
+        )
+
+    def open_spider(self, spider):
+        self.store = JobStore(self.store_path)
+        super().open_spider(spider)
+
+    def close_spider(self, spider):
+        super().close_spider(spider)
+        self.store.close()
+
+    def write_batch(self, items):
+        self.store.upsert_jobs(
+            [ItemAdapter(item).asdict() for item in items], self.snapshot
+        )
@@ -7,6 +7,8 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+
 BOT_NAME = "jobads_scrapy"
 
 SPIDER_MODULES = ["jobads_scrapy.spiders"]
@@ -20,15 +22,17 @@ NEWSPIDER_MODULE = "jobads_scrapy.spiders"
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-#CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS = 32
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
 #DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
+CONCURRENT_REQUESTS_PER_DOMAIN = 4
 #CONCURRENT_REQUESTS_PER_IP = 16
+# The per domain limit is only the start value, AdaptiveConcurrency tunes it
+# at runtime
 
 # Disable cookies (enabled by default)
 #COOKIES_ENABLED = False
@@ -44,27 +48,69 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
+SPIDER_MIDDLEWARES = {
 #    "jobads_scrapy.middlewares.JobadsScrapySpiderMiddleware": 543,
-#}
+    "jobads_scrapy.middlewares.JobAdsParseMetricsMiddleware": 950,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
+DOWNLOADER_MIDDLEWARES = {
 #    "jobads_scrapy.middlewares.JobadsScrapyDownloaderMiddleware": 543,
-#}
+    "jobads_scrapy.middlewares.JobAdsHttpCacheMiddleware": 900,
+    "jobads_scrapy.middlewares.JobAdsDownloadMetricsMiddleware": 950,
+}
+
+# Record download and parse latency histograms, downloaded bytes and
+# failures in the crawl stats for the run report
+JOBADS_METRICS_ENABLED = True
+# Upper bounds in seconds of the latency histogram buckets. The pipeline sets
+# the buckets of its run report, run_metrics.LATENCY_BUCKETS; without any,
+# only the count and sum of the latencies are recorded
+JOBADS_METRICS_LATENCY_BUCKETS = []
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
+EXTENSIONS = {
 #    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+    "jobads_scrapy.extensions.AdaptiveConcurrency": 500,
+}
+
+# Adjust the concurrency per domain from observed latency, errors and
+# 429/503 responses instead of tuning the limits above by hand
+JOBADS_ADAPTIVE_ENABLED = True
+JOBADS_ADAPTIVE_MIN_CONCURRENCY = 1
+JOBADS_ADAPTIVE_MAX_CONCURRENCY = 32
+JOBADS_ADAPTIVE_WINDOW = 20
+JOBADS_ADAPTIVE_LATENCY_TOLERANCE = 1.5
+JOBADS_ADAPTIVE_MAX_ERROR_RATE = 0.1
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
+ITEM_PIPELINES = {
 #    "jobads_scrapy.pipelines.JobadsScrapyPipeline": 300,
-#}
+    "jobads_scrapy.pipelines.JobAdValidationPipeline": 300,
+    "jobads_scrapy.pipelines.JobStorePipeline": 400,
+}
+
+# URL of the job ad pages without the job ad ID, defaults to the base_url of
+# the spider
+JOBADS_BASE_URL = None
+
+# Job ads missing one of these fields are dropped
+JOBADS_REQUIRED_FIELDS = ["code", "title"]
+
+# Store all scraped job ads with their snapshot history in a SQLite database
+# in the data directory of the repository
+JOBADS_STORE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "data", "jobs.sqlite3"
+)
+# Name of the snapshot the crawl belongs to, defaults to the current date
+JOBADS_SNAPSHOT = None
+JOBADS_STORE_BATCH_SIZE = 500
+# Seconds after which buffered job ads are written even if the batch is not
+# full, 0 to only write full batches
+JOBADS_STORE_MAX_DELAY = 10
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -87,6 +133,15 @@ ROBOTSTXT_OBEY = True
 #HTTPCACHE_IGNORE_HTTP_CODES = []
 #HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 
+# Keep job ad pages in an on-disk cache and revalidate them with
+# ETag/Last-Modified once they are older than the TTL
+JOBADS_HTTPCACHE_ENABLED = True
+JOBADS_HTTPCACHE_DIR = "jobads-httpcache"
+JOBADS_HTTPCACHE_TTL = 12 * 60 * 60
+JOBADS_HTTPCACHE_MAX_AGE = 30 * 24 * 60 * 60
+JOBADS_HTTPCACHE_MAX_SIZE = 512 * 1024 * 1024
+JOBADS_HTTPCACHE_URL_PATTERN = r"index\.php\?ac=jobad&id="
+
 # Set settings whose default value is deprecated to a future-proof value
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
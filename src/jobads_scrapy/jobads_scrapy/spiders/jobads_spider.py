@@ -1,51 +1,177 @@
+import os
+import socket
+import asyncio
+from urllib.parse import urlsplit
+
 import scrapy
 import numpy as np
+from scrapy import signals
+
+from jobads_scrapy.extractors import extract_job_ad
+from jobads_scrapy.items import JobAd
+from jobads_scrapy.work_queue import WorkQueue
 
 
 class JobAdsSpider(scrapy.Spider):
     """
     This scrapy spider crawls job ads of the defined urls.
 
+    The job ad IDs are either read from an input file or claimed in batches
+    from a work queue shared with other spider processes. In queue mode, an
+    ID is marked done once its job ad was scraped and failed if it could
+    not be downloaded, and the IDs still leased are returned to the queue
+    when the spider closes.
+
+    The IDs are those of the jobs the job registry reports as new or changed,
+    so their requests set ``jobads_revalidate`` and are never served from
+    the HTTP cache without asking the server whether the page changed.
+
+    The job ad pages are requested from ``base_url`` followed by the job ad
+    ID. The JOBADS_BASE_URL setting replaces it, e.g. to crawl a local
+    stand-in of the portal, and the allowed domain follows it.
+
     Args:
         scrapy.Spider: The base class for the spider.
 
     Yields:
-        dict: A dictionary containing the extracted job ad data.
+        JobAd: The extracted job ad data.
     """
     name = "job_ads"
     allowed_domains = ["jobs.porsche.com"]
-
-    def __init__(self, inputfile=None, *args, **kwargs):
+    base_url = "https://jobs.porsche.com/index.php?ac=jobad&id="
+    # Seconds between checks for retried IDs while requests are in flight
+    queue_poll_interval = 1
+
+    def __init__(
+            self,
+            inputfile=None,
+            queue=None,
+            worker=None,
+            batch_size=100,
+            *args,
+            **kwargs
+    ):
         """
         Initialize the spider with optional input file.
 
         Args:
             inputfile (str, optional): Path to the input file containing job ad
                 IDs.
+            queue (str, optional): Path to a WorkQueue database to claim job
+                ad IDs from instead of reading the input file.
+            worker (str, optional): Name of the worker in the queue. Defaults
+                to the host name and process ID.
+            batch_size (int): Number of IDs claimed from the queue at once.
             *args: Variable length argument list.
             **kwargs: Arbitrary keyword arguments.
-
-        Attributes:
-            start_urls (list): List of start URLs generated from the input
-                file.
         """
         super().__init__(*args, **kwargs)
-        self.start_urls = self._generate_start_urls(inputfile)
-
-    @staticmethod
-    def _generate_start_urls(inputfile):
+        self.inputfile = inputfile
+        self.queue_file = queue
+        self.worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = int(batch_size)
+        self.queue = None
+        self._completed = []
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        base_url = crawler.settings.get("JOBADS_BASE_URL")
+        if base_url:
+            spider.base_url = base_url
+            spider.allowed_domains = [urlsplit(base_url).hostname]
+        crawler.signals.connect(
+            spider._job_finished, signal=signals.item_scraped
+        )
+        crawler.signals.connect(
+            spider._job_finished, signal=signals.item_dropped
+        )
+
+        return spider
+
+    def _generate_start_urls(self, inputfile):
         """
         Generate start URLs from the input file.
 
         Args:
             inputfile (str): Path to the input file containing job ad IDs.
 
-        Returns:
-            list: List of start URLs.
+        Yields:
+            str: The next start URL.
+        """
+        for item in np.load(inputfile):
+            yield self.base_url + str(item)
+
+    async def start(self):
         """
-        ids = np.load(inputfile)
-        base_url = 'https://jobs.porsche.com/index.php?ac=jobad&id='
-        return [base_url + str(item) for item in ids]
+        Generate the job ad requests, lazily as the crawl needs them.
+
+        Yields:
+            scrapy.Request: The next job ad request.
+        """
+        if self.queue_file is None:
+            for url in self._generate_start_urls(self.inputfile):
+                yield scrapy.Request(
+                    url, dont_filter=True, meta={"jobads_revalidate": True}
+                )
+            return
+
+        self.queue = WorkQueue(self.queue_file)
+
+        while True:
+            self._flush_completed()
+            job_ids = self.queue.claim(self.worker, self.batch_size)
+            if not job_ids:
+                # Failed requests still in flight go back to the queue, so
+                # stop only once none of the claimed IDs are left
+                if not self.queue.leased_by(self.worker):
+                    return
+                await asyncio.sleep(self.queue_poll_interval)
+                continue
+
+            for job_id in job_ids:
+                yield scrapy.Request(
+                    self.base_url + job_id,
+                    errback=self._job_failed,
+                    dont_filter=True,
+                    meta={"job_id": job_id, "jobads_revalidate": True}
+                )
+
+    def _job_finished(self, item, response, spider):
+        job_id = response.meta.get("job_id")
+        if self.queue is None or job_id is None:
+            return
+
+        self._completed.append(job_id)
+        if len(self._completed) >= self.batch_size:
+            self._flush_completed()
+
+    def _job_failed(self, failure):
+        job_id = failure.request.meta.get("job_id")
+        retried = self.queue.fail(job_id, repr(failure.value))
+        self.logger.warning(
+            "Job ad %s failed%s: %s",
+            job_id,
+            ", will be retried" if retried else "",
+            failure.value
+        )
+
+    def _flush_completed(self):
+        if self._completed:
+            self.queue.complete(self._completed)
+            self._completed = []
+
+    def closed(self, reason):
+        if self.queue is None:
+            return
+
+        self._flush_completed()
+        released = self.queue.release(self.worker)
+        if released:
+            self.logger.info(
+                "Returned %d unfinished job ads to the queue", released
+            )
+        self.queue.close()
 
     def parse(self, response):
         """
@@ -56,117 +182,14 @@ class JobAdsSpider(scrapy.Spider):
             the webpage.
 
         Yields:
-            dict: A dictionary containing the extracted job ad data.
-        """
-        yield {
-            'title': self._extract_title(response),
-            'code': self._extract_code(response),
-            'entry_type': self._extract_entry_type(response),
-            'location': self._extract_location(response),
-            'company': self._extract_company(response),
-            'tasks': self._extract_tasks(response),
-            'requirements': self._extract_requirements(response)
-        }
-
-    @staticmethod
-    def _extract_title(response):
-        """
-        Extract job title from the response.
-
-        Args:
-            response (scrapy.http.Response): The response object.
-
-        Returns:
-            str: Job title.
-        """
-        return response.css("h1.margin-bottom-gutter::text").get()
-
-    @staticmethod
-    def _extract_code(response):
-        """
-        Extract job code from the response.
-
-        Args:
-            response (scrapy.http.Response): The response object.
-
-        Returns:
-            str: Job code.
-        """
-        return response.css("span.jobad-base-info-content::text").get()
-
-    @staticmethod
-    def _extract_entry_type(response):
-        """
-        Extract job entry type from the response.
-
-        Args:
-            response (scrapy.http.Response): The response object.
-
-        Returns:
-            str: Job entry type.
-        """
-        return response.css("span.jobad-base-info-content::text").getall()[1]
-
-    @staticmethod
-    def _extract_location(response):
-        """
-        Extract job location from the response.
-
-        Args:
-            response (scrapy.http.Response): The response object.
-
-        Returns:
-            str: Job location.
-        """
-        return response.css("span.jobad-base-info-content::text").getall()[2]
-
-    @staticmethod
-    def _extract_company(response):
-        """
-        Extract company name from the response.
-
-        Args:
-            response (scrapy.http.Response): The response object.
-
-        Returns:
-            str: Company name.
-        """
-        return response.css("span.jobad-base-info-content::text").getall()[3]
-
-    @staticmethod
-    def _extract_tasks(response):
-        """
-        Extract list of tasks from the response.
-
-        Args:
-            response (scrapy.http.Response): The response object.
-
-        Returns:
-            list: List of tasks.
-        """
-        xpath_query = ('//*[@id="aria-panel-task"]/div/ul/li/span')
-        task_elements = response.xpath(xpath_query)
-
-        return [
-            task_element.xpath("text()").get()
-            for task_element in task_elements
-        ]
-
-    @staticmethod
-    def _extract_requirements(response):
-        """
-        Extract list of requirements from the response.
-
-        Args:
-            response (scrapy.http.Response): The response object.
-
-        Returns:
-            list: List of requirements.
+            JobAd: The extracted job ad data.
         """
-        xpath_query = ('//*[@id="aria-panel-your-profile"]/div/ul/li/span')
-        requirement_elements = response.xpath(xpath_query)
+        try:
+            job = extract_job_ad(response)
+        except Exception as e:
+            job_id = response.meta.get("job_id")
+            if self.queue is not None and job_id is not None:
+                self.queue.fail(job_id, repr(e))
+            raise
 
-        return [
-            element.xpath("text()").get()
-            for element in requirement_elements
-        ]
+        yield JobAd(**job)
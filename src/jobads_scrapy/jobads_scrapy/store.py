@@ -0,0 +1,342 @@
+# SQLite store for scraped job ads
+#
+# The latest version of every job ad is kept in the jobs table, and every
+# scrape of an ad is kept in job_history, keyed by job code and snapshot name.
+# Ads that are no longer listed stay in the jobs table with the snapshot they
+# were first missing from in delisted_snapshot.
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+JOB_FIELDS = (
+    "title",
+    "code",
+    "entry_type",
+    "location",
+    "company",
+    "tasks",
+    "requirements",
+)
+LIST_FIELDS = ("tasks", "requirements")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    code TEXT PRIMARY KEY,
+    title TEXT,
+    entry_type TEXT,
+    location TEXT,
+    company TEXT,
+    tasks TEXT,
+    requirements TEXT,
+    first_snapshot TEXT NOT NULL,
+    last_snapshot TEXT NOT NULL,
+    scraped_at TEXT NOT NULL,
+    delisted_snapshot TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_location ON jobs (location);
+CREATE INDEX IF NOT EXISTS jobs_company ON jobs (company);
+CREATE INDEX IF NOT EXISTS jobs_entry_type ON jobs (entry_type);
+
+CREATE TABLE IF NOT EXISTS job_history (
+    code TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    title TEXT,
+    entry_type TEXT,
+    location TEXT,
+    company TEXT,
+    tasks TEXT,
+    requirements TEXT,
+    scraped_at TEXT NOT NULL,
+    PRIMARY KEY (code, snapshot)
+);
+CREATE INDEX IF NOT EXISTS job_history_snapshot ON job_history (snapshot);
+CREATE INDEX IF NOT EXISTS job_history_location ON job_history (location);
+"""
+
+UPSERT_JOB = """
+INSERT INTO jobs (
+    code, title, entry_type, location, company, tasks, requirements,
+    first_snapshot, last_snapshot, scraped_at
+)
+VALUES (
+    :code, :title, :entry_type, :location, :company, :tasks, :requirements,
+    :snapshot, :snapshot, :scraped_at
+)
+ON CONFLICT (code) DO UPDATE SET
+    title = excluded.title,
+    entry_type = excluded.entry_type,
+    location = excluded.location,
+    company = excluded.company,
+    tasks = excluded.tasks,
+    requirements = excluded.requirements,
+    last_snapshot = excluded.last_snapshot,
+    scraped_at = excluded.scraped_at,
+    delisted_snapshot = NULL
+"""
+
+UPSERT_HISTORY = """
+INSERT INTO job_history (
+    code, snapshot, title, entry_type, location, company, tasks,
+    requirements, scraped_at
+)
+VALUES (
+    :code, :snapshot, :title, :entry_type, :location, :company, :tasks,
+    :requirements, :scraped_at
+)
+ON CONFLICT (code, snapshot) DO UPDATE SET
+    title = excluded.title,
+    entry_type = excluded.entry_type,
+    location = excluded.location,
+    company = excluded.company,
+    tasks = excluded.tasks,
+    requirements = excluded.requirements,
+    scraped_at = excluded.scraped_at
+"""
+
+
+class JobStore:
+    """
+    An indexed SQLite store of scraped job ads.
+
+    Jobs are upserted on their code, so the jobs table always holds the
+    latest version of every ad. Each scrape is also recorded in the history
+    table under the name of the snapshot it belongs to. Lookups by code,
+    location, company and entry type are served by indexes.
+
+    Crawls only scrape new or changed ads, so ads that are no longer listed
+    are never scraped again. ``mark_listed`` marks them as delisted, and
+    ``find_jobs`` leaves them out.
+
+    Attributes:
+        path (str): Path to the SQLite database file.
+        connection (sqlite3.Connection): Connection to the database.
+    """
+
+    def __init__(self, path):
+        """
+        Open the store, creating the database and its tables if needed.
+
+        Args:
+            path (str): Path to the SQLite database file.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = {
+            row["name"]
+            for row in self.connection.execute("PRAGMA table_info(jobs)")
+        }
+        # Stores created before ads were marked as delisted
+        if "delisted_snapshot" not in columns:
+            with self.connection:
+                self.connection.execute(
+                    "ALTER TABLE jobs ADD COLUMN delisted_snapshot TEXT"
+                )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def upsert_jobs(self, jobs, snapshot, scraped_at=None):
+        """
+        Insert or update a batch of jobs in a single transaction.
+
+        Args:
+            jobs (iterable[dict]): The jobs to store. Jobs without a code are
+                skipped.
+            snapshot (str): Name of the snapshot the jobs were scraped for.
+            scraped_at (str, optional): ISO 8601 time of the scrape. Defaults
+                to the current UTC time.
+
+        Returns:
+            int: Number of stored jobs.
+        """
+        if scraped_at is None:
+            scraped_at = datetime.now(timezone.utc).isoformat(
+                timespec="seconds"
+            )
+
+        rows = [
+            self._to_row(job, snapshot, scraped_at)
+            for job in jobs
+            if job.get("code")
+        ]
+
+        with self.connection:
+            self.connection.executemany(UPSERT_JOB, rows)
+            self.connection.executemany(UPSERT_HISTORY, rows)
+
+        return len(rows)
+
+    def mark_listed(self, codes, snapshot):
+        """
+        Mark the jobs that are not listed anymore as delisted.
+
+        Jobs not among the given codes are marked as delisted in the
+        snapshot, unless they already are, and delisted jobs among them are
+        listed again.
+
+        Args:
+            codes (iterable[str]): Codes of all jobs currently listed, e.g.
+                of the jobs of the merged snapshot.
+            snapshot (str): Name of the snapshot the listing belongs to.
+
+        Returns:
+            int: Number of newly delisted jobs.
+        """
+        with self.connection:
+            self.connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS listed "
+                "(code TEXT PRIMARY KEY)"
+            )
+            self.connection.execute("DELETE FROM listed")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO listed (code) VALUES (?)",
+                ((code,) for code in codes)
+            )
+            delisted = self.connection.execute(
+                "UPDATE jobs SET delisted_snapshot = ? "
+                "WHERE delisted_snapshot IS NULL "
+                "AND code NOT IN (SELECT code FROM listed)",
+                (snapshot,)
+            ).rowcount
+            self.connection.execute(
+                "UPDATE jobs SET delisted_snapshot = NULL "
+                "WHERE delisted_snapshot IS NOT NULL "
+                "AND code IN (SELECT code FROM listed)"
+            )
+            self.connection.execute("DELETE FROM listed")
+
+        return delisted
+
+    def get_job(self, code):
+        """
+        Get the latest version of a job.
+
+        Args:
+            code (str): The job code, e.g. 'J000008392'.
+
+        Returns:
+            dict: The job, or None if it is not in the store.
+        """
+        row = self.connection.execute(
+            "SELECT * FROM jobs WHERE code = ?", (code,)
+        ).fetchone()
+
+        return self._from_row(row) if row is not None else None
+
+    def get_history(self, code):
+        """
+        Get every scraped version of a job across all snapshots.
+
+        Args:
+            code (str): The job code, e.g. 'J000008392'.
+
+        Returns:
+            list[dict]: The versions of the job, oldest snapshot first.
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM job_history WHERE code = ? ORDER BY snapshot",
+            (code,)
+        )
+
+        return [self._from_row(row) for row in rows]
+
+    def find_jobs(
+            self,
+            location=None,
+            company=None,
+            entry_type=None,
+            snapshot=None,
+            include_delisted=False
+    ):
+        """
+        Find jobs by their base info.
+
+        Without a snapshot, the latest version of all matching jobs that are
+        still listed is searched; with a snapshot, the versions scraped for
+        that snapshot.
+
+        Args:
+            location (str, optional): Exact job location, e.g. 'Weissach'.
+            company (str, optional): Exact company name.
+            entry_type (str, optional): Exact entry type.
+            snapshot (str, optional): Name of the snapshot to search.
+            include_delisted (bool): Also find the latest version of jobs
+                that are not listed anymore.
+
+        Returns:
+            list[dict]: The matching jobs, ordered by code.
+        """
+        table = "jobs" if snapshot is None else "job_history"
+        criteria = {
+            "location": location,
+            "company": company,
+            "entry_type": entry_type,
+            "snapshot": snapshot,
+        }
+        criteria = {
+            column: value
+            for column, value in criteria.items()
+            if value is not None
+        }
+
+        conditions = [f"{column} = :{column}" for column in criteria]
+        if snapshot is None and not include_delisted:
+            conditions.append("delisted_snapshot IS NULL")
+
+        query = f"SELECT * FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY code"
+
+        return [
+            self._from_row(row)
+            for row in self.connection.execute(query, criteria)
+        ]
+
+    def snapshots(self):
+        """
+        List the names of all snapshots with stored jobs.
+
+        Returns:
+            list[str]: The snapshot names in ascending order.
+        """
+        rows = self.connection.execute(
+            "SELECT DISTINCT snapshot FROM job_history ORDER BY snapshot"
+        )
+
+        return [row["snapshot"] for row in rows]
+
+    @staticmethod
+    def _to_row(job, snapshot, scraped_at):
+        row = {field: job.get(field) for field in JOB_FIELDS}
+
+        for field in LIST_FIELDS:
+            row[field] = json.dumps(row[field] or [], ensure_ascii=False)
+
+        row["snapshot"] = snapshot
+        row["scraped_at"] = scraped_at
+
+        return row
+
+    @staticmethod
+    def _from_row(row):
+        job = dict(row)
+
+        for field in LIST_FIELDS:
+            job[field] = json.loads(job[field])
+
+        return job
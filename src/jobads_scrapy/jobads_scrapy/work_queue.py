@@ -0,0 +1,317 @@
+# SQLite work queue of job IDs shared by crawler processes
+#
+# Workers claim batches of job IDs under a lease. An ID is done once its
+# job ad was scraped; if a worker dies, its leases expire and the IDs are
+# claimed again by another worker.
+
+import time
+import sqlite3
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+"""
+
+
+class WorkQueue:
+    """
+    A persistent queue of job IDs to crawl, shared by several workers.
+
+    The queue is a SQLite database, so any number of processes can use it
+    at the same time without an outside service. Workers on several
+    machines can share it through a network file system with working file
+    locks. Claims run in an immediate transaction, so a job ID is only ever
+    leased to one worker at a time.
+
+    Every claimed ID is leased for ``lease_seconds``. A lease that expires
+    before the ID is marked done or failed, e.g. because the worker was
+    killed, makes the ID claimable again.
+
+    Attributes:
+        path (str): Path to the SQLite database file.
+        lease_seconds (float): Duration of a lease.
+        max_attempts (int): Number of failed attempts after which an ID is
+            given up.
+        connection (sqlite3.Connection): Connection to the database.
+    """
+
+    def __init__(self, path, lease_seconds=600, max_attempts=3):
+        """
+        Open the queue, creating the database and its table if needed.
+
+        Args:
+            path (str): Path to the SQLite database file.
+            lease_seconds (float): Duration of a lease.
+            max_attempts (int): Number of failed attempts after which an ID
+                is given up.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM tasks"
+        ).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def _transaction(self):
+        # Take the write lock up front, so that two workers cannot select
+        # the same rows before either of them updates them
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def add(self, job_ids):
+        """
+        Add job IDs to the queue. IDs already in the queue are left as they
+        are.
+
+        Args:
+            job_ids (iterable): The job IDs.
+
+        Returns:
+            int: Number of added IDs.
+        """
+        self._transaction()
+        try:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO tasks (job_id) VALUES (?)",
+                ((str(job_id),) for job_id in job_ids)
+            )
+            added = self.connection.total_changes - before
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        return added
+
+    def claim(self, worker, count):
+        """
+        Lease up to ``count`` pending job IDs to a worker.
+
+        Pending IDs and IDs with an expired lease are claimed, in the order
+        they were added.
+
+        Args:
+            worker (str): Name of the worker, unique across all processes.
+            count (int): Maximum number of IDs to claim.
+
+        Returns:
+            list[str]: The claimed job IDs, empty if there are none left.
+        """
+        now = time.time()
+
+        self._transaction()
+        try:
+            job_ids = [
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT job_id FROM tasks "
+                    "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                    "ORDER BY rowid LIMIT ?",
+                    (PENDING, LEASED, now, count)
+                )
+            ]
+            self.connection.executemany(
+                "UPDATE tasks SET status = ?, worker = ?, lease_expires = ? "
+                "WHERE job_id = ?",
+                (
+                    (LEASED, worker, now + self.lease_seconds, job_id)
+                    for job_id in job_ids
+                )
+            )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        return job_ids
+
+    def complete(self, job_ids):
+        """
+        Mark job IDs as done.
+
+        Args:
+            job_ids (iterable[str]): The job IDs.
+        """
+        self._transaction()
+        try:
+            self.connection.executemany(
+                "UPDATE tasks SET status = ?, worker = NULL, "
+                "lease_expires = NULL WHERE job_id = ?",
+                ((DONE, job_id) for job_id in job_ids)
+            )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def fail(self, job_id, error=None):
+        """
+        Record a failed attempt of a job ID.
+
+        The ID becomes pending again, or failed after ``max_attempts``
+        attempts.
+
+        Args:
+            job_id (str): The job ID.
+            error (str, optional): Description of the failure.
+
+        Returns:
+            bool: True if the ID will be retried.
+        """
+        self._transaction()
+        try:
+            self.connection.execute(
+                "UPDATE tasks SET attempts = attempts + 1, error = ?, "
+                "worker = NULL, lease_expires = NULL, "
+                "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END "
+                "WHERE job_id = ?",
+                (error, self.max_attempts, FAILED, PENDING, job_id)
+            )
+            status = self.connection.execute(
+                "SELECT status FROM tasks WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        return status is not None and status[0] == PENDING
+
+    def release(self, worker=None):
+        """
+        Return leased job IDs to the queue.
+
+        Args:
+            worker (str, optional): Name of the worker whose IDs are
+                released. Defaults to all workers, e.g. when resuming a crawl
+                whose workers are known to be gone.
+
+        Returns:
+            int: Number of released IDs.
+        """
+        query = (
+            "UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL "
+            "WHERE status = ?"
+        )
+        parameters = (PENDING, LEASED)
+        if worker is not None:
+            query += " AND worker = ?"
+            parameters += (worker,)
+
+        return self.connection.execute(query, parameters).rowcount
+
+    def reset_done(self, keep):
+        """
+        Return done job IDs to the queue unless they are kept.
+
+        Used when resuming a crawl, to crawl again the IDs that were marked
+        done but whose jobs did not make it into the output before the crawl
+        was interrupted.
+
+        Args:
+            keep (collection[str]): IDs that stay done.
+
+        Returns:
+            int: Number of IDs returned to the queue.
+        """
+        lost = [job_id for job_id in self.job_ids(DONE) if job_id not in keep]
+
+        self._transaction()
+        try:
+            self.connection.executemany(
+                "UPDATE tasks SET status = ? WHERE job_id = ?",
+                ((PENDING, job_id) for job_id in lost)
+            )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        return len(lost)
+
+    def leased_by(self, worker):
+        """
+        Count the job IDs leased to a worker.
+
+        Args:
+            worker (str): Name of the worker.
+
+        Returns:
+            int: Number of leased IDs.
+        """
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = ? AND worker = ?",
+            (LEASED, worker)
+        ).fetchone()[0]
+
+    def counts(self):
+        """
+        Count the job IDs by status.
+
+        Returns:
+            dict: Number of IDs per status, including statuses without IDs.
+        """
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+        counts.update(self.connection.execute(
+            "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+        ))
+
+        return counts
+
+    def remaining(self):
+        """
+        Count the job IDs that are not done or given up.
+
+        Returns:
+            int: Number of pending and leased IDs.
+        """
+        counts = self.counts()
+
+        return counts[PENDING] + counts[LEASED]
+
+    def job_ids(self, status):
+        """
+        List the job IDs with a status.
+
+        Args:
+            status (str): One of 'pending', 'leased', 'done' and 'failed'.
+
+        Returns:
+            list[str]: The job IDs in the order they were added.
+        """
+        rows = self.connection.execute(
+            "SELECT job_id FROM tasks WHERE status = ? ORDER BY rowid",
+            (status,)
+        )
+
+        return [row[0] for row in rows]
@@ -0,0 +1,48 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def bounded_imap_unordered(func, iterable, max_workers, max_pending=None):
+    """
+    Apply a function to every element of an iterable using a thread pool.
+
+    The iterable is consumed lazily: at most ``max_pending`` calls are queued
+    or running at any time, so neither the inputs nor the results ever pile
+    up in memory. Results are yielded in completion order.
+
+    Exceptions raised by ``func`` are not propagated. They are yielded
+    alongside the argument that caused them, so one failing call does not
+    abort the remaining ones.
+
+    Args:
+        func (callable): Function called with one element of the iterable.
+        iterable (iterable): The arguments to process.
+        max_workers (int): Number of worker threads.
+        max_pending (int, optional): Maximum number of submitted calls that
+            have not been yielded yet. Defaults to twice ``max_workers``.
+
+    Yields:
+        tuple: ``(arg, result, error)`` for every element, where ``error`` is
+            the raised exception or None on success.
+    """
+    max_workers = max(1, max_workers)
+    max_pending = max(max_workers, max_pending or 2 * max_workers)
+    arguments = iter(iterable)
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            for arg in arguments:
+                pending[executor.submit(func, arg)] = arg
+                if len(pending) >= max_pending:
+                    break
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                arg = pending.pop(future)
+                error = future.exception()
+                result = None if error else future.result()
+                yield arg, result, error
@@ -0,0 +1,183 @@
+import io
+import abc
+import os
+import shutil
+
+HEAD_END = '</head>'
+
+
+class PdfBackend(abc.ABC):
+    """
+    Base class of the backends converting rendered job HTML into PDF.
+
+    A backend renders a whole HTML document into the bytes of a PDF. Asked
+    for an outline, the PDF gets a top-level outline entry for every h1
+    heading, which is what splitting a batch of jobs into the per-job files
+    relies on.
+
+    Attributes:
+        name (str): Name the backend is selected by.
+        parallel (bool): Whether calls from several threads render in
+            parallel. In-process backends are held back by the GIL.
+    """
+    name = None
+    parallel = False
+
+    @abc.abstractmethod
+    def render(self, html, css_path=None, outline=False):
+        """
+        Render an HTML document into a PDF.
+
+        Args:
+            html (str): The HTML document.
+            css_path (str, optional): Path to a stylesheet applied to the
+                document.
+            outline (bool): Add an outline entry for every h1 heading.
+
+        Returns:
+            bytes: The PDF.
+        """
+
+
+class WkhtmltopdfBackend(PdfBackend):
+    """
+    Renders PDFs with wkhtmltopdf through pdfkit, one process per call.
+
+    Every call starts a wkhtmltopdf process, so calls from several threads
+    render in parallel, but each call pays the process startup.
+
+    Attributes:
+        configuration (pdfkit.configuration.Configuration): pdfkit
+            configuration pointing to the wkhtmltopdf executable.
+    """
+    name = 'wkhtmltopdf'
+    parallel = True
+
+    def __init__(self, executable=None):
+        """
+        Initialize the WkhtmltopdfBackend instance.
+
+        Args:
+            executable (str, optional): Path to the wkhtmltopdf executable.
+                Defaults to the WKHTMLTOPDF_PATH environment variable or the
+                wkhtmltopdf found on the PATH.
+
+        Raises:
+            ImportError: If pdfkit is not installed.
+            FileNotFoundError: If wkhtmltopdf cannot be found.
+        """
+        try:
+            import pdfkit
+        except ImportError as e:
+            raise ImportError(
+                "The wkhtmltopdf backend requires pdfkit, install it with "
+                "'pip install pdfkit'"
+            ) from e
+
+        executable = (
+            executable
+            or os.environ.get('WKHTMLTOPDF_PATH')
+            or shutil.which('wkhtmltopdf')
+        )
+        if not executable:
+            raise FileNotFoundError(
+                "wkhtmltopdf not found, install it or set WKHTMLTOPDF_PATH"
+            )
+
+        self._pdfkit = pdfkit
+        self.configuration = pdfkit.configuration(wkhtmltopdf=executable)
+
+    def render(self, html, css_path=None, outline=False):
+        options = {'outline': '', 'outline-depth': '1'} if outline else None
+
+        return self._pdfkit.from_string(
+            html,
+            False,
+            configuration=self.configuration,
+            css=css_path,
+            options=options
+        )
+
+
+class Xhtml2pdfBackend(PdfBackend):
+    """
+    Renders PDFs in-process with xhtml2pdf, a pure Python renderer.
+
+    No external program is needed and there is no per-call startup, but
+    xhtml2pdf supports less CSS than a browser engine and renders while
+    holding the GIL. It always adds h1 headings to the outline, h2 headings
+    nested below them.
+    """
+    name = 'xhtml2pdf'
+
+    def __init__(self):
+        """
+        Initialize the Xhtml2pdfBackend instance.
+
+        Raises:
+            ImportError: If xhtml2pdf is not installed.
+        """
+        try:
+            from xhtml2pdf import pisa
+        except ImportError as e:
+            raise ImportError(
+                "The xhtml2pdf backend requires xhtml2pdf, install it with "
+                "'pip install xhtml2pdf'"
+            ) from e
+
+        self._pisa = pisa
+        self._stylesheets = {}
+
+    def _stylesheet(self, css_path):
+        if css_path not in self._stylesheets:
+            with open(css_path, 'r', encoding='utf-8') as file:
+                self._stylesheets[css_path] = file.read()
+
+        return self._stylesheets[css_path]
+
+    def render(self, html, css_path=None, outline=False):
+        if css_path is not None:
+            style = f'<style>\n{self._stylesheet(css_path)}\n</style>\n'
+            if HEAD_END in html:
+                html = html.replace(HEAD_END, style + HEAD_END, 1)
+            else:
+                html = style + html
+
+        output = io.BytesIO()
+        result = self._pisa.CreatePDF(html, dest=output, encoding='utf-8')
+        if result.err:
+            raise ValueError(f"xhtml2pdf failed with {result.err} errors")
+
+        return output.getvalue()
+
+
+BACKENDS = {
+    backend.name: backend for backend in (WkhtmltopdfBackend, Xhtml2pdfBackend)
+}
+
+
+def get_backend(backend=None):
+    """
+    Get a PDF backend by name.
+
+    Args:
+        backend (str or PdfBackend, optional): Name of the backend, one of
+            ``BACKENDS``, or a backend instance, which is returned as is.
+            Defaults to wkhtmltopdf.
+
+    Returns:
+        PdfBackend: The backend.
+
+    Raises:
+        ValueError: If there is no backend with that name.
+    """
+    if isinstance(backend, PdfBackend):
+        return backend
+
+    name = backend or WkhtmltopdfBackend.name
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown PDF backend: {name}, choose from {', '.join(BACKENDS)}"
+        )
+
+    return BACKENDS[name]()
@@ -0,0 +1,683 @@
+import os
+import sys
+import glob
+import argparse
+import queue
+import socket
+import itertools
+import threading
+import multiprocessing
+from src.job_registry import job_id_from_code
+from src.run_metrics import LATENCY_BUCKETS
+from src.snapshot_io import (
+    feed_options,
+    iter_jobs,
+    repair_json_lines,
+    write_jobs
+)
+from utils import PROJECT_ROOT
+
+SCRAPY_PROJECT_PATH = os.path.join(PROJECT_ROOT, "src", "jobads_scrapy")
+
+# Marks the end of the item stream in the render queue
+_END_OF_STREAM = object()
+
+# Seconds between the checks whether a paused crawl can resume
+BACKLOG_POLL_INTERVAL = 0.1
+
+# Stats of the shards that are not added up when merging them
+_MAX_STATS = ("elapsed_time_seconds",)
+
+
+def _get_scrapy_settings():
+    """
+    Load the settings of the jobads_scrapy project without changing into its
+    directory.
+
+    Returns:
+        scrapy.settings.Settings: The project settings.
+    """
+    if SCRAPY_PROJECT_PATH not in sys.path:
+        sys.path.insert(0, SCRAPY_PROJECT_PATH)
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "jobads_scrapy.settings")
+
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+
+    # The crawl histograms are merged into the run report, so they share
+    # its buckets
+    settings.set("JOBADS_METRICS_LATENCY_BUCKETS", list(LATENCY_BUCKETS))
+
+    # Relative data directories are resolved next to scrapy.cfg, which cannot
+    # be found from the working directory of the pipeline
+    cache_dir = settings.get("JOBADS_HTTPCACHE_DIR")
+    if cache_dir and not os.path.isabs(cache_dir):
+        settings.set(
+            "JOBADS_HTTPCACHE_DIR",
+            os.path.join(SCRAPY_PROJECT_PATH, ".scrapy", cache_dir)
+        )
+
+    return settings
+
+
+class StreamingPdfRenderer:
+    """
+    Renders job PDFs in a background thread while the jobs are scraped.
+
+    Jobs are handed over through a queue and consumed by
+    ``JobPdfGenerator.generate_pdfs``, so rendering overlaps with the crawl
+    and uses the same manifest, batching and worker pool as a regular run.
+
+    ``submit`` is called from the Twisted reactor thread during a crawl, so
+    by default it never blocks. Once ``queue_size`` jobs are waiting, the
+    renderer is ``backlogged``; ``crawl_jobs`` then pauses the engine until
+    the queue has drained, which slows the crawl down to the rendering
+    speed instead of buffering every scraped job. Outside the reactor,
+    ``submit`` can block instead.
+
+    Attributes:
+        pdf_generator (JobPdfGenerator): The generator rendering the PDFs.
+        queue_size (int): Number of waiting jobs at which the renderer is
+            backlogged.
+        options (dict): Keyword arguments passed to ``generate_pdfs``.
+        failures (dict): Error messages of the jobs that failed, keyed by job
+            code. Available after ``close``.
+        error (Exception): The error that stopped the rendering, or None.
+    """
+
+    def __init__(self, pdf_generator, queue_size=100, **options):
+        """
+        Initialize the StreamingPdfRenderer instance.
+
+        Args:
+            pdf_generator (JobPdfGenerator): The generator rendering the PDFs.
+            queue_size (int): Number of waiting jobs at which the renderer is
+                backlogged.
+            **options: Keyword arguments passed to ``generate_pdfs``, e.g.
+                ``workers`` or ``batch_size``.
+        """
+        self.pdf_generator = pdf_generator
+        self.queue_size = queue_size
+        self.options = options
+        self.failures = {}
+        self.error = None
+        self._queue = queue.Queue()
+        self._drained = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _jobs(self):
+        while True:
+            job = self._queue.get()
+            with self._drained:
+                self._drained.notify_all()
+            if job is _END_OF_STREAM:
+                return
+            yield job
+
+    def _run(self):
+        jobs = self._jobs()
+
+        try:
+            self.failures = self.pdf_generator.generate_pdfs(
+                jobs=jobs, **self.options
+            )
+        except Exception as e:
+            self.error = e
+            print(f"PDF generation stopped: {e}")
+            # Keep draining the queue so that the crawl is not held back
+            for _ in jobs:
+                pass
+
+    def start(self):
+        """Start rendering jobs in the background."""
+        self._thread.start()
+
+    def backlogged(self):
+        """
+        Tell whether the renderer is behind the submitted jobs.
+
+        Returns:
+            bool: True if ``queue_size`` or more jobs are waiting.
+        """
+        return self._queue.qsize() >= self.queue_size
+
+    def submit(self, job, block=False):
+        """
+        Queue a job for rendering.
+
+        Args:
+            job (dict): The job data.
+            block (bool): Wait while the renderer is backlogged. Must not be
+                used on the reactor thread.
+        """
+        if block:
+            with self._drained:
+                self._drained.wait_for(lambda: not self.backlogged())
+        self._queue.put(job)
+
+    def close(self):
+        """
+        Wait until all queued jobs are rendered.
+
+        Returns:
+            dict: Error messages of the jobs that failed, keyed by job code.
+        """
+        self._queue.put(_END_OF_STREAM)
+        self._thread.join()
+
+        return self.failures
+
+
+def scrapy_setting(value):
+    """
+    Parse a Scrapy setting given on the command line.
+
+    Args:
+        value (str): The setting as NAME=VALUE.
+
+    Returns:
+        tuple: The name and the value of the setting.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value has no name.
+    """
+    name, separator, setting = value.partition("=")
+    if not name or not separator:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=VALUE, got {value!r}"
+        )
+
+    return name, setting
+
+
+def crawl_jobs(
+        input_file,
+        output_file,
+        on_item=None,
+        snapshot=None,
+        log_enabled=False,
+        metrics=None,
+        queue_file=None,
+        worker=None,
+        extra_settings=None,
+        backlogged=None
+):
+    """
+    Run the job ad spider in the current process.
+
+    The scraped jobs are exported to the output file, as JSON Lines if its
+    name ends with '.jsonl' or '.jsonl.gz', and, as soon as each one is
+    scraped, passed to the optional item callback. The Twisted reactor
+    cannot be restarted, so this can be called only once per process.
+
+    With a queue file, the crawl is checkpointed: the job ad IDs of the
+    input file are added to the queue, every scraped ID is marked done in
+    it and the output file is appended to. If the crawl is interrupted,
+    running it again with the same queue and output file resumes it, and
+    job ads already in the output file are not fetched again. Without an
+    input file, the spider only claims IDs from the queue, e.g. to help a
+    crawl running on another machine.
+
+    Args:
+        input_file (str): Path to the input file containing job ad IDs.
+        output_file (str): Path to save the scraped data.
+        on_item (callable, optional): Called with every scraped job as a
+            dictionary.
+        snapshot (str, optional): Name of the snapshot the crawl belongs to,
+            used for the job store history.
+        log_enabled (bool): Whether Scrapy should log to the console.
+        metrics (RunMetrics, optional): Metrics of the run. The crawl stats,
+            including the download and parse histograms, are merged into it
+            and recorded as the crawl stage.
+        queue_file (str, optional): Path to the WorkQueue database the job
+            ad IDs are claimed from, and the checkpoint of the crawl.
+        worker (str, optional): Name of the worker in the queue.
+        extra_settings (dict, optional): Scrapy settings overriding the
+            project settings, e.g. JOBADS_BASE_URL.
+        backlogged (callable, optional): Tells whether the item callback is
+            behind, e.g. ``StreamingPdfRenderer.backlogged``. It is checked
+            after every item; while it returns True, the engine schedules no
+            new requests.
+
+    Returns:
+        bool: True if the crawl finished, False otherwise.
+    """
+    spider_args = {"inputfile": input_file}
+    overwrite = True
+
+    if queue_file is not None:
+        spider_args = {"queue": queue_file, "worker": worker}
+        overwrite = False
+        if input_file is not None:
+            overwrite = not open_checkpoint(
+                queue_file, input_file, [output_file]
+            )
+
+    stats = _run_crawler(
+        output_file,
+        spider_args,
+        on_item=on_item,
+        snapshot=snapshot,
+        log_enabled=log_enabled,
+        overwrite=overwrite,
+        extra_settings=extra_settings,
+        backlogged=backlogged
+    )
+
+    if metrics is not None:
+        _record_crawl(metrics, stats)
+
+    return stats.get("finish_reason") == "finished"
+
+
+def _run_crawler(
+        output_file,
+        spider_args,
+        on_item=None,
+        snapshot=None,
+        log_enabled=False,
+        overwrite=True,
+        extra_settings=None,
+        backlogged=None
+):
+    """
+    Run the job ad spider and return its stats.
+
+    Args:
+        output_file (str): Path to save the scraped data.
+        spider_args (dict): Keyword arguments of the spider.
+        on_item (callable, optional): Called with every scraped job as a
+            dictionary.
+        snapshot (str, optional): Name of the snapshot the crawl belongs to.
+        log_enabled (bool): Whether Scrapy should log to the console.
+        overwrite (bool): Replace the output file instead of appending to
+            it.
+        extra_settings (dict, optional): Scrapy settings overriding the
+            project settings.
+        backlogged (callable, optional): Tells whether the item callback is
+            behind. The engine is paused while it returns True.
+
+    Returns:
+        dict: The crawler stats.
+    """
+    settings = _get_scrapy_settings()
+    settings.set("LOG_ENABLED", log_enabled)
+    settings.set(
+        "FEEDS", {output_file: feed_options(output_file, overwrite)}
+    )
+    if snapshot is not None:
+        settings.set("JOBADS_SNAPSHOT", snapshot)
+    if extra_settings:
+        settings.setdict(extra_settings)
+
+    from itemadapter import ItemAdapter
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler("job_ads")
+
+    if on_item is not None:
+        # Created once the crawl runs, importing the reactor earlier would
+        # install the default one instead of the configured one
+        resume_loop = None
+
+        def resume():
+            if not backlogged():
+                resume_loop.stop()
+                crawler.engine.unpause()
+                # Otherwise scheduling only resumes with the next heartbeat
+                slot = getattr(crawler.engine, "_slot", None)
+                if slot is not None:
+                    slot.nextcall.schedule()
+
+        def item_scraped(item, response, spider):
+            nonlocal resume_loop
+
+            on_item(ItemAdapter(item).asdict())
+            # Requests already downloading still complete while paused
+            if backlogged is None or not backlogged():
+                return
+            if resume_loop is None:
+                from twisted.internet.task import LoopingCall
+
+                resume_loop = LoopingCall(resume)
+            if not resume_loop.running:
+                crawler.engine.pause()
+                resume_loop.start(BACKLOG_POLL_INTERVAL, now=False)
+
+        crawler.signals.connect(
+            item_scraped, signal=signals.item_scraped, weak=False
+        )
+
+    process.crawl(crawler, **spider_args)
+    process.start()
+
+    return crawler.stats.get_stats()
+
+
+def mark_listed_jobs(jobs_file, snapshot, extra_settings=None):
+    """
+    Mark the jobs of the job store that are not in a snapshot as delisted.
+
+    Args:
+        jobs_file (str): Path to the snapshot file with all listed jobs.
+        snapshot (str): Name of the snapshot.
+        extra_settings (dict, optional): Scrapy settings overriding the
+            project settings, e.g. JOBADS_STORE_PATH.
+
+    Returns:
+        int: Number of newly delisted jobs, or None if there is no job
+            store.
+    """
+    settings = _get_scrapy_settings()
+    if extra_settings:
+        settings.setdict(extra_settings)
+
+    store_path = settings.get("JOBADS_STORE_PATH")
+    if not store_path or not os.path.exists(store_path):
+        return None
+
+    from jobads_scrapy.store import JobStore
+
+    with JobStore(store_path) as store:
+        return store.mark_listed(
+            (job["code"] for job in iter_jobs(jobs_file) if job.get("code")),
+            snapshot
+        )
+
+
+def open_checkpoint(queue_file, input_file, output_files):
+    """
+    Prepare the work queue of a checkpointed crawl.
+
+    A new queue is filled with the job ad IDs of the input file. An existing
+    queue belongs to an interrupted crawl, which is resumed: the truncated
+    last record of every output file is removed, IDs marked done whose jobs
+    are missing from the output files are crawled again, and the leases of
+    the previous workers are released. IDs whose jobs are in the output
+    files are marked done, even if the interrupted crawl could not record
+    that anymore. IDs of the input file that are not in the queue yet are
+    added.
+
+    Args:
+        queue_file (str): Path to the WorkQueue database.
+        input_file (str): Path to the input file containing job ad IDs.
+        output_files (iterable[str]): The JSON Lines output files of the
+            crawl.
+
+    Returns:
+        bool: True if an interrupted crawl is resumed, False for a new one.
+    """
+    import numpy as np
+
+    _get_scrapy_settings()
+    from jobads_scrapy.work_queue import WorkQueue
+
+    with WorkQueue(queue_file) as work_queue:
+        resumed = len(work_queue) > 0
+
+        if resumed:
+            scraped = set()
+            for path in output_files:
+                if not os.path.exists(path):
+                    continue
+                repair_json_lines(path)
+                scraped.update(
+                    job_id_from_code(job["code"])
+                    for job in iter_jobs(path)
+                    if job.get("code")
+                )
+            lost = work_queue.reset_done(scraped)
+            # Jobs written before their IDs were marked done
+            work_queue.complete(scraped)
+            work_queue.release()
+
+        added = work_queue.add(np.load(input_file))
+
+        if resumed:
+            counts = work_queue.counts()
+            print(
+                f"Resuming the crawl of {queue_file}: {counts['done']} job "
+                f"ads already scraped, {lost} lost, {added} added, "
+                f"{counts['pending']} to go"
+            )
+
+    return resumed
+
+
+def _record_crawl(metrics, stats):
+    """
+    Merge the crawler stats into the run metrics as the crawl stage.
+
+    Args:
+        metrics (RunMetrics): Metrics of the run.
+        stats (dict): The crawler stats.
+    """
+    metrics.merge_crawler_stats(stats)
+    metrics.record_stage(
+        "crawl",
+        stats.get("elapsed_time_seconds", 0),
+        items=stats.get("item_scraped_count", 0),
+        failures=(
+            stats.get("jobads_metrics/download_failures", 0)
+            + stats.get("jobads_metrics/parse_failures", 0)
+        )
+    )
+
+
+def _crawl_shard(args):
+    """
+    Crawl job ads claimed from a work queue in a worker process.
+
+    Args:
+        args (tuple): Path to the queue, the shard output file, the worker
+            name, the snapshot name and the extra Scrapy settings.
+
+    Returns:
+        dict: The crawler stats.
+    """
+    queue_file, shard_file, worker, snapshot, extra_settings = args
+
+    return _run_crawler(
+        shard_file,
+        {"queue": queue_file, "worker": worker},
+        snapshot=snapshot,
+        overwrite=False,
+        extra_settings=extra_settings
+    )
+
+
+def _combine_stats(shard_stats):
+    """
+    Add up the crawler stats of several shards.
+
+    Args:
+        shard_stats (list[dict]): The crawler stats of every shard.
+
+    Returns:
+        dict: Numeric stats summed, the elapsed time as the longest one, and
+            other stats of the last shard that has them.
+    """
+    combined = {}
+
+    for stats in shard_stats:
+        for key, value in stats.items():
+            numeric = (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and isinstance(combined.get(key, 0), (int, float))
+            )
+            if not numeric:
+                combined[key] = value
+            elif key in _MAX_STATS:
+                combined[key] = max(combined.get(key, 0), value)
+            else:
+                combined[key] = combined.get(key, 0) + value
+
+    return combined
+
+
+def shard_file(output_file, worker):
+    """
+    Name the output file of a worker of a sharded crawl.
+
+    Args:
+        output_file (str): Path of the merged output file.
+        worker (str): Name of the worker.
+
+    Returns:
+        str: The shard file next to the output file, in the same format.
+    """
+    for suffix in (".jsonl.gz", ".jsonl", ".json"):
+        if output_file.endswith(suffix):
+            stem = output_file[:-len(suffix)]
+            break
+    else:
+        stem, suffix = os.path.splitext(output_file)
+
+    return f"{stem}.shard-{worker}{suffix}"
+
+
+def crawl_sharded(
+        input_file,
+        output_file,
+        queue_file,
+        workers=None,
+        snapshot=None,
+        metrics=None,
+        max_rounds=3,
+        extra_settings=None
+):
+    """
+    Crawl the job ads with several worker processes sharing a work queue.
+
+    The job ad IDs of the input file are added to the queue, and every
+    worker process runs its own spider, which claims batches of IDs from
+    the queue and writes the scraped jobs to its own shard file. Parsing and
+    serialization therefore run on as many cores as there are workers. When
+    all workers finished, the shard files are merged into the output file.
+
+    Workers on other machines can join the crawl by running
+    ``scripts/crawl-worker.py`` on the same queue and output file, on a
+    shared directory; they write shard files next to the output file as
+    well. IDs whose worker died before finishing them are returned to the
+    queue when their lease expires and crawled again in another round. IDs
+    marked done whose jobs are missing from the merged shards, e.g. of a
+    worker still writing its shard, are returned to the queue as well, and
+    the shards are kept until the crawl is complete.
+
+    The queue is the checkpoint of the crawl. If the crawl is interrupted,
+    calling this again with the same queue and output file resumes it: the
+    shards of the interrupted run are kept and merged as well, and only the
+    job ads missing from them are crawled.
+
+    Args:
+        input_file (str): Path to the input file containing job ad IDs.
+        output_file (str): Path to save the merged scraped data.
+        queue_file (str): Path to the WorkQueue database. It is created if
+            it does not exist.
+        workers (int, optional): Number of worker processes. Defaults to
+            the number of CPUs.
+        snapshot (str, optional): Name of the snapshot the crawl belongs to.
+        metrics (RunMetrics, optional): Metrics of the run. The added up
+            crawl stats of all workers are recorded as the crawl stage.
+        max_rounds (int): Maximum number of rounds of workers started while
+            IDs are left in the queue.
+        extra_settings (dict, optional): Scrapy settings overriding the
+            project settings of every worker, e.g. JOBADS_BASE_URL.
+
+    Returns:
+        bool: True if every job ad ID was crawled or given up, False if IDs
+            are left in the queue.
+    """
+    _get_scrapy_settings()
+    from jobads_scrapy.work_queue import WorkQueue
+
+    workers = workers or os.cpu_count()
+    host = socket.gethostname()
+    # Shards of an interrupted run are kept and merged as well
+    shard_pattern = shard_file(glob.escape(output_file), "*")
+
+    resumed = open_checkpoint(
+        queue_file,
+        input_file,
+        [output_file] + glob.glob(shard_pattern)
+    )
+
+    # Spawned workers start with a fresh interpreter and reactor
+    context = multiprocessing.get_context("spawn")
+    shard_stats = []
+
+    for round_number in range(max_rounds):
+        with WorkQueue(queue_file) as work_queue:
+            remaining = work_queue.remaining()
+        if not remaining:
+            break
+
+        print(
+            f"Crawling {remaining} job ads with {workers} workers "
+            f"(round {round_number + 1})"
+        )
+        names = [
+            f"{host}-{os.getpid()}-{round_number}-{index}"
+            for index in range(workers)
+        ]
+        tasks = [
+            (
+                queue_file,
+                shard_file(output_file, name),
+                name,
+                snapshot,
+                extra_settings
+            )
+            for name in names
+        ]
+
+        with context.Pool(workers, maxtasksperchild=1) as pool:
+            shard_stats.extend(pool.map(_crawl_shard, tasks, chunksize=1))
+
+    shards = sorted(glob.glob(shard_pattern))
+    sources = shards
+    if resumed and os.path.exists(output_file):
+        # Shards merged before the previous run was interrupted
+        sources = [output_file] + shards
+
+    def merged_jobs():
+        codes = set()
+        for job in itertools.chain.from_iterable(map(iter_jobs, sources)):
+            # A job is crawled twice if its lease expired while it was
+            # still being crawled
+            if job.get("code") not in codes:
+                codes.add(job.get("code"))
+                yield job
+
+    job_count = write_jobs(output_file, merged_jobs())
+    print(f"Merged {len(shards)} shards with {job_count} jobs")
+
+    if metrics is not None:
+        _record_crawl(metrics, _combine_stats(shard_stats))
+
+    with WorkQueue(queue_file) as work_queue:
+        lost = work_queue.reset_done({
+            job_id_from_code(job["code"])
+            for job in iter_jobs(output_file)
+            if job.get("code")
+        })
+        counts = work_queue.counts()
+    if lost:
+        print(
+            f"{lost} job ads are missing from the shards and are queued "
+            f"again"
+        )
+    if counts["failed"]:
+        print(f"{counts['failed']} job ads failed and were given up")
+
+    finished = counts["pending"] + counts["leased"] == 0
+    # Merged again when the crawl is resumed
+    if finished:
+        for path in shards:
+            os.remove(path)
+
+    return finished
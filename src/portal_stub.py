@@ -0,0 +1,400 @@
+import html
+import json
+import time
+import random
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIRST_JOB_ID = 10000
+
+COMPANIES = (
+    'Dr. Ing. h.c. F. Porsche AG',
+    'Porsche Engineering Group GmbH',
+    'Porsche Digital GmbH',
+    'MHP Management- und IT-Beratung GmbH',
+)
+LOCATIONS = (
+    ('Weissach', 'Deutschland', 48.8471, 8.9284),
+    ('Stuttgart', 'Deutschland', 48.8342, 9.1522),
+    ('Leipzig', 'Deutschland', 51.4069, 12.2969),
+    ('Ludwigsburg', 'Deutschland', 48.8975, 9.1922),
+    ('Berlin', 'Deutschland', 52.5200, 13.4050),
+    ('Prag', 'Tschechien', 50.0755, 14.4378),
+)
+CAREER_LEVELS = ('Professionals', 'Studenten', 'Absolventen', 'Schüler')
+JOB_CATEGORIES = (
+    'Entwicklung',
+    'Engineering',
+    'E-Mobility',
+    'IT',
+    'Produktion',
+    'Vertrieb',
+)
+TITLE_WORDS = (
+    'Entwicklungsingenieur', 'Projektleiter', 'Softwareentwickler',
+    'Referent', 'Spezialist', 'Werkstudent', 'Praktikant', 'Experte',
+)
+TOPIC_WORDS = (
+    'Fahrwerk', 'Batteriesysteme', 'Antriebsstrang', 'Karosserie',
+    'Elektronik', 'Validierung', 'Datenanalyse', 'Motorsport', 'Logistik',
+    'Qualitätssicherung', 'Ladeinfrastruktur', 'Cloud-Plattformen',
+)
+SENTENCE_WORDS = (
+    'Konzeption', 'Koordination', 'Durchführung', 'Bewertung', 'Analyse',
+    'Abstimmung', 'Steuerung', 'Dokumentation', 'Weiterentwicklung', 'der',
+    'von', 'mit', 'im', 'Projekt', 'Fachbereich', 'Prüfständen', 'Fahrzeug',
+    'Anforderungen', 'Lieferanten', 'Teams', 'Kenntnisse', 'Erfahrung',
+    'abgeschlossenes', 'Studium', 'Informatik', 'Maschinenbau', 'sehr',
+    'gute', 'Englisch', 'Deutsch', 'Kommunikationsstärke', 'Teamfähigkeit',
+)
+
+JOB_PAGE = """<!DOCTYPE html>
+<html lang="de">
+<head>
+  <meta charset="utf-8">
+  <title>{title} | Porsche Karriere</title>
+</head>
+<body>
+  <main>
+    <h1 class="margin-bottom-gutter">{title}</h1>
+    <div class="jobad-base-info">
+      <span class="jobad-base-info-label">Kennziffer</span>
+      <span class="jobad-base-info-content">{code}</span>
+      <span class="jobad-base-info-label">Einstiegsart</span>
+      <span class="jobad-base-info-content">{entry_type}</span>
+      <span class="jobad-base-info-label">Einsatzort</span>
+      <span class="jobad-base-info-content">{location}</span>
+      <span class="jobad-base-info-label">Gesellschaft</span>
+      <span class="jobad-base-info-content">{company}</span>
+    </div>
+    <button aria-controls="aria-panel-task">Ihre Aufgaben</button>
+    <div id="aria-panel-task" class="accordion-panel">
+      <div class="rte">
+        <ul>
+{tasks}
+        </ul>
+      </div>
+    </div>
+    <button aria-controls="aria-panel-your-profile">Ihr Profil</button>
+    <div id="aria-panel-your-profile" class="accordion-panel">
+      <div class="rte">
+        <ul>
+{requirements}
+        </ul>
+      </div>
+    </div>
+  </main>
+</body>
+</html>
+"""
+
+
+def synthetic_job(job_id, seed=0):
+    """
+    Generate the data of a synthetic job ad.
+
+    The job is derived from its ID and the seed only, so every process
+    generates the same job for the same ID.
+
+    Args:
+        job_id (int): The job ad ID.
+        seed (int): Seed of the synthetic data set.
+
+    Returns:
+        dict: The job, with the fields of a scraped job ad and the search
+            API fields 'id', 'category', 'country', 'lat', 'lon' and
+            'published'.
+    """
+    rng = random.Random(f"{seed}-{job_id}")
+    city, country, lat, lon = rng.choice(LOCATIONS)
+
+    def sentences(count):
+        return [
+            ' '.join(rng.choices(SENTENCE_WORDS, k=rng.randint(6, 16)))
+            for _ in range(count)
+        ]
+
+    return {
+        'id': str(job_id),
+        'title': (
+            f"{rng.choice(TITLE_WORDS)} (m/w/d) {rng.choice(TOPIC_WORDS)}"
+        ),
+        'code': f"J{job_id:09d}",
+        'entry_type': rng.choice(CAREER_LEVELS),
+        'location': city,
+        'company': rng.choice(COMPANIES),
+        'tasks': sentences(rng.randint(4, 10)),
+        'requirements': sentences(rng.randint(3, 8)),
+        'category': rng.choice(JOB_CATEGORIES),
+        'country': country,
+        'lat': lat + rng.uniform(-0.01, 0.01),
+        'lon': lon + rng.uniform(-0.01, 0.01),
+        'published': (
+            f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        ),
+    }
+
+
+def search_descriptor(job):
+    """
+    Build the MatchedObjectDescriptor of a job as the search API returns it.
+
+    Args:
+        job (dict): The synthetic job.
+
+    Returns:
+        dict: The descriptor.
+    """
+    return {
+        'ID': job['id'],
+        'PositionTitle': job['title'],
+        'PositionURI': f"index.php?ac=jobad&id={job['id']}",
+        'PositionLocation': [{
+            'CountryName': job['country'],
+            'CityName': job['location'],
+            'Latitude': f"{job['lat']:.6f}",
+            'Longitude': f"{job['lon']:.6f}",
+        }],
+        'JobCategory': [{'Name': job['category']}],
+        'PublicationStartDate': job['published'],
+        'ParentOrganizationName': job['company'],
+        'CareerLevel': [{'Name': job['entry_type']}],
+        'PublicationCode': job['code'],
+    }
+
+
+def job_page(job):
+    """
+    Render the job ad page of a job.
+
+    Args:
+        job (dict): The synthetic job.
+
+    Returns:
+        str: The HTML page, with the markup the job ad extractor expects.
+    """
+    def list_items(texts):
+        return '\n'.join(
+            f"          <li><span>{html.escape(text)}</span></li>"
+            for text in texts
+        )
+
+    return JOB_PAGE.format(
+        title=html.escape(job['title']),
+        code=job['code'],
+        entry_type=html.escape(job['entry_type']),
+        location=html.escape(job['location']),
+        company=html.escape(job['company']),
+        tasks=list_items(job['tasks']),
+        requirements=list_items(job['requirements'])
+    )
+
+
+class _PortalRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/plain'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        parts = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(parts.query)
+        stub.count_request()
+
+        if parts.path == '/robots.txt':
+            self._send(200, b'User-agent: *\nAllow: /\n')
+            return
+
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if parts.path.rstrip('/') == '/search':
+            try:
+                search = json.loads(query['data'][0])
+            except (KeyError, ValueError):
+                self._send(400, b'Missing or malformed data parameter')
+                return
+            body = json.dumps(stub.search(search), ensure_ascii=False)
+            self._send(
+                200, body.encode('utf-8'), 'application/json; charset=utf-8'
+            )
+        elif parts.path == '/index.php' and query.get('ac') == ['jobad']:
+            job = stub.job(query.get('id', [''])[0])
+            if job is None:
+                self._send(404, b'Job ad not found')
+                return
+            self._send(
+                200,
+                job_page(job).encode('utf-8'),
+                'text/html; charset=utf-8'
+            )
+        else:
+            self._send(404, b'Not found')
+
+
+class PortalStub:
+    """
+    A local stand-in for the job portal, serving synthetic job ads.
+
+    The stub imitates the two endpoints the pipeline uses: the search API,
+    paged by the FirstItem and CountItem search parameters, and the job ad
+    pages at ``index.php?ac=jobad&id=``. Jobs have the IDs
+    ``FIRST_JOB_ID`` to ``FIRST_JOB_ID + job_count - 1`` and are generated
+    on demand, so large portals cost no memory up front. Every request but
+    robots.txt is delayed by ``latency`` seconds to imitate a remote server.
+
+    The server runs in a background thread. Use the stub as a context
+    manager, or call ``start`` and ``stop``.
+
+    Attributes:
+        job_count (int): Number of jobs on the portal.
+        latency (float): Delay of every response in seconds.
+        seed (int): Seed of the synthetic data set.
+        requests (int): Number of requests served.
+    """
+
+    def __init__(
+            self,
+            job_count=1000,
+            latency=0.0,
+            seed=0,
+            host='127.0.0.1',
+            port=0
+    ):
+        """
+        Initialize the PortalStub instance.
+
+        Args:
+            job_count (int): Number of jobs on the portal.
+            latency (float): Delay of every response in seconds.
+            seed (int): Seed of the synthetic data set.
+            host (str): Address to listen on.
+            port (int): Port to listen on, 0 for a free port.
+        """
+        self.job_count = job_count
+        self.latency = latency
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _PortalRequestHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def url(self):
+        """str: Base URL of the portal."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def search_endpoint(self):
+        """str: URL of the search API, for ``utils.build_api_url``."""
+        return f"{self.url}/search/"
+
+    @property
+    def job_url_prefix(self):
+        """str: URL of the job ad pages without the ID."""
+        return f"{self.url}/index.php?ac=jobad&id="
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        """Serve requests in the current thread until interrupted."""
+        self._server.serve_forever()
+
+    def count_request(self):
+        """Count a served request."""
+        with self._lock:
+            self.requests += 1
+
+    def job_ids(self):
+        """
+        List the IDs of the jobs on the portal.
+
+        Returns:
+            range: The job IDs.
+        """
+        return range(FIRST_JOB_ID, FIRST_JOB_ID + self.job_count)
+
+    def job(self, job_id):
+        """
+        Get a job of the portal.
+
+        Args:
+            job_id (str or int): The job ID.
+
+        Returns:
+            dict: The synthetic job, or None if there is no such job.
+        """
+        try:
+            job_id = int(job_id)
+        except ValueError:
+            return None
+
+        if job_id not in self.job_ids():
+            return None
+
+        return synthetic_job(job_id, self.seed)
+
+    def search(self, query):
+        """
+        Answer a search API query.
+
+        All jobs match, newest ID first. Only the paging parameters of the
+        query are evaluated.
+
+        Args:
+            query (dict): The decoded search query.
+
+        Returns:
+            dict: The search result.
+        """
+        parameters = query.get('SearchParameters', {})
+        first_item = max(1, int(parameters.get('FirstItem', 1)))
+        count_item = max(0, int(parameters.get('CountItem', self.job_count)))
+
+        job_ids = self.job_ids()[::-1][first_item - 1:][:count_item]
+        items = [
+            {
+                'MatchedObjectId': str(job_id),
+                'MatchedObjectDescriptor': search_descriptor(
+                    synthetic_job(job_id, self.seed)
+                ),
+            }
+            for job_id in job_ids
+        ]
+
+        return {
+            'SearchResult': {
+                'SearchResultCount': len(items),
+                'SearchResultCountAll': self.job_count,
+                'SearchResultItems': items,
+            }
+        }
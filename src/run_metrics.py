@@ -0,0 +1,426 @@
+import os
+import re
+import json
+import time
+import bisect
+import datetime
+import threading
+from contextlib import contextmanager
+
+REPORT_FILE = 'run_report.json'
+PROMETHEUS_FILE = 'run_report.prom'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+# Prefix of the histograms recorded in the Scrapy stats by the metrics
+# middlewares of the jobads_scrapy project
+CRAWLER_HISTOGRAM_PREFIX = 'jobads_metrics/'
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else f'{bound:g}'
+
+
+class Histogram:
+    """
+    A histogram with fixed buckets, as used by Prometheus.
+
+    Attributes:
+        buckets (tuple[float]): Upper bounds of the buckets, ascending. Values
+            above the last bound are counted in an implicit +Inf bucket.
+        counts (list[int]): Number of values per bucket, not cumulative.
+        sum (float): Sum of all values.
+        count (int): Number of values.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Initialize the Histogram instance.
+
+        Args:
+            buckets (iterable[float]): Upper bounds of the buckets.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    @classmethod
+    def from_stats(cls, stats, name, buckets=LATENCY_BUCKETS):
+        """
+        Rebuild a histogram recorded in the Scrapy stats.
+
+        The metrics middlewares store the number of values per bucket under
+        '<name>/le/<bound>', and the totals under '<name>/sum' and
+        '<name>/count'.
+
+        Args:
+            stats (dict): The crawler stats.
+            name (str): Stats key prefix of the histogram.
+            buckets (iterable[float]): Bucket bounds to include even if no
+                value fell into them, so that every run exports the same
+                buckets.
+
+        Returns:
+            Histogram: The histogram.
+        """
+        bucket_prefix = f'{name}/le/'
+        counts = {
+            float(key[len(bucket_prefix):]): value
+            for key, value in stats.items()
+            if key.startswith(bucket_prefix)
+        }
+        histogram = cls(
+            set(buckets)
+            | {bound for bound in counts if bound != float('inf')}
+        )
+
+        for bound, value in counts.items():
+            index = bisect.bisect_left(histogram.buckets, bound)
+            histogram.counts[index] += value
+
+        histogram.sum = float(stats.get(f'{name}/sum', 0))
+        histogram.count = int(stats.get(f'{name}/count', 0))
+
+        return histogram
+
+    def observe(self, value):
+        """
+        Add a value to the histogram.
+
+        Args:
+            value (float): The observed value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Get the cumulative bucket counts.
+
+        Returns:
+            list[tuple]: ``(upper_bound, count)`` pairs including +Inf.
+        """
+        bounds = self.buckets + (float('inf'),)
+        total = 0
+        result = []
+
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            result.append((bound, total))
+
+        return result
+
+    def quantile(self, q):
+        """
+        Estimate a quantile as the upper bound of the bucket containing it.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The estimate, or None if the histogram is empty.
+        """
+        if not self.count:
+            return None
+
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+
+    @staticmethod
+    def _json_bound(bound):
+        # JSON has no infinity
+        return '+Inf' if bound == float('inf') else bound
+
+    def to_dict(self):
+        """
+        Summarize the histogram for the JSON report.
+
+        Returns:
+            dict: Count, sum, mean, quantile estimates and cumulative buckets.
+        """
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self._json_bound(self.quantile(0.5)),
+            'p95': self._json_bound(self.quantile(0.95)),
+            'p99': self._json_bound(self.quantile(0.99)),
+            'buckets': {
+                _format_bound(bound): total
+                for bound, total in self.cumulative()
+            },
+        }
+
+
+class RunMetrics:
+    """
+    Collects timing and throughput metrics of one pipeline run.
+
+    Stages record their wall time, the number of processed items and
+    failures. Histograms record per-item latencies, e.g. of API requests or
+    wkhtmltopdf calls. The stats of the Scrapy crawl are merged in after the
+    crawl. The report is written as JSON and as a Prometheus textfile.
+
+    All methods are thread-safe, so workers of a thread pool can record into
+    the same instance.
+
+    Attributes:
+        version (str): Name of the snapshot the run belongs to.
+        stages (dict): Seconds, items and failures per stage name.
+        histograms (dict): Histograms by name.
+        counters (dict): Counter values by name.
+        crawler_stats (dict): The stats of the Scrapy crawl.
+    """
+
+    def __init__(self, version=None):
+        """
+        Initialize the RunMetrics instance.
+
+        Args:
+            version (str, optional): Name of the snapshot the run belongs to.
+        """
+        self.version = version
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.stages = {}
+        self.histograms = {}
+        self.counters = {}
+        self.crawler_stats = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record_stage(self, name, seconds, items=None, failures=None):
+        """
+        Add the wall time, items and failures of a stage.
+
+        Recording the same stage several times adds up the values.
+
+        Args:
+            name (str): Name of the stage.
+            seconds (float): Wall time spent in the stage.
+            items (int, optional): Number of processed items.
+            failures (int, optional): Number of failed items.
+        """
+        with self._lock:
+            stage = self.stages.setdefault(
+                name, {'seconds': 0.0, 'items': 0, 'failures': 0}
+            )
+            stage['seconds'] += seconds
+            stage['items'] += items or 0
+            stage['failures'] += failures or 0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measure the wall time of a stage.
+
+        Args:
+            name (str): Name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS):
+        """
+        Add a value to a histogram, creating it on first use.
+
+        Args:
+            name (str): Name of the histogram.
+            value (float): The observed value.
+            buckets (iterable[float]): Bucket bounds if the histogram is new.
+        """
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(buckets)
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Measure the duration of a block into a histogram.
+
+        Args:
+            name (str): Name of the histogram, the duration is recorded in
+                seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def increment(self, name, value=1):
+        """
+        Increase a counter.
+
+        Args:
+            name (str): Name of the counter.
+            value (int): Amount to add.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge_crawler_stats(self, stats):
+        """
+        Merge the stats of a finished Scrapy crawl.
+
+        The histograms recorded by the metrics middlewares are added to the
+        histograms of the run; all stats are kept for the report.
+
+        Args:
+            stats (dict): The crawler stats, as returned by
+                ``crawler.stats.get_stats()``.
+        """
+        names = {
+            key.split('/le/')[0]
+            for key in stats
+            if key.startswith(CRAWLER_HISTOGRAM_PREFIX) and '/le/' in key
+        }
+
+        with self._lock:
+            for name in names:
+                short_name = name[len(CRAWLER_HISTOGRAM_PREFIX):]
+                self.histograms[short_name] = Histogram.from_stats(
+                    stats, name
+                )
+
+            self.crawler_stats.update(
+                (
+                    key,
+                    value.isoformat() if isinstance(
+                        value, (datetime.datetime, datetime.date)
+                    ) else value
+                )
+                for key, value in stats.items()
+                if not key.startswith(CRAWLER_HISTOGRAM_PREFIX)
+            )
+
+    def report(self):
+        """
+        Build the run report.
+
+        Returns:
+            dict: The report, as written to the JSON file.
+        """
+        with self._lock:
+            stages = {}
+            for name, stage in self.stages.items():
+                stages[name] = dict(stage)
+                stages[name]['items_per_second'] = (
+                    stage['items'] / stage['seconds']
+                    if stage['items'] and stage['seconds'] else None
+                )
+
+            return {
+                'version': self.version,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'wall_seconds': time.perf_counter() - self._start,
+                'stages': stages,
+                'histograms': {
+                    name: histogram.to_dict()
+                    for name, histogram in self.histograms.items()
+                },
+                'counters': dict(self.counters),
+                'crawler_stats': dict(self.crawler_stats),
+            }
+
+    def to_prometheus(self, report=None):
+        """
+        Render the run report in the Prometheus text exposition format.
+
+        Args:
+            report (dict, optional): The report to render. Defaults to the
+                current report.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        report = report or self.report()
+        version = report['version'] or ''
+        lines = [
+            '# TYPE jobads_run_wall_seconds gauge',
+            f'jobads_run_wall_seconds{{version="{version}"}} '
+            f'{report["wall_seconds"]}',
+            '# TYPE jobads_run_started_timestamp_seconds gauge',
+            f'jobads_run_started_timestamp_seconds{{version="{version}"}} '
+            f'{self.started_at.timestamp()}',
+        ]
+
+        for field in ('seconds', 'items', 'failures', 'items_per_second'):
+            lines.append(f'# TYPE jobads_stage_{field} gauge')
+            for name, stage in report['stages'].items():
+                if stage[field] is not None:
+                    lines.append(
+                        f'jobads_stage_{field}{{version="{version}",'
+                        f'stage="{name}"}} {stage[field]}'
+                    )
+
+        for name, histogram in self.histograms.items():
+            metric = f'jobads_{_metric_name(name)}'
+            lines.append(f'# TYPE {metric} histogram')
+            for bound, total in histogram.cumulative():
+                lines.append(
+                    f'{metric}_bucket{{version="{version}",'
+                    f'le="{_format_bound(bound)}"}} {total}'
+                )
+            lines.append(
+                f'{metric}_sum{{version="{version}"}} {histogram.sum}'
+            )
+            lines.append(
+                f'{metric}_count{{version="{version}"}} {histogram.count}'
+            )
+
+        for name, value in report['counters'].items():
+            metric = f'jobads_{_metric_name(name)}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{{version="{version}"}} {value}')
+
+        lines.append('# TYPE jobads_crawler_stat gauge')
+        for key, value in sorted(report['crawler_stats'].items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(
+                    f'jobads_crawler_stat{{version="{version}",'
+                    f'key="{key}"}} {value}'
+                )
+
+        return '\n'.join(lines) + '\n'
+
+    def write_report(self, directory):
+        """
+        Write the run report as JSON and as a Prometheus textfile.
+
+        Both files are written to temporary files first and moved into place
+        when complete, so a metrics collector never reads a partial file.
+
+        Args:
+            directory (str): The data directory of the snapshot.
+
+        Returns:
+            dict: The written report.
+        """
+        report = self.report()
+        contents = {
+            REPORT_FILE: json.dumps(report, indent=2, default=str),
+            PROMETHEUS_FILE: self.to_prometheus(report),
+        }
+
+        for file_name, content in contents.items():
+            path = os.path.join(directory, file_name)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                file.write(content)
+            os.replace(temp_path, path)
+
+        print(f"Run report written to {os.path.join(directory, REPORT_FILE)}")
+
+        return report
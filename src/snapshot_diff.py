@@ -0,0 +1,315 @@
+import os
+import json
+import hashlib
+import numpy as np
+from src.snapshot_io import iter_jobs
+
+DIFF_FIELDS = (
+    'title',
+    'entry_type',
+    'location',
+    'company',
+    'tasks',
+    'requirements',
+)
+DIGEST_SUFFIX = '.digests.npz'
+
+_ENCODER = json.JSONEncoder(sort_keys=True, ensure_ascii=False)
+
+
+def _digest(value):
+    """
+    Hash a JSON value into 64 bits.
+
+    Args:
+        value: The value, anything JSON serializable.
+
+    Returns:
+        int: The digest.
+    """
+    data = _ENCODER.encode(value)
+    digest = hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest()
+
+    return int.from_bytes(digest, 'little')
+
+
+class SnapshotDigests:
+    """
+    The codes of the jobs in a snapshot with a hash of each of their fields.
+
+    Only the hashes are kept, so the memory used grows with the number of
+    jobs but not with the size of the ads. Column 0 of the digests hashes
+    all fields not in ``DIFF_FIELDS``, the other columns one field of
+    ``DIFF_FIELDS`` each.
+
+    The digests are cached next to the snapshot file and reused as long as
+    the snapshot file does not change, so diffing a series of snapshots
+    reads every snapshot only once.
+
+    Attributes:
+        codes (np.ndarray): Job codes, sorted.
+        digests (np.ndarray): One row of 64-bit hashes per job.
+    """
+
+    def __init__(self, codes, digests):
+        """
+        Initialize the SnapshotDigests instance.
+
+        Args:
+            codes (np.ndarray): Job codes, sorted.
+            digests (np.ndarray): One row of hashes per job.
+        """
+        self.codes = codes
+        self.digests = digests
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """
+        Hash the jobs of a snapshot file, streaming it.
+
+        Jobs without a code are ignored. If a code occurs more than once,
+        the last job wins, like when merging snapshots.
+
+        Args:
+            path (str): Path to the snapshot file.
+
+        Returns:
+            SnapshotDigests: The digests.
+        """
+        rows = {}
+
+        for job in iter_jobs(path):
+            code = job.get('code')
+            if code:
+                other = {
+                    field: value
+                    for field, value in job.items()
+                    if field not in DIFF_FIELDS
+                }
+                rows[code] = [_digest(other)] + [
+                    _digest(job.get(field)) for field in DIFF_FIELDS
+                ]
+
+        codes = np.array(sorted(rows), dtype=str)
+        digests = np.array(
+            [rows[code] for code in codes], dtype=np.uint64
+        ).reshape(len(codes), len(DIFF_FIELDS) + 1)
+
+        return cls(codes, digests)
+
+    @classmethod
+    def load(cls, path, cache=True):
+        """
+        Get the digests of a snapshot file, using the cache if it is current.
+
+        Args:
+            path (str): Path to the snapshot file.
+            cache (bool): Read and write the cache file next to the
+                snapshot.
+
+        Returns:
+            SnapshotDigests: The digests.
+        """
+        stat = os.stat(path)
+        cache_path = f"{path}{DIGEST_SUFFIX}"
+        signature = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+        if cache and os.path.exists(cache_path):
+            with np.load(cache_path) as archive:
+                if (
+                        np.array_equal(archive['signature'], signature)
+                        and tuple(archive['fields']) == DIFF_FIELDS
+                ):
+                    return cls(archive['codes'], archive['digests'])
+
+        snapshot = cls.from_snapshot(path)
+
+        if cache:
+            temp_path = f"{cache_path}.tmp.npz"
+            np.savez(
+                temp_path,
+                codes=snapshot.codes,
+                digests=snapshot.digests,
+                fields=np.array(DIFF_FIELDS),
+                signature=signature
+            )
+            os.replace(temp_path, cache_path)
+
+        return snapshot
+
+
+class SnapshotDiff:
+    """
+    The differences between two snapshots.
+
+    Attributes:
+        added (list[str]): Codes of the jobs only in the new snapshot.
+        removed (list[str]): Codes of the jobs only in the old snapshot.
+        modified (dict): Names of the changed fields by job code. Fields not
+            in ``DIFF_FIELDS`` are reported as 'other'.
+        unchanged (int): Number of jobs that did not change.
+        changes (dict): Old and new value of every changed field by job
+            code, only filled by ``load_changes``.
+    """
+
+    def __init__(self, added, removed, modified, unchanged):
+        """
+        Initialize the SnapshotDiff instance.
+
+        Args:
+            added (list[str]): Codes of the added jobs.
+            removed (list[str]): Codes of the removed jobs.
+            modified (dict): Names of the changed fields by job code.
+            unchanged (int): Number of unchanged jobs.
+        """
+        self.added = added
+        self.removed = removed
+        self.modified = modified
+        self.unchanged = unchanged
+        self.changes = {}
+
+    @classmethod
+    def compare(cls, old, new):
+        """
+        Compare the digests of two snapshots.
+
+        Args:
+            old (SnapshotDigests): Digests of the old snapshot.
+            new (SnapshotDigests): Digests of the new snapshot.
+
+        Returns:
+            SnapshotDiff: The differences.
+        """
+        common, old_index, new_index = np.intersect1d(
+            old.codes, new.codes, assume_unique=True, return_indices=True
+        )
+        added = np.setdiff1d(new.codes, common, assume_unique=True)
+        removed = np.setdiff1d(old.codes, common, assume_unique=True)
+
+        old_digests = old.digests[old_index]
+        new_digests = new.digests[new_index]
+        changed = old_digests != new_digests
+        modified = {}
+
+        for row in np.flatnonzero(changed.any(axis=1)):
+            fields = [
+                field
+                for field, field_changed in zip(DIFF_FIELDS, changed[row, 1:])
+                if field_changed
+            ]
+            if changed[row, 0]:
+                fields.append('other')
+            modified[str(common[row])] = fields
+
+        return cls(
+            added.tolist(),
+            removed.tolist(),
+            modified,
+            len(common) - len(modified)
+        )
+
+    def load_changes(self, old_path, new_path):
+        """
+        Read the old and new values of the changed fields.
+
+        Both snapshots are streamed again, only the values of modified jobs
+        are kept.
+
+        Args:
+            old_path (str): Path to the old snapshot file.
+            new_path (str): Path to the new snapshot file.
+
+        Returns:
+            dict: ``{field: (old_value, new_value)}`` by job code.
+        """
+        values = {}
+
+        for side, path in enumerate((old_path, new_path)):
+            for job in iter_jobs(path):
+                fields = self.modified.get(job.get('code'))
+                if fields is None:
+                    continue
+                record = values.setdefault(job['code'], {})
+                for field in fields:
+                    if field != 'other':
+                        record.setdefault(field, [None, None])[side] = (
+                            job.get(field)
+                        )
+
+        self.changes = {
+            code: {field: tuple(pair) for field, pair in fields.items()}
+            for code, fields in values.items()
+        }
+
+        return self.changes
+
+    def summary(self):
+        """
+        Summarize the differences.
+
+        Returns:
+            dict: The number of added, removed, modified and unchanged jobs
+                and how often every field changed.
+        """
+        field_counts = {}
+        for fields in self.modified.values():
+            for field in fields:
+                field_counts[field] = field_counts.get(field, 0) + 1
+
+        return {
+            'added': len(self.added),
+            'removed': len(self.removed),
+            'modified': len(self.modified),
+            'unchanged': self.unchanged,
+            'fields': field_counts,
+        }
+
+    def to_dict(self):
+        """
+        Convert the differences for a JSON report.
+
+        Returns:
+            dict: The summary, the codes of added and removed jobs, the
+                changed fields and, if loaded, their old and new values.
+        """
+        report = self.summary()
+        report['added_codes'] = self.added
+        report['removed_codes'] = self.removed
+        report['modified_fields'] = self.modified
+        if self.changes:
+            report['changes'] = {
+                code: {
+                    field: {'old': old, 'new': new}
+                    for field, (old, new) in fields.items()
+                }
+                for code, fields in self.changes.items()
+            }
+
+        return report
+
+
+def diff_snapshots(old_path, new_path, details=False, cache=True):
+    """
+    Compare two snapshot files.
+
+    Args:
+        old_path (str): Path to the old snapshot file.
+        new_path (str): Path to the new snapshot file.
+        details (bool): Also read the old and new values of changed fields.
+        cache (bool): Cache the digests of the snapshots next to them.
+
+    Returns:
+        SnapshotDiff: The differences.
+    """
+    diff = SnapshotDiff.compare(
+        SnapshotDigests.load(old_path, cache),
+        SnapshotDigests.load(new_path, cache)
+    )
+
+    if details and diff.modified:
+        diff.load_changes(old_path, new_path)
+
+    return diff
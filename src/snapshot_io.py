@@ -0,0 +1,238 @@
+import os
+import gzip
+import json
+
+JSON_LINES_SUFFIXES = ('.jsonl', '.jsonl.gz')
+CHUNK_SIZE = 64 * 1024
+SNAPSHOT_FILES = (
+    'scraped_jobs.jsonl.gz',
+    'scraped_jobs.jsonl',
+    'scraped_jobs.json',
+)
+
+
+def _open_text(path, mode, compressed=None):
+    """
+    Open a snapshot file in text mode, transparently handling gzip.
+
+    Args:
+        path (str): Path to the snapshot file.
+        mode (str): 'r' or 'w'.
+        compressed (bool, optional): Whether the file is gzip compressed.
+            Defaults to whether the file name ends with '.gz'.
+
+    Returns:
+        io.TextIOBase: The opened file.
+    """
+    if compressed is None:
+        compressed = path.endswith('.gz')
+
+    if compressed:
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+
+def is_json_lines(path):
+    """
+    Check whether a snapshot file uses the JSON Lines format.
+
+    Args:
+        path (str): Path to the snapshot file.
+
+    Returns:
+        bool: True for '.jsonl' and '.jsonl.gz' files.
+    """
+    return path.endswith(JSON_LINES_SUFFIXES)
+
+
+def find_snapshot_file(directory):
+    """
+    Find the snapshot file in the data directory of a snapshot.
+
+    Args:
+        directory (str): The data directory of the snapshot.
+
+    Returns:
+        str: Path to the snapshot file, or None if there is none.
+    """
+    for file_name in SNAPSHOT_FILES:
+        path = os.path.join(directory, file_name)
+        if os.path.exists(path):
+            return path
+
+    return None
+
+
+def iter_jobs(path):
+    """
+    Lazily read the jobs of a snapshot file.
+
+    JSON Lines snapshots, optionally gzip compressed, are read line by line.
+    A truncated last record, as left by an interrupted crawl, is skipped so
+    that all completed records stay readable. Snapshots with a single JSON
+    array are decoded incrementally, one job at a time.
+
+    Args:
+        path (str): Path to the snapshot file.
+
+    Yields:
+        dict: The next job.
+    """
+    if is_json_lines(path):
+        yield from _iter_json_lines(path)
+    else:
+        yield from _iter_json_array(path)
+
+
+def _iter_json_lines(path):
+    with _open_text(path, 'r') as file:
+        try:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    if line.endswith('\n'):
+                        raise
+                    # Last line of an interrupted write
+                    return
+        except EOFError:
+            # Compressed stream of an interrupted write
+            return
+
+
+def _iter_json_array(path):
+    decoder = json.JSONDecoder()
+
+    with _open_text(path, 'r') as file:
+        buffer = file.read(CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} does not contain a JSON array")
+        buffer = buffer[1:]
+        exhausted = False
+
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+
+            if buffer.startswith(']'):
+                return
+
+            try:
+                job, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+                chunk = file.read(CHUNK_SIZE)
+                exhausted = not chunk
+                buffer += chunk
+                continue
+
+            yield job
+            buffer = buffer[end:]
+
+
+def write_jobs(path, jobs):
+    """
+    Write jobs to a snapshot file.
+
+    The file is written to a temporary file first and moved into place when
+    complete. Its format follows from the file name: JSON Lines for '.jsonl'
+    and '.jsonl.gz', a JSON array otherwise.
+
+    Args:
+        path (str): Path to the snapshot file.
+        jobs (iterable[dict]): The jobs to write. Consumed lazily.
+
+    Returns:
+        int: Number of written jobs.
+    """
+    temp_path = f"{path}.tmp"
+    json_lines = is_json_lines(path)
+    count = 0
+
+    with _open_text(temp_path, 'w', path.endswith('.gz')) as file:
+        if not json_lines:
+            file.write('[')
+
+        for job in jobs:
+            line = json.dumps(job, ensure_ascii=False)
+            if json_lines:
+                file.write(f"{line}\n")
+            else:
+                file.write(f"{',' if count else ''}\n{line}")
+            count += 1
+
+        if not json_lines:
+            file.write('\n]')
+
+    os.replace(temp_path, path)
+
+    return count
+
+
+def repair_json_lines(path):
+    """
+    Remove the truncated last record of an interrupted write.
+
+    New records can then be appended to the file. Uncompressed files are
+    cut after the last complete line; compressed files are rewritten with
+    their complete records.
+
+    Args:
+        path (str): Path to the JSON Lines snapshot file.
+
+    Returns:
+        int: Number of bytes removed from uncompressed files, 0 if nothing
+            was removed or the file is compressed.
+    """
+    if path.endswith('.gz'):
+        write_jobs(path, list(iter_jobs(path)))
+        return 0
+
+    with open(path, 'rb+') as file:
+        size = file.seek(0, os.SEEK_END)
+        position = size
+
+        # Search backwards for the end of the last complete line
+        while position > 0:
+            start = max(0, position - CHUNK_SIZE)
+            file.seek(start)
+            chunk = file.read(position - start)
+            newline = chunk.rfind(b'\n')
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+
+        if position < size:
+            file.truncate(position)
+
+    return size - position
+
+
+def feed_options(path, overwrite=True):
+    """
+    Build the Scrapy feed export options for writing a snapshot file.
+
+    Args:
+        path (str): Path to the snapshot file.
+        overwrite (bool): Replace an existing file instead of appending to
+            it. Only JSON Lines files can be appended to.
+
+    Returns:
+        dict: Options for the ``FEEDS`` setting entry of the file.
+    """
+    options = {
+        'format': 'jsonlines' if is_json_lines(path) else 'json',
+        'encoding': 'utf-8',
+        'overwrite': overwrite,
+    }
+
+    if path.endswith('.gz'):
+        options['postprocessing'] = [
+            'scrapy.extensions.postprocessing.GzipPlugin'
+        ]
+
+    return options
@@ -0,0 +1,35 @@
+import os
+import sys
+import json
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPY_PROJECT_PATH = os.path.join(PROJECT_ROOT, "src", "jobads_scrapy")
+
+for path in (PROJECT_ROOT, SCRAPY_PROJECT_PATH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def portal():
+    """A running PortalStub with 20 synthetic jobs."""
+    from src.portal_stub import PortalStub
+
+    with PortalStub(job_count=20) as stub:
+        yield stub
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A data directory with a filter configuration matching all jobs."""
+    from src.portal_stub import JOB_CATEGORIES
+
+    with open(tmp_path / "filter_config.json", "w") as file:
+        json.dump(
+            {"filter": {"field": "JobCategory.Name", "in": JOB_CATEGORIES}},
+            file
+        )
+
+    return tmp_path
@@ -0,0 +1,67 @@
+import pytest
+
+from src.dedup import DuplicateFinder, find_duplicate_jobs, shingles
+
+TASKS = [
+    "Entwicklung von Steuergeräten für elektrische Antriebe",
+    "Planung und Durchführung von Versuchen am Prüfstand",
+    "Abstimmung mit Lieferanten und internen Fachbereichen",
+    "Dokumentation der Ergebnisse und Präsentation im Team",
+    "Analyse von Messdaten und Ableitung von Maßnahmen",
+    "Begleitung der Serienentwicklung bis zum Produktionsstart",
+]
+REQUIREMENTS = [
+    "Abgeschlossenes Studium der Elektrotechnik oder Mechatronik",
+    "Mehrjährige Berufserfahrung in der Fahrzeugentwicklung",
+    "Sehr gute Deutsch- und Englischkenntnisse",
+]
+
+
+def job(code, tasks=TASKS, requirements=REQUIREMENTS):
+    return {"code": code, "tasks": tasks, "requirements": requirements}
+
+
+def test_shingles_ignore_case_umlauts_and_punctuation():
+    assert set(shingles("Qualität der Prüfung, bitte!")) == set(
+        shingles("qualitaet der pruefung bitte")
+    )
+    assert len(shingles("eins zwei")) == 1
+    assert len(shingles("")) == 0
+
+
+def test_identical_and_near_identical_jobs_are_clustered():
+    jobs = [
+        job("J1"),
+        job("J2", tasks=["Entwicklung von Batteriezellen im Labor"]),
+        job("J3"),
+        # Another site, one requirement more
+        job("J4", requirements=REQUIREMENTS + ["Führerschein Klasse B"]),
+    ]
+
+    assert find_duplicate_jobs(jobs) == [["J1", "J3", "J4"]]
+
+
+def test_different_jobs_are_not_clustered():
+    jobs = [
+        job("J1"),
+        job("J2", tasks=TASKS[:2], requirements=["Ausbildung als Mechaniker"]),
+    ]
+
+    assert find_duplicate_jobs(jobs) == []
+
+
+def test_finder_reports_the_first_job_of_a_cluster():
+    finder = DuplicateFinder(threshold=0.8)
+    text = "\n".join(TASKS)
+
+    assert finder.add("J1", text) is None
+    assert finder.add("J2", text) == "J1"
+    assert finder.add("J3", "") is None
+    assert finder.similarity("J1", "J2") == 1.0
+    assert "J3" not in finder
+    assert len(finder) == 2
+
+
+def test_signature_length_must_split_into_bands():
+    with pytest.raises(ValueError):
+        DuplicateFinder(num_perm=100, bands=16)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from src.geo_index import (
+    KM_PER_DEGREE,
+    GeoIndex,
+    haversine_km,
+    parse_coordinates
+)
+
+
+@pytest.fixture
+def locations():
+    rng = np.random.default_rng(0)
+    count = 500
+    return (
+        np.arange(count).astype(str),
+        rng.uniform(-89, 89, count),
+        rng.uniform(-180, 180, count),
+    )
+
+
+def brute_force_within(locations, lat, lon, radius_km):
+    job_ids, lats, lons = locations
+    distances = haversine_km(lat, lon, lats, lons)
+    return sorted(job_ids[distances <= radius_km].tolist())
+
+
+def test_parse_coordinates_marks_missing_values():
+    assert np.isnan(parse_coordinates(["48.8", "", "n/a"])).tolist() == [
+        False, True, True
+    ]
+    assert parse_coordinates(["48.8", "9"]).tolist() == [48.8, 9.0]
+
+
+def test_haversine_km():
+    assert haversine_km(0, 0, np.array([1.0]), np.array([0.0]))[0] == (
+        pytest.approx(KM_PER_DEGREE)
+    )
+
+
+@pytest.mark.parametrize("lat, lon, radius_km", [
+    (48.8, 9.0, 1500),
+    (0, 179.9, 2000),
+    (88, -30, 800),
+    (-60, -100, 5000),
+    (10, 10, 25000),
+])
+def test_within_matches_brute_force(locations, lat, lon, radius_km):
+    index = GeoIndex(*locations, cell_size=2)
+
+    found = index.within(lat, lon, radius_km)
+
+    assert sorted(job_id for job_id, *_ in found) == brute_force_within(
+        locations, lat, lon, radius_km
+    )
+    distances = [distance for *_, distance in found]
+    assert distances == sorted(distances)
+
+
+def test_nearest_returns_the_closest_locations(locations):
+    index = GeoIndex(*locations, cell_size=2)
+    job_ids, lats, lons = locations
+    order = np.argsort(haversine_km(-20, 60, lats, lons))
+
+    found = index.nearest(-20, 60, count=5)
+
+    assert [job_id for job_id, *_ in found] == job_ids[order[:5]].tolist()
+
+
+def test_missing_coordinates_are_dropped_and_index_is_saved(tmp_path):
+    index = GeoIndex.from_locations({
+        "1": [(48.8, 9.0), (51.3, 12.4)],
+        "2": [(float("nan"), 9.0)],
+    })
+    path = str(tmp_path / "job_locations.npz")
+    index.save(path)
+
+    loaded = GeoIndex.load(path)
+    assert len(loaded) == 2
+    assert [job_id for job_id, *_ in loaded.within(51.3, 12.4, 10)] == ["1"]
+    assert GeoIndex.from_locations({}).nearest(0, 0) == []
@@ -0,0 +1,118 @@
+import pytest
+
+from src.job_filter import (
+    SearchResultTable,
+    compile_filter,
+    filter_expression_from_config
+)
+
+
+def item(
+        category,
+        organization="Dr. Ing. h.c. F. Porsche AG",
+        published="2023-10-19",
+        sites=((48.8, 9.0),)
+):
+    return {"MatchedObjectDescriptor": {
+        "JobCategory": [{"Name": name} for name in category.split("|")],
+        "ParentOrganizationName": organization,
+        "PublicationStartDate": published,
+        "PositionLocation": [
+            {"Latitude": str(lat), "Longitude": str(lon)}
+            for lat, lon in sites
+        ],
+    }}
+
+
+@pytest.fixture
+def table():
+    return SearchResultTable([
+        item("IT"),
+        item("Sales|IT", organization="Porsche Digital GmbH"),
+        item("Sales", published="2023-12-31"),
+        item("Produktion", published="2024-01-02", sites=((51.3, 12.4),)),
+        item("", organization=None, published=None, sites=()),
+    ])
+
+
+def matches(expression, table):
+    return compile_filter(expression)(table).tolist()
+
+
+def test_columns_expand_lists_of_values(table):
+    values, owners = table.column("JobCategory.Name")
+
+    assert values.tolist() == ["IT", "Sales", "IT", "Sales", "Produktion", ""]
+    assert owners.tolist() == [0, 1, 1, 2, 3, 4]
+    assert table.scalar_column("JobCategory.Name").tolist() == [
+        "IT", "Sales", "Sales", "Produktion", ""
+    ]
+
+
+def test_in_matches_any_value_of_an_item(table):
+    assert matches({"field": "JobCategory.Name", "in": ["IT"]}, table) == [
+        True, True, False, False, False
+    ]
+
+
+def test_eq_treats_missing_values_as_empty(table):
+    expression = {
+        "field": "ParentOrganizationName",
+        "eq": "Dr. Ing. h.c. F. Porsche AG",
+    }
+
+    assert matches(expression, table) == [True, False, True, True, False]
+
+
+def test_range_bounds_are_inclusive_prefixes(table):
+    expression = {
+        "field": "PublicationStartDate", "from": "2023-10", "to": "2023-12"
+    }
+
+    assert matches(expression, table) == [True, True, True, False, False]
+    assert matches(
+        {"field": "PublicationStartDate", "from": "2024"}, table
+    ) == [False, False, False, True, False]
+
+
+def test_radius_matches_items_with_a_site_nearby(table):
+    expression = {
+        "field": "PositionLocation", "within_km": 30, "lat": 48.85, "lon": 9.0
+    }
+
+    assert matches(expression, table) == [True, True, True, False, False]
+
+
+def test_expressions_combine(table):
+    expression = {"all": [
+        {"field": "JobCategory.Name", "in": ["IT", "Sales"]},
+        {"not": {"any": [
+            {"field": "ParentOrganizationName", "eq": "Porsche Digital GmbH"},
+            {"field": "PublicationStartDate", "from": "2023-12"},
+        ]}},
+    ]}
+
+    assert matches(expression, table) == [True, False, False, False, False]
+    assert matches({"any": []}, table) == [False] * 5
+    assert matches({"all": []}, table) == [True] * 5
+
+
+@pytest.mark.parametrize("expression", [
+    ["IT"],
+    {"field": "JobCategory.Name"},
+    {"field": "PositionLocation", "within_km": 30, "lat": 48.8},
+    {"unknown": []},
+])
+def test_malformed_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        compile_filter(expression)
+
+
+def test_legacy_keys_are_combined_with_the_filter(table):
+    expression = filter_expression_from_config({
+        "job_functions": ["IT", "Sales"],
+        "organization_name": "Dr. Ing. h.c. F. Porsche AG",
+        "filter": {"field": "PublicationStartDate", "to": "2023-11"},
+    })
+
+    assert matches(expression, table) == [True, False, False, False, False]
@@ -0,0 +1,95 @@
+import pytest
+
+from src.job_registry import JobRegistry, job_id_from_code, merge_snapshot
+from src.snapshot_io import iter_jobs, write_jobs
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = JobRegistry(str(tmp_path / "job_registry.json"))
+    registry.update([(1, "2023-10-01"), (2, "2023-10-02"), (3, "2023-10-03")])
+    registry.mark_scraped(["1", "2", "3"], "2023-10-04T00:00:00+00:00")
+    return registry
+
+
+def test_job_id_from_code():
+    assert job_id_from_code("J000008392") == "8392"
+
+
+def test_new_registry_returns_all_listed_jobs(tmp_path):
+    registry = JobRegistry(str(tmp_path / "job_registry.json"))
+
+    assert registry.update([(2, "2023-10-02"), (1, "2023-10-01")]) == [
+        "2", "1"
+    ]
+    assert len(registry) == 2
+
+
+def test_update_returns_new_and_republished_jobs(registry):
+    delta = registry.update([
+        (1, "2023-10-01"),
+        (3, "2023-11-01"),
+        (4, "2023-11-02"),
+    ])
+
+    assert delta == ["3", "4"]
+    assert "2" not in registry
+    assert registry.jobs["1"]["last_scraped"] is not None
+
+
+def test_unscraped_jobs_stay_in_the_delta(registry):
+    listed = [(1, "2023-10-01"), (4, "2023-11-02"), (5, "2023-11-03")]
+    registry.update(listed)
+    registry.mark_scraped(["4", "6"])
+
+    assert registry.update(listed) == ["5"]
+    assert "6" not in registry
+
+
+def test_reset_returns_all_jobs_again(registry):
+    registry.reset()
+
+    assert registry.update([(1, "2023-10-01"), (2, "2023-10-02")]) == [
+        "1", "2"
+    ]
+
+
+def test_registry_is_saved(registry):
+    registry.save()
+
+    assert JobRegistry(registry.registry_file).jobs == registry.jobs
+
+
+def test_merge_replaces_changed_and_drops_delisted_jobs(tmp_path, registry):
+    snapshot_file = str(tmp_path / "scraped_jobs.jsonl")
+    delta_file = str(tmp_path / "scraped_jobs_delta.jsonl")
+    write_jobs(snapshot_file, [
+        {"code": "J00001", "title": "Old 1"},
+        {"code": "J00002", "title": "Old 2"},
+        {"code": "J00003", "title": "Old 3"},
+    ])
+    registry.update([(1, "2023-10-01"), (3, "2023-11-01"), (4, "2023-11-02")])
+    write_jobs(delta_file, [
+        {"code": "J00003", "title": "New 3"},
+        {"code": "J00004", "title": "New 4"},
+    ])
+
+    assert merge_snapshot(snapshot_file, delta_file, registry) == 3
+    assert [job["title"] for job in iter_jobs(snapshot_file)] == [
+        "Old 1", "New 3", "New 4"
+    ]
+    assert registry.update(
+        [(1, "2023-10-01"), (3, "2023-11-01"), (4, "2023-11-02")]
+    ) == []
+
+
+def test_merge_without_delta_only_drops_delisted_jobs(tmp_path, registry):
+    snapshot_file = str(tmp_path / "scraped_jobs.jsonl")
+    write_jobs(snapshot_file, [
+        {"code": "J00001", "title": "Job 1"},
+        {"code": "J00002", "title": "Job 2"},
+    ])
+    registry.update([(2, "2023-10-02")])
+
+    assert merge_snapshot(snapshot_file, None, registry) == 1
+    assert [job["code"] for job in iter_jobs(snapshot_file)] == ["J00002"]
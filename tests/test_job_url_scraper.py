@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from src.job_url_scraper import JobUrlScraper
+from src.run_metrics import RunMetrics
+from utils import build_api_url
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_paged_fetch_records_request_latencies(portal, data_dir, use_async):
+    if use_async:
+        pytest.importorskip("aiohttp")
+
+    metrics = RunMetrics()
+    output_file = str(data_dir / "job_ids.npy")
+    scraper = JobUrlScraper(
+        build_api_url(endpoint=portal.search_endpoint),
+        output_file,
+        str(data_dir / "filter_config.json"),
+        page_size=6,
+        use_async=use_async,
+        metrics=metrics
+    )
+
+    job_ids = scraper.scrape_job_urls()
+
+    expected = [str(job_id) for job_id in portal.job_ids()]
+    assert sorted(job_ids) == expected
+    assert sorted(np.load(output_file).astype(str).tolist()) == expected
+    # One request per page of the 20 jobs
+    assert metrics.histograms["api_request_latency"].count == 4
@@ -0,0 +1,80 @@
+import pytest
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from jobads_scrapy.middlewares import (
+    JobAdsDownloadMetricsMiddleware,
+    JobAdsHttpCacheMiddleware
+)
+from src.run_metrics import LATENCY_BUCKETS, Histogram
+
+JOB_URL = "https://jobs.porsche.com/index.php?ac=jobad&id=1234"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    crawler = get_crawler(settings_dict={
+        "JOBADS_HTTPCACHE_ENABLED": True,
+        "JOBADS_HTTPCACHE_DIR": str(tmp_path / "httpcache"),
+        "JOBADS_HTTPCACHE_TTL": 12 * 60 * 60,
+    })
+    cache = JobAdsHttpCacheMiddleware.from_crawler(crawler)
+
+    response = HtmlResponse(
+        JOB_URL, body=b"<html>old</html>", headers={"ETag": '"v1"'}
+    )
+    cache.process_response(Request(JOB_URL), response, None)
+    return cache
+
+
+def test_fresh_response_is_served_from_cache(cache):
+    response = cache.process_request(Request(JOB_URL), None)
+
+    assert "cached" in response.flags
+    assert response.body == b"<html>old</html>"
+
+
+def test_changed_job_is_revalidated_within_ttl(cache):
+    request = Request(JOB_URL, meta={"jobads_revalidate": True})
+
+    assert cache.process_request(request, None) is None
+    assert request.headers["If-None-Match"] == b'"v1"'
+
+    changed = HtmlResponse(JOB_URL, body=b"<html>new</html>")
+    assert cache.process_response(request, changed, None) is changed
+    assert cache.process_request(Request(JOB_URL), None).body == (
+        b"<html>new</html>"
+    )
+    assert cache.stats.get_value("jobads_httpcache/forced_revalidation") == 1
+
+
+def test_unchanged_job_is_served_from_cache_after_revalidation(cache):
+    request = Request(JOB_URL, meta={"jobads_revalidate": True})
+    cache.process_request(request, None)
+
+    not_modified = HtmlResponse(JOB_URL, status=304)
+    response = cache.process_response(request, not_modified, None)
+
+    assert "cached" in response.flags
+    assert response.body == b"<html>old</html>"
+
+
+def test_download_latency_uses_the_configured_buckets():
+    crawler = get_crawler(settings_dict={
+        "JOBADS_METRICS_ENABLED": True,
+        "JOBADS_METRICS_LATENCY_BUCKETS": list(LATENCY_BUCKETS),
+    })
+    metrics = JobAdsDownloadMetricsMiddleware.from_crawler(crawler)
+
+    for latency in (0.003, 0.2, 0.2, 120):
+        request = Request(JOB_URL, meta={"download_latency": latency})
+        metrics.process_response(request, HtmlResponse(JOB_URL), None)
+
+    histogram = Histogram.from_stats(
+        crawler.stats.get_stats(), "jobads_metrics/download_latency"
+    )
+    assert histogram.buckets == LATENCY_BUCKETS
+    assert histogram.count == 4
+    assert histogram.counts[LATENCY_BUCKETS.index(0.005)] == 1
+    assert histogram.counts[LATENCY_BUCKETS.index(0.25)] == 2
+    assert histogram.counts[-1] == 1
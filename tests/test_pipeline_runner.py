@@ -0,0 +1,62 @@
+import os
+import sys
+import subprocess
+
+import numpy as np
+
+from jobads_scrapy.work_queue import WorkQueue
+from src.pipeline_runner import crawl_sharded, shard_file
+from src.snapshot_io import iter_jobs
+from utils import PROJECT_ROOT
+
+WORKER_SCRIPT = os.path.join(PROJECT_ROOT, "scripts", "crawl-worker.py")
+
+
+def stub_settings(portal):
+    return {
+        "JOBADS_BASE_URL": portal.job_url_prefix,
+        "JOBADS_HTTPCACHE_ENABLED": False,
+        "JOBADS_STORE_PATH": "",
+    }
+
+
+def test_sharded_crawl_merges_remote_worker_shards(portal, tmp_path):
+    job_ids = np.array([str(job_id) for job_id in portal.job_ids()])
+    input_file = tmp_path / "job_ids.npy"
+    np.save(input_file, job_ids)
+    output_file = str(tmp_path / "delta.jsonl")
+    queue_file = f"{output_file}.queue.sqlite3"
+
+    # A worker on another machine crawls half of the IDs first
+    with WorkQueue(queue_file) as work_queue:
+        work_queue.add(job_ids[:10])
+    settings = [
+        argument
+        for name, value in stub_settings(portal).items()
+        for argument in ("-s", f"{name}={value}")
+    ]
+    result = subprocess.run(
+        [
+            sys.executable, WORKER_SCRIPT, queue_file, output_file,
+            "--worker", "remote", *settings
+        ],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=PROJECT_ROOT),
+        timeout=300
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert os.path.exists(shard_file(output_file, "remote"))
+
+    finished = crawl_sharded(
+        str(input_file),
+        output_file,
+        queue_file,
+        workers=1,
+        extra_settings=stub_settings(portal)
+    )
+
+    assert finished
+    codes = [job["code"] for job in iter_jobs(output_file)]
+    assert len(codes) == len(set(codes)) == portal.job_count
+    assert not os.path.exists(shard_file(output_file, "remote"))
@@ -0,0 +1,89 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+from src.snapshot_io import find_snapshot_file, iter_jobs
+from utils import PROJECT_ROOT, build_api_url
+
+SCRIPT = os.path.join(PROJECT_ROOT, "scripts", "scrape-jobads.py")
+
+
+def run_cli(*args):
+    """Run scrape-jobads.py in a fresh process, the reactor cannot restart."""
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+
+    return subprocess.run(
+        [sys.executable, SCRIPT, *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=300
+    )
+
+
+def crawl_args(portal, data_dir, snapshot):
+    return [
+        "--snapshot", snapshot,
+        "--data-dir", str(data_dir),
+        "--api-url", build_api_url(endpoint=portal.search_endpoint),
+        "--page-size", "10",
+        "-s", f"JOBADS_BASE_URL={portal.job_url_prefix}",
+        "-s", "JOBADS_HTTPCACHE_ENABLED=False",
+        "-s", "JOBADS_STORE_PATH=",
+    ]
+
+
+def snapshot_pdfs(snapshot_path):
+    pdf_path = snapshot_path / "pdfs"
+    return sorted(
+        name for name in os.listdir(pdf_path)
+        if name.endswith(".pdf") and name != "catalogue.pdf"
+    )
+
+
+def test_all_renders_pdfs_while_crawling(portal, data_dir):
+    pytest.importorskip("xhtml2pdf")
+
+    result = run_cli(
+        "all",
+        *crawl_args(portal, data_dir, "20261016"),
+        "--pdf-backend", "xhtml2pdf",
+        "--pdf-workers", "1"
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    snapshot_path = data_dir / "20261016"
+    jobs = list(iter_jobs(find_snapshot_file(snapshot_path)))
+    assert len(jobs) == portal.job_count
+    assert len(snapshot_pdfs(snapshot_path)) == portal.job_count
+    assert (snapshot_path / "pdfs" / "catalogue.pdf").exists()
+
+
+def test_new_snapshot_starts_from_previous_one(portal, data_dir):
+    pytest.importorskip("xhtml2pdf")
+    import pypdf
+
+    render_args = ["--pdf-backend", "xhtml2pdf", "--pdf-workers", "1"]
+    result = run_cli(
+        "all", *crawl_args(portal, data_dir, "20261016"), *render_args
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    portal.job_count += 5
+    result = run_cli(
+        "all", *crawl_args(portal, data_dir, "20261017"), *render_args
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "5 of 25 jobs are new or changed" in result.stdout
+    snapshot_path = data_dir / "20261017"
+    jobs = list(iter_jobs(find_snapshot_file(snapshot_path)))
+    assert len(jobs) == 25
+    assert len(snapshot_pdfs(snapshot_path)) == 25
+    catalogue = pypdf.PdfReader(snapshot_path / "pdfs" / "catalogue.pdf")
+    job_bookmarks = [
+        item for item in catalogue.outline if isinstance(item, list)
+    ]
+    assert sum(map(len, job_bookmarks)) == 25
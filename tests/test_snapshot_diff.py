@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from src.snapshot_diff import DIGEST_SUFFIX, SnapshotDigests, diff_snapshots
+from src.snapshot_io import write_jobs
+
+
+def job(code, title="Ingenieur", **fields):
+    return {
+        "code": code,
+        "title": title,
+        "location": "Weissach",
+        "tasks": ["Entwickeln"],
+        **fields,
+    }
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    old_path = str(tmp_path / "old.jsonl")
+    new_path = str(tmp_path / "new.json")
+    write_jobs(old_path, [
+        job("J1"),
+        job("J2"),
+        job("J3"),
+        job("J4", url="https://example.org/4"),
+        {"title": "Without code"},
+    ])
+    write_jobs(new_path, [
+        job("J2", title="Ingenieurin", location="Leipzig"),
+        job("J3"),
+        job("J4", url="https://example.org/four"),
+        job("J5"),
+    ])
+    return old_path, new_path
+
+
+def test_diff_reports_added_removed_and_modified_fields(snapshots):
+    diff = diff_snapshots(*snapshots, cache=False)
+
+    assert diff.added == ["J5"]
+    assert diff.removed == ["J1"]
+    assert diff.modified == {"J2": ["title", "location"], "J4": ["other"]}
+    assert diff.summary() == {
+        "added": 1,
+        "removed": 1,
+        "modified": 2,
+        "unchanged": 1,
+        "fields": {"title": 1, "location": 1, "other": 1},
+    }
+
+
+def test_details_load_the_old_and_new_values(snapshots):
+    diff = diff_snapshots(*snapshots, details=True, cache=False)
+
+    assert diff.changes == {
+        "J2": {
+            "title": ("Ingenieur", "Ingenieurin"),
+            "location": ("Weissach", "Leipzig"),
+        },
+        "J4": {},
+    }
+    assert diff.to_dict()["changes"]["J2"]["title"] == {
+        "old": "Ingenieur", "new": "Ingenieurin"
+    }
+
+
+def test_digests_are_cached_until_the_snapshot_changes(snapshots):
+    old_path, _ = snapshots
+
+    digests = SnapshotDigests.load(old_path)
+    assert os.path.exists(f"{old_path}{DIGEST_SUFFIX}")
+    assert SnapshotDigests.load(old_path).codes.tolist() == (
+        digests.codes.tolist()
+    )
+
+    write_jobs(old_path, [job("J1"), job("J9")])
+    assert SnapshotDigests.load(old_path).codes.tolist() == ["J1", "J9"]
@@ -0,0 +1,87 @@
+import gzip
+import json
+
+import pytest
+
+from src import snapshot_io
+from src.snapshot_io import (
+    find_snapshot_file,
+    iter_jobs,
+    repair_json_lines,
+    write_jobs
+)
+
+JOBS = [
+    {"code": f"J{number:05}", "title": f"Stelle {number} für Ingenieure"}
+    for number in range(5)
+]
+
+
+@pytest.mark.parametrize(
+    "file_name",
+    ["scraped_jobs.json", "scraped_jobs.jsonl", "scraped_jobs.jsonl.gz"]
+)
+def test_jobs_are_written_and_read_back(tmp_path, file_name):
+    path = str(tmp_path / file_name)
+
+    assert write_jobs(path, iter(JOBS)) == len(JOBS)
+    assert list(iter_jobs(path)) == JOBS
+    assert find_snapshot_file(str(tmp_path)) == path
+
+
+def test_json_arrays_are_decoded_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_io, "CHUNK_SIZE", 7)
+    path = tmp_path / "scraped_jobs.json"
+    path.write_text(json.dumps(JOBS, indent=2, ensure_ascii=False))
+
+    assert list(iter_jobs(str(path))) == JOBS
+
+
+def test_empty_json_array(tmp_path):
+    path = tmp_path / "scraped_jobs.json"
+    path.write_text("[\n]")
+
+    assert list(iter_jobs(str(path))) == []
+
+
+def test_truncated_last_record_is_skipped_and_repaired(tmp_path):
+    path = tmp_path / "scraped_jobs.jsonl"
+    lines = [json.dumps(job) + "\n" for job in JOBS[:2]]
+    path.write_text("".join(lines) + '{"code": "J000')
+
+    assert list(iter_jobs(str(path))) == JOBS[:2]
+    assert repair_json_lines(str(path)) == len('{"code": "J000')
+    assert path.read_text() == "".join(lines)
+
+
+def test_truncated_gzip_stream_keeps_complete_records(tmp_path):
+    path = tmp_path / "scraped_jobs.jsonl.gz"
+    write_jobs(str(path), JOBS)
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) - 10])
+
+    jobs = list(iter_jobs(str(path)))
+    assert jobs == JOBS[:len(jobs)]
+
+    repair_json_lines(str(path))
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == jobs
+
+
+def test_corrupt_complete_line_raises(tmp_path):
+    path = tmp_path / "scraped_jobs.jsonl"
+    path.write_text('{"code": \n' + json.dumps(JOBS[0]) + "\n")
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_jobs(str(path)))
+
+
+def test_snapshot_file_preference(tmp_path):
+    assert find_snapshot_file(str(tmp_path)) is None
+
+    write_jobs(str(tmp_path / "scraped_jobs.json"), JOBS)
+    write_jobs(str(tmp_path / "scraped_jobs.jsonl"), JOBS)
+
+    assert find_snapshot_file(str(tmp_path)) == str(
+        tmp_path / "scraped_jobs.jsonl"
+    )
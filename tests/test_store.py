@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+
+from jobads_scrapy.store import JobStore
+
+
+def job(code, location="Weissach"):
+    return {
+        "title": f"Job {code}",
+        "code": code,
+        "entry_type": "Professionals",
+        "location": location,
+        "company": "Porsche AG",
+        "tasks": ["Entwickeln"],
+        "requirements": ["Studium"],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    with JobStore(str(tmp_path / "jobs.sqlite3")) as store:
+        store.upsert_jobs(
+            [job("J1"), job("J2"), job("J3", location="Leipzig")],
+            "20261016"
+        )
+        yield store
+
+
+def codes(jobs):
+    return [job["code"] for job in jobs]
+
+
+def test_delisted_jobs_are_not_found(store):
+    assert store.mark_listed(["J1", "J3"], "20261017") == 1
+
+    assert codes(store.find_jobs(location="Weissach")) == ["J1"]
+    assert codes(
+        store.find_jobs(location="Weissach", include_delisted=True)
+    ) == ["J1", "J2"]
+    assert store.get_job("J2")["delisted_snapshot"] == "20261017"
+
+
+def test_delisted_snapshot_is_kept_while_delisted(store):
+    store.mark_listed(["J1", "J3"], "20261017")
+
+    assert store.mark_listed(["J1", "J3"], "20261018") == 0
+    assert store.get_job("J2")["delisted_snapshot"] == "20261017"
+
+
+def test_listed_again_jobs_are_found(store):
+    store.mark_listed(["J1", "J3"], "20261017")
+    store.mark_listed(["J1", "J2", "J3"], "20261018")
+
+    assert codes(store.find_jobs(location="Weissach")) == ["J1", "J2"]
+
+
+def test_scraped_again_jobs_are_listed(store):
+    store.mark_listed(["J1", "J3"], "20261017")
+    store.upsert_jobs([job("J2")], "20261018")
+
+    assert store.get_job("J2")["delisted_snapshot"] is None
+
+
+def test_snapshot_history_is_unaffected(store):
+    store.mark_listed([], "20261017")
+
+    assert codes(store.find_jobs(snapshot="20261016")) == ["J1", "J2", "J3"]
+
+
+def test_store_without_delisted_column_is_migrated(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE jobs (code TEXT PRIMARY KEY, title TEXT, "
+        "entry_type TEXT, location TEXT, company TEXT, tasks TEXT, "
+        "requirements TEXT, first_snapshot TEXT NOT NULL, "
+        "last_snapshot TEXT NOT NULL, scraped_at TEXT NOT NULL)"
+    )
+    connection.close()
+
+    with JobStore(path) as store:
+        store.upsert_jobs([job("J1")], "20261016")
+        store.mark_listed([], "20261017")
+
+        assert store.find_jobs() == []
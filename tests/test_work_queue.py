@@ -0,0 +1,73 @@
+import pytest
+
+from jobads_scrapy.work_queue import WorkQueue
+
+
+@pytest.fixture
+def work_queue(tmp_path):
+    with WorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2) as queue:
+        queue.add(["1", "2", "3", "4"])
+        yield queue
+
+
+def test_ids_are_added_once(work_queue):
+    assert work_queue.add(["4", "5"]) == 1
+    assert len(work_queue) == 5
+
+
+def test_claimed_ids_are_leased_to_one_worker(work_queue):
+    assert work_queue.claim("a", 3) == ["1", "2", "3"]
+    assert work_queue.claim("b", 3) == ["4"]
+    assert work_queue.claim("b", 3) == []
+
+    assert work_queue.leased_by("a") == 3
+    assert work_queue.counts() == {
+        "pending": 0, "leased": 4, "done": 0, "failed": 0
+    }
+
+
+def test_expired_leases_are_claimed_again(tmp_path):
+    with WorkQueue(str(tmp_path / "queue.sqlite3"), lease_seconds=-1) as queue:
+        queue.add(["1", "2"])
+        queue.claim("a", 2)
+
+        assert queue.claim("b", 2) == ["1", "2"]
+        assert queue.leased_by("a") == 0
+
+
+def test_completed_ids_are_not_claimed_again(work_queue):
+    work_queue.claim("a", 2)
+    work_queue.complete(["1", "2"])
+
+    assert work_queue.claim("b", 4) == ["3", "4"]
+    assert work_queue.job_ids("done") == ["1", "2"]
+    assert work_queue.remaining() == 2
+
+
+def test_failed_ids_are_retried_until_max_attempts(work_queue):
+    work_queue.claim("a", 1)
+
+    assert work_queue.fail("1", "timeout") is True
+    assert work_queue.claim("a", 1) == ["1"]
+    assert work_queue.fail("1", "timeout") is False
+    assert work_queue.job_ids("failed") == ["1"]
+    assert work_queue.claim("a", 1) == ["2"]
+
+
+def test_release_returns_the_ids_of_one_worker(work_queue):
+    work_queue.claim("a", 2)
+    work_queue.claim("b", 2)
+
+    assert work_queue.release("a") == 2
+    assert work_queue.job_ids("pending") == ["1", "2"]
+    assert work_queue.release() == 2
+    assert work_queue.remaining() == 4
+
+
+def test_reset_done_requeues_lost_ids(work_queue):
+    work_queue.claim("a", 4)
+    work_queue.complete(["1", "2", "3"])
+
+    assert work_queue.reset_done({"1", "3"}) == 1
+    assert work_queue.job_ids("pending") == ["2"]
+    assert work_queue.job_ids("done") == ["1", "3"]
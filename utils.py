@@ -1,4 +1,7 @@
+import copy
+import json
 import os
+import urllib.parse
 
 
 def find_project_root(marker_file='README.md'):
@@ -22,21 +25,100 @@ def find_project_root(marker_file='README.md'):
 
 
 PROJECT_ROOT = find_project_root()
-API_URL = (
-    "https://porsche-beesite-production-gjb.app.beesite.de/search/?data=%7B"
-    "%22LanguageCode%22%3A%22DE%22%2C%22SearchParameters%22%3A%7B%22FirstItem"
-    "%22%3A1%2C%22CountItem%22%3A1567%2C%22Sort%22%3A%5B%7B%22Criterion%22%"
-    "3A%22PublicationStartDate%22%2C%22Direction%22%3A%22DESC%22%7D%5D%2C%22"
-    "MatchedObjectDescriptor%22%3A%5B%22ID%22%2C%22PositionTitle%22%2C%22"
-    "PositionURI%22%2C%22PositionShortURI%22%2C%22PositionLocation.CountryName"
-    "%22%2C%22PositionLocation.CityName%22%2C%22PositionLocation.Longitude"
-    "%22%2C%22PositionLocation.Latitude%22%2C%22PositionLocation.PostalCode"
-    "%22%2C%22PositionLocation.StreetName%22%2C%22PositionLocation.Building"
-    "Number%22%2C%22PositionLocation.Distance%22%2C%22JobCategory.Name%22%"
-    "2C%22PublicationStartDate%22%2C%22ParentOrganizationName%22%2C%22"
-    "ParentOrganization%22%2C%22OrganizationShortName%22%2C%22CareerLevel.Name"
-    "%22%2C%22JobSector.Name%22%2C%22PositionIndustry.Name%22%2C%22Publication"
-    "Code%22%2C%22PublicationChannel.Id%22%5D%7D%2C%22SearchCriteria%22%3A%5B%"
-    "7B%22CriterionName%22%3A%22PublicationChannel.Code%22%2C%22CriterionValue"
-    "%22%3A%5B%2212%22%5D%7D%5D%7D"
+API_SEARCH_ENDPOINT = (
+    "https://porsche-beesite-production-gjb.app.beesite.de/search/"
 )
+API_SEARCH_QUERY = {
+    "LanguageCode": "DE",
+    "SearchParameters": {
+        "FirstItem": 1,
+        "CountItem": 1567,
+        "Sort": [
+            {"Criterion": "PublicationStartDate", "Direction": "DESC"}
+        ],
+        "MatchedObjectDescriptor": [
+            "ID",
+            "PositionTitle",
+            "PositionURI",
+            "PositionShortURI",
+            "PositionLocation.CountryName",
+            "PositionLocation.CityName",
+            "PositionLocation.Longitude",
+            "PositionLocation.Latitude",
+            "PositionLocation.PostalCode",
+            "PositionLocation.StreetName",
+            "PositionLocation.BuildingNumber",
+            "PositionLocation.Distance",
+            "JobCategory.Name",
+            "PublicationStartDate",
+            "ParentOrganizationName",
+            "ParentOrganization",
+            "OrganizationShortName",
+            "CareerLevel.Name",
+            "JobSector.Name",
+            "PositionIndustry.Name",
+            "PublicationCode",
+            "PublicationChannel.Id",
+        ],
+    },
+    "SearchCriteria": [
+        {"CriterionName": "PublicationChannel.Code", "CriterionValue": ["12"]}
+    ],
+}
+
+
+def build_api_url(
+        query=None,
+        first_item=None,
+        count_item=None,
+        endpoint=API_SEARCH_ENDPOINT
+):
+    """
+    Build a job search API URL from structured search parameters.
+
+    Args:
+        query (dict, optional): The search query sent in the ``data``
+            parameter. Defaults to ``API_SEARCH_QUERY``.
+        first_item (int, optional): 1-based index of the first result to
+            return. Overrides ``SearchParameters.FirstItem`` of the query.
+        count_item (int, optional): Number of results to return. Overrides
+            ``SearchParameters.CountItem`` of the query.
+        endpoint (str): The search endpoint of the API.
+
+    Returns:
+        str: The encoded API URL.
+    """
+    query = copy.deepcopy(API_SEARCH_QUERY if query is None else query)
+    search_parameters = query.setdefault("SearchParameters", {})
+
+    if first_item is not None:
+        search_parameters["FirstItem"] = first_item
+    if count_item is not None:
+        search_parameters["CountItem"] = count_item
+
+    data = json.dumps(query, separators=(",", ":"))
+    return f"{endpoint}?data={urllib.parse.quote(data, safe='')}"
+
+
+def parse_api_url(url):
+    """
+    Split a job search API URL into its endpoint and search query.
+
+    This is the inverse of ``build_api_url``.
+
+    Args:
+        url (str): The encoded API URL.
+
+    Returns:
+        tuple[str, dict]: The search endpoint and the decoded search query.
+    """
+    parts = urllib.parse.urlsplit(url)
+    endpoint = urllib.parse.urlunsplit(
+        (parts.scheme, parts.netloc, parts.path, "", "")
+    )
+    data = urllib.parse.parse_qs(parts.query)["data"][0]
+
+    return endpoint, json.loads(data)
+
+
+API_URL = build_api_url()